@@ -1,21 +1,35 @@
-from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Header
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-import uuid
+from starlette.requests import ClientDisconnect
+from typing import Optional
 import asyncio
+import os
 
 from .database import get_db, create_tables
-from .crud import StudentManager
+from .crud import StudentManager, BackgroundTaskManager, ACTIVE_TASK_STATUSES
 from .schemas import (
     StudentCreate, StudentUpdate, StudentResponse, StudentListResponse,
-    CSVLoadRequest, DeleteStudentsRequest, BackgroundTaskResponse,
-    CSVLoadResponse, DeleteStudentsResponse, CacheStatsResponse
+    CSVLoadRequest, DeleteStudentsRequest, ExportRequest, FilteredDeleteRequest, FilteredUpdateRequest,
+    BackgroundTaskResponse,
+    CacheStatsResponse, BackgroundTaskStatusResponse
 )
 from .auth_router import router as auth_router
 from .dependencies import get_current_user
 from .schemas import UserResponse
-from .background_tasks import load_students_from_csv, delete_students_by_ids, delete_all_students
+from .background_tasks import (
+    load_students_from_csv, delete_students_by_ids, rollback_import, export_students, submit_task,
+    delete_students_by_filter, update_students_by_filter,
+    run_task_in_new_session, import_students_from_stream, task_queue, TASK_STALE_SECONDS
+)
+from .exporters import EXPORT_WRITERS, export_path, iter_file_range, parse_byte_range, resolve_export_format
+from .importers import (
+    MultipartUploadStream, RejectedRowsReport, resolve_column_map, resolve_import_format, resolve_import_path
+)
 from .cache import cache, cached, invalidate_cache
+from .scheduler import scheduler
+from .task_events import TASK_EVENTS_HEARTBEAT_SECONDS, format_sse, task_events
 
 app = FastAPI(
     title="Student Management API",
@@ -33,10 +47,6 @@ def startup_event():
     create_tables()
 
 
-# Хранилище для отслеживания фоновых задач (в продакшене используйте Redis или БД)
-background_tasks = {}
-
-
 # Защищенные эндпоинты с кешированием
 
 @app.post("/students/",
@@ -53,7 +63,14 @@ async def create_student(
     Создать нового студента (требует авторизации)
     """
     manager = StudentManager(db)
-    return manager.create_student(student.dict())
+    try:
+        return manager.create_student(student.dict())
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Студент с такими фамилией, именем, факультетом и курсом уже существует"
+        )
 
 
 @app.get("/students/",
@@ -111,7 +128,14 @@ async def update_student(
     Обновить данные студента (требует авторизации)
     """
     manager = StudentManager(db)
-    student = manager.update_student(student_id, student_data)
+    try:
+        student = manager.update_student(student_id, student_data)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Студент с такими фамилией, именем, факультетом и курсом уже существует"
+        )
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -199,107 +223,622 @@ async def get_average_grade(
 
 # Эндпоинты для фоновых задач
 
+def register_task(
+        db: Session,
+        task_type: str,
+        parameters: dict,
+        current_user: UserResponse,
+        idempotency_key: Optional[str],
+        match_parameters: bool = True
+):
+    """
+    Регистрация задачи с защитой от повторного запуска.
+    Возвращает задачу и признак того, что она только что создана.
+    """
+    task, created = BackgroundTaskManager(db).get_or_create_task(
+        task_type, parameters, created_by=current_user.id,
+        idempotency_key=idempotency_key, match_parameters=match_parameters
+    )
+    if not created and task.task_type != task_type:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ключ идемпотентности уже использован для задачи другого типа"
+        )
+    return task, created
+
+
+def existing_task_response(task) -> BackgroundTaskResponse:
+    """Ответ на повторную отправку уже зарегистрированной задачи"""
+    return BackgroundTaskResponse(
+        task_id=task.task_id,
+        status=task.status,
+        message="Такая задача уже зарегистрирована, новая не запускалась"
+    )
+
+
 @app.post("/background/load-csv",
           response_model=BackgroundTaskResponse,
           summary="Загрузить данные из CSV (фоновая задача)")
 async def background_load_csv(
         request: CSVLoadRequest,
-        background_tasks: BackgroundTasks,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
         db: Session = Depends(get_db),
         current_user: UserResponse = Depends(get_current_user)
 ):
     """
-    Загрузить данные из CSV файла в фоновом режиме
+    Загрузить данные из файла CSV, JSON Lines или Parquet в фоновом режиме
     """
-    task_id = str(uuid.uuid4())
+    csv_file_path = resolve_import_path(request.csv_file_path)
+    if csv_file_path is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Файл находится вне каталога, разрешенного для импорта"
+        )
 
-    async def run_task():
-        result = await load_students_from_csv(db, request.csv_file_path)
-        background_tasks[task_id] = {
-            "status": "completed",
-            "result": result
-        }
+    try:
+        file_format = resolve_import_format(csv_file_path, request.file_format)
+        resolve_column_map(file_format, request.column_map)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-    # Запускаем фоновую задачу
-    background_tasks.add_task(run_task)
+    parameters = {"csv_file_path": csv_file_path, "file_format": file_format, "column_map": request.column_map}
+    task, created = register_task(db, "load_csv", parameters, current_user, idempotency_key)
+    if not created:
+        return existing_task_response(task)
 
-    background_tasks[task_id] = {
-        "status": "running",
-        "result": None
-    }
+    # Запускаем фоновую задачу
+    submit_task(task, load_students_from_csv, csv_file_path, file_format, request.column_map)
 
     return BackgroundTaskResponse(
-        task_id=task_id,
-        status="running",
+        task_id=task.task_id,
+        status=task.status,
         message="Задача загрузки CSV запущена в фоновом режиме"
     )
 
 
+class UploadAcceptedResponse(JSONResponse):
+    """
+    Ответ 202 с идентификатором задачи, отправляемый после первого фрагмента
+    тела запроса. Ответ уходит клиенту сразу, а соединение остается открытым, пока
+    receive_body принимает тело запроса, поэтому прогресс задачи
+    можно отслеживать с начала загрузки.
+    """
+
+    def __init__(self, content: BackgroundTaskResponse, receive_body):
+        super().__init__(
+            content.dict(),
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Location": f"/background/tasks/{content.task_id}"}
+        )
+        self.receive_body = receive_body
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        # Тело ответа передано целиком (Content-Length), завершение ответа - после приема запроса
+        await send({"type": "http.response.body", "body": self.body, "more_body": True})
+        await self.receive_body()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+@app.post("/background/upload-csv",
+          response_model=BackgroundTaskResponse,
+          status_code=status.HTTP_202_ACCEPTED,
+          summary="Загрузить CSV файл в теле запроса")
+async def background_upload_csv(
+        request: Request,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Загрузить CSV файл (multipart/form-data) с потоковой записью в БД.
+
+    Идентификатор задачи возвращается сразу (202, заголовок Location), тело
+    запроса разбирается по мере поступления и пачками записывается в БД,
+    файл не сохраняется на диск. Если загрузка оборвалась до завершающей
+    границы multipart, задача завершается с ошибкой, а добавленные строки удаляются.
+    """
+    boundary = MultipartUploadStream.get_boundary(request.headers.get("content-type", ""))
+    if not boundary:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ожидается запрос multipart/form-data с CSV файлом"
+        )
+
+    # Содержимое файла до загрузки неизвестно, поэтому дубли определяются только по ключу
+    task, created = register_task(
+        db, "upload_csv", {}, current_user, idempotency_key, match_parameters=False
+    )
+    if not created:
+        return existing_task_response(task)
+
+    upload = MultipartUploadStream(boundary)
+
+    def run_import():
+        try:
+            return run_task_in_new_session(task.task_id, import_students_from_stream, upload.text_stream())
+        finally:
+            upload.consumer_finished()
+
+    body = request.stream()
+    # Первый фрагмент тела читается до отправки ответа: клиенту, который прислал
+    # Expect: 100-continue, сервер отвечает 100 Continue только на чтение тела
+    # до начала ответа, а ранний 202 заставил бы его не отправлять тело вовсе
+    try:
+        first_chunk = await body.__anext__()
+    except (StopAsyncIteration, ClientDisconnect):
+        first_chunk = None
+
+    async def body_chunks():
+        if first_chunk is None:
+            return
+        yield first_chunk
+        async for body_chunk in body:
+            yield body_chunk
+
+    async def receive_body():
+        try:
+            async for body_chunk in body_chunks():
+                for file_chunk in upload.feed(body_chunk):
+                    if not await asyncio.to_thread(upload.put, file_chunk):
+                        # Импорт уже завершился, остаток тела не нужен
+                        return
+        except ClientDisconnect:
+            pass
+        finally:
+            # Обрыв соединения или неполное тело не должны выглядеть как конец файла
+            if upload.complete:
+                await asyncio.to_thread(upload.close)
+            else:
+                await asyncio.to_thread(upload.abort, "тело запроса получено не полностью")
+
+    # Импорт читает файл в потоке очереди задач, пока тело запроса принимается;
+    # его результат сохраняется в реестре задач, ответ его не ждет
+    task_queue.submit(task.task_type, run_import)
+
+    return UploadAcceptedResponse(
+        BackgroundTaskResponse(
+            task_id=task.task_id,
+            status=task.status,
+            message="Загрузка CSV принята, импорт выполняется в фоновом режиме"
+        ),
+        receive_body
+    )
+
+
 @app.post("/background/delete-students",
           response_model=BackgroundTaskResponse,
           summary="Удалить студентов по ID (фоновая задача)")
 async def background_delete_students(
         request: DeleteStudentsRequest,
-        background_tasks: BackgroundTasks,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
         db: Session = Depends(get_db),
         current_user: UserResponse = Depends(get_current_user)
 ):
     """
     Удалить студентов по списку ID в фоновом режиме
     """
-    task_id = str(uuid.uuid4())
-
-    async def run_task():
-        result = await delete_students_by_ids(db, request.student_ids)
-        background_tasks[task_id] = {
-            "status": "completed",
-            "result": result
-        }
+    task, created = register_task(
+        db, "delete_students", {"student_ids": request.student_ids}, current_user, idempotency_key
+    )
+    if not created:
+        return existing_task_response(task)
 
     # Запускаем фоновую задачу
-    background_tasks.add_task(run_task)
+    submit_task(task, delete_students_by_ids, request.student_ids)
+
+    return BackgroundTaskResponse(
+        task_id=task.task_id,
+        status=task.status,
+        message="Задача удаления студентов запущена в фоновом режиме"
+    )
+
+
+def filter_parameters(request: FilteredDeleteRequest) -> dict:
+    """Условия отбора массовой операции; пустой фильтр затронул бы всю таблицу"""
+    filters = request.filter.model_dump(exclude_none=True)
+    if not filters:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нужно задать хотя бы одно условие отбора"
+        )
+    return filters
+
+
+@app.post("/background/delete-students-by-filter",
+          response_model=BackgroundTaskResponse,
+          summary="Удалить студентов по условиям (фоновая задача)")
+async def background_delete_students_by_filter(
+        request: FilteredDeleteRequest,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Удалить студентов, подходящих под условия, пачками с паузой между ними
+    """
+    filters = filter_parameters(request)
+    parameters = {"filter": filters, "batch_size": request.batch_size, "sleep_seconds": request.sleep_seconds}
+    task, created = register_task(db, "delete_by_filter", parameters, current_user, idempotency_key)
+    if not created:
+        return existing_task_response(task)
+
+    submit_task(task, delete_students_by_filter, filters, request.batch_size, request.sleep_seconds)
+
+    return BackgroundTaskResponse(
+        task_id=task.task_id,
+        status=task.status,
+        message="Задача удаления студентов по условиям запущена в фоновом режиме"
+    )
+
+
+@app.post("/background/update-students-by-filter",
+          response_model=BackgroundTaskResponse,
+          summary="Изменить студентов по условиям (фоновая задача)")
+async def background_update_students_by_filter(
+        request: FilteredUpdateRequest,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Изменить поля студентов, подходящих под условия, пачками с паузой между ними
+    """
+    filters = filter_parameters(request)
+    changes = request.changes.model_dump(exclude_none=True)
+    if not changes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нужно задать хотя бы одно изменяемое поле"
+        )
 
-    background_tasks[task_id] = {
-        "status": "running",
-        "result": None
+    parameters = {
+        "filter": filters, "changes": changes,
+        "batch_size": request.batch_size, "sleep_seconds": request.sleep_seconds
     }
+    task, created = register_task(db, "update_by_filter", parameters, current_user, idempotency_key)
+    if not created:
+        return existing_task_response(task)
+
+    submit_task(
+        task, update_students_by_filter, filters, changes, request.batch_size, request.sleep_seconds
+    )
 
     return BackgroundTaskResponse(
-        task_id=task_id,
-        status="running",
-        message="Задача удаления студентов запущена в фоновом режиме"
+        task_id=task.task_id,
+        status=task.status,
+        message="Задача изменения студентов по условиям запущена в фоновом режиме"
+    )
+
+
+@app.post("/background/imports/{import_batch_id}/rollback",
+          response_model=BackgroundTaskResponse,
+          summary="Откатить импорт (фоновая задача)")
+async def background_rollback_import(
+        import_batch_id: str,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Удалить студентов, добавленных импортом. Идентификатор импорта совпадает
+    с идентификатором задачи загрузки CSV.
+    """
+    task, created = register_task(
+        db, "rollback_import", {"import_batch_id": import_batch_id}, current_user, idempotency_key
+    )
+    if not created:
+        return existing_task_response(task)
+
+    submit_task(task, rollback_import, import_batch_id)
+
+    return BackgroundTaskResponse(
+        task_id=task.task_id,
+        status=task.status,
+        message="Задача отката импорта запущена в фоновом режиме"
+    )
+
+
+@app.post("/background/export",
+          response_model=BackgroundTaskResponse,
+          summary="Выгрузить студентов в файл (фоновая задача)")
+async def background_export(
+        request: ExportRequest,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Выгрузить студентов в CSV или Parquet в фоновом режиме.
+    Готовый файл скачивается через /background/tasks/{task_id}/download
+    """
+    try:
+        file_format = resolve_export_format(request.file_format)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    parameters = {"file_format": file_format, "faculty": request.faculty, "course": request.course}
+    task, created = register_task(db, "export_students", parameters, current_user, idempotency_key)
+    if not created:
+        return existing_task_response(task)
+
+    submit_task(task, export_students, file_format, request.faculty, request.course)
+
+    return BackgroundTaskResponse(
+        task_id=task.task_id,
+        status=task.status,
+        message="Задача выгрузки студентов запущена в фоновом режиме"
     )
 
 
 @app.get("/background/tasks/{task_id}",
+         response_model=BackgroundTaskStatusResponse,
          summary="Получить статус фоновой задачи")
 async def get_background_task_status(
         task_id: str,
+        db: Session = Depends(get_db),
         current_user: UserResponse = Depends(get_current_user)
 ):
     """
     Получить статус выполнения фоновой задачи
     """
-    task_info = background_tasks.get(task_id)
+    task = BackgroundTaskManager(db).get_task(task_id)
 
-    if not task_info:
+    if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Задача не найдена"
         )
 
-    if task_info["status"] == "completed":
-        return {
-            "task_id": task_id,
-            "status": "completed",
-            "result": task_info["result"]
-        }
+    return BackgroundTaskManager.to_dict(task)
+
+
+@app.get("/background/tasks/{task_id}/events",
+         summary="Поток событий фоновой задачи (SSE)")
+async def stream_background_task_events(
+        task_id: str,
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Server-Sent Events с прогрессом задачи вместо частых запросов статуса.
+
+    Первым приходит событие status с текущим состоянием задачи, затем progress
+    после каждой пачки и finished с результатом, после которого поток закрывается.
+    Если событий долго нет, отправляется keep-alive и статус сверяется с БД
+    (например, когда задача выполняется в другом процессе).
+    """
+    registry = BackgroundTaskManager(db)
+
+    def read_task() -> Optional[dict]:
+        task = registry.get_task(task_id)
+        snapshot = BackgroundTaskManager.to_dict(task) if task else None
+        # Соединение возвращается в пул на время ожидания событий
+        db.rollback()
+        return snapshot
+
+    # Синхронный запрос к БД выполняется в потоке, чтобы не блокировать цикл событий
+    if await asyncio.to_thread(read_task) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+
+    async def event_stream():
+        async with task_events.subscribe(task_id) as subscription:
+            # Состояние читается после подписки, чтобы не пропустить события между ними
+            snapshot = await asyncio.to_thread(read_task)
+            yield format_sse("status", snapshot)
+            if snapshot["status"] not in ACTIVE_TASK_STATUSES:
+                return
+
+            while True:
+                message = await subscription.get(TASK_EVENTS_HEARTBEAT_SECONDS)
+                if message is not None:
+                    yield format_sse(message["event"], message["data"])
+                    if message["event"] == "finished":
+                        return
+                    continue
+
+                snapshot = await asyncio.to_thread(read_task)
+                if snapshot is None or snapshot["status"] not in ACTIVE_TASK_STATUSES:
+                    yield format_sse("finished", snapshot or {"task_id": task_id, "status": "deleted"})
+                    return
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/background/tasks/{task_id}/rejected-rows",
+         summary="Скачать отчет об отклоненных строках импорта")
+async def get_rejected_rows_report(
+        task_id: str,
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Отчет об отклоненных строках в формате CSV: номер строки, столбец, причина
+    """
+    task = BackgroundTaskManager(db).get_task(task_id)
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+
+    filename = f"rejected_rows_{task_id}.csv"
+    report_path = RejectedRowsReport.report_path(task_id)
+    if os.path.exists(report_path):
+        return FileResponse(report_path, media_type="text/csv", filename=filename)
+
+    result = BackgroundTaskManager.to_dict(task)["result"] or {}
+    rows = (result.get("rejected_rows") or {}).get("rows", [])
+    return Response(
+        content=RejectedRowsReport.rows_to_csv(rows),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.get("/background/tasks/{task_id}/download",
+         summary="Скачать файл выгрузки")
+async def download_export(
+        task_id: str,
+        range_header: Optional[str] = Header(None, alias="Range"),
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Скачать готовый файл выгрузки. Поддерживается заголовок Range
+    с одним диапазоном байтов для докачки прерванной загрузки.
+    """
+    task = BackgroundTaskManager(db).get_task(task_id)
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+
+    if task.task_type != "export_students" or task.status != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Задача не является завершенной выгрузкой"
+        )
+
+    file_format = BackgroundTaskManager.to_dict(task)["parameters"]["file_format"]
+    file_path = export_path(task_id, file_format)
+    if not os.path.exists(file_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Файл выгрузки удален по истечении срока хранения"
+        )
+
+    file_size = os.path.getsize(file_path)
+    writer = EXPORT_WRITERS[file_format]
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="students_{task_id}.{writer.extension}"'
+    }
+
+    try:
+        byte_range = parse_byte_range(range_header, file_size) if range_header else None
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+
+    if byte_range is None:
+        start, end = 0, file_size - 1
+        status_code = status.HTTP_200_OK
     else:
-        return {
-            "task_id": task_id,
-            "status": "running",
-            "result": None
-        }
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(end - start + 1)
+
+    return StreamingResponse(
+        iter_file_range(file_path, start, end),
+        status_code=status_code,
+        media_type=writer.media_type,
+        headers=headers
+    )
+
+
+@app.delete("/background/tasks/{task_id}",
+            response_model=BackgroundTaskStatusResponse,
+            summary="Отменить фоновую задачу")
+async def cancel_background_task(
+        task_id: str,
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Отменить фоновую задачу. Ожидающая задача отменяется сразу,
+    выполняемая останавливается после текущей пачки.
+    """
+    registry = BackgroundTaskManager(db)
+    task = registry.get_task(task_id)
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+
+    if task.status not in ACTIVE_TASK_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Задача уже завершена"
+        )
+
+    return BackgroundTaskManager.to_dict(registry.request_cancel(task_id))
+
+
+@app.post("/background/tasks/{task_id}/resume",
+          response_model=BackgroundTaskResponse,
+          summary="Возобновить прерванный импорт")
+async def resume_background_task(
+        task_id: str,
+        db: Session = Depends(get_db),
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Продолжить импорт файла с последней контрольной точки после ошибки,
+    отмены или перезапуска процесса
+    """
+    registry = BackgroundTaskManager(db)
+    task = registry.get_task(task_id)
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+
+    if task.task_type != "load_csv":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Возобновить можно только импорт файла с сервера"
+        )
+
+    if not registry.prepare_resume(task_id, TASK_STALE_SECONDS):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Задача выполняется или уже успешно завершена"
+        )
+
+    parameters = BackgroundTaskManager.to_dict(task)["parameters"]
+    submit_task(
+        task, load_students_from_csv, parameters["csv_file_path"],
+        parameters.get("file_format"), parameters.get("column_map")
+    )
+
+    return BackgroundTaskResponse(
+        task_id=task_id,
+        status="pending",
+        message="Импорт будет продолжен с последней контрольной точки"
+    )
+
+
+# Планировщик задач обслуживания
+
+@app.get("/scheduler/jobs",
+         summary="Метрики периодических задач")
+async def get_scheduler_jobs(
+        current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Расписание, число запусков, задержка запуска и длительность последнего
+    выполнения периодических задач в этом процессе
+    """
+    return {"jobs": scheduler.metrics()}
 
 
 # Управление кешем
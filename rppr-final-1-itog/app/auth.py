@@ -1,87 +1,105 @@
+import os
 import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Optional
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-import bcrypt
+from sqlalchemy import select, delete, update
 
+from .hashing import password_hasher
 from .models import User, UserSession
 from .schemas import UserCreate
 
 # Настройки аутентификации
 SESSION_TOKEN_LENGTH = 32
 SESSION_DURATION_DAYS = 7
+# Доля срока жизни сессии, которая должна пройти, прежде чем expires_at будет продлен.
+# Пока порог не достигнут, проверка токена не выполняет запись в БД.
+SESSION_REFRESH_THRESHOLD = float(os.getenv("SESSION_REFRESH_THRESHOLD", "0.1"))
+# Сколько одновременных сессий может быть у одного пользователя
+MAX_ACTIVE_SESSIONS = int(os.getenv("MAX_ACTIVE_SESSIONS", "1"))
+
+# Очистка устаревших сессий
+SESSION_RETENTION_DAYS = int(os.getenv("SESSION_RETENTION_DAYS", "1"))
+SESSION_GC_BATCH_SIZE = int(os.getenv("SESSION_GC_BATCH_SIZE", "1000"))
+SESSION_GC_BATCH_PAUSE_SECONDS = float(os.getenv("SESSION_GC_BATCH_PAUSE_SECONDS", "0.05"))
 
 
 class AuthService:
     def __init__(self, db: Session):
         self.db = db
 
-    def hash_password(self, password: str) -> str:
-        """Хеширование пароля"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
-
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Проверка пароля"""
-        return bcrypt.checkpw(
-            plain_password.encode('utf-8'),
-            hashed_password.encode('utf-8')
-        )
+    async def hash_password(self, password: str) -> str:
+        """Хеширование пароля в выделенном пуле bcrypt"""
+        return await password_hasher.hash(password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля в выделенном пуле bcrypt"""
+        return await password_hasher.verify(plain_password, hashed_password)
 
     def generate_session_token(self) -> str:
         """Генерация токена сессии"""
         return secrets.token_hex(SESSION_TOKEN_LENGTH)
 
-    def register_user(self, user_data: UserCreate) -> Optional[User]:
+    async def register_user(self, user_data: UserCreate) -> Optional[User]:
         """Регистрация нового пользователя"""
         # Проверяем, существует ли пользователь с таким username или email
         stmt = select(User).where(
             (User.username == user_data.username) | (User.email == user_data.email)
         )
-        existing_user = self.db.scalar(stmt)
+        existing_user = await run_in_threadpool(self.db.scalar, stmt)
 
         if existing_user:
             return None
 
         # Создаем нового пользователя
-        hashed_password = self.hash_password(user_data.password)
+        hashed_password = await self.hash_password(user_data.password)
         user = User(
             username=user_data.username,
             email=user_data.email,
             hashed_password=hashed_password
         )
 
+        await run_in_threadpool(self._save_user, user)
+        return user
+
+    def _save_user(self, user: User) -> None:
         self.db.add(user)
         self.db.commit()
         self.db.refresh(user)
-        return user
 
-    def authenticate_user(self, username: str, password: str) -> Optional[User]:
+    async def authenticate_user(self, username: str, password: str) -> Optional[User]:
         """Аутентификация пользователя"""
         stmt = select(User).where(User.username == username)
-        user = self.db.scalar(stmt)
+        user = await run_in_threadpool(self.db.scalar, stmt)
 
         if not user or not user.is_active:
             return None
 
-        if not self.verify_password(password, user.hashed_password):
+        if not await self.verify_password(password, user.hashed_password):
             return None
 
         return user
 
-    def create_session(self, user_id: int) -> Optional[str]:
+    def create_session(self, user_id: int, max_active_sessions: int = MAX_ACTIVE_SESSIONS) -> Optional[str]:
         """Создание сессии для пользователя"""
-        # Деактивируем старые сессии пользователя
-        stmt = select(UserSession).where(
-            (UserSession.user_id == user_id) &
-            (UserSession.is_active == True)
-        )
-        active_sessions = self.db.scalars(stmt).all()
-
-        for session in active_sessions:
-            session.is_active = False
+        # Деактивируем старые сессии пользователя одним UPDATE,
+        # оставляя max_active_sessions - 1 самых новых
+        user_active_sessions = (UserSession.user_id == user_id) & (UserSession.is_active == True)
+        stmt = update(UserSession).where(user_active_sessions).values(is_active=False, deactivated_at=datetime.now())
+
+        sessions_to_keep = max_active_sessions - 1
+        if sessions_to_keep > 0:
+            newest_sessions = (
+                select(UserSession.id)
+                .where(user_active_sessions)
+                .order_by(UserSession.id.desc())
+                .limit(sessions_to_keep)
+            )
+            stmt = stmt.where(UserSession.id.not_in(newest_sessions))
+
+        self.db.execute(stmt, execution_options={"synchronize_session": False})
 
         # Создаем новую сессию
         session_token = self.generate_session_token()
@@ -100,23 +118,33 @@ class AuthService:
 
     def get_user_by_session_token(self, session_token: str) -> Optional[User]:
         """Получение пользователя по токену сессии"""
-        stmt = select(UserSession).where(
+        now = datetime.now()
+        session_lifetime = timedelta(days=SESSION_DURATION_DAYS)
+        refresh_before = now + session_lifetime * (1 - SESSION_REFRESH_THRESHOLD)
+
+        # Сессия и ее пользователь загружаются одним запросом
+        stmt = select(
+            UserSession,
+            User,
+            (UserSession.expires_at < refresh_before).label("needs_refresh")
+        ).join(UserSession.user).where(
             (UserSession.session_token == session_token) &
             (UserSession.is_active == True) &
-            (UserSession.expires_at > datetime.now())
+            (UserSession.expires_at > now)
         )
-        session = self.db.scalar(stmt)
+        row = self.db.execute(stmt).first()
 
-        if not session:
+        if not row:
             return None
 
-        # Обновляем время истечения сессии
-        session.expires_at = datetime.now() + timedelta(days=SESSION_DURATION_DAYS)
-        self.db.commit()
+        session, user, needs_refresh = row
 
-        # Возвращаем пользователя
-        user_stmt = select(User).where(User.id == session.user_id)
-        return self.db.scalar(user_stmt)
+        # Продлеваем сессию только после того, как прошла заданная доля ее срока жизни
+        if needs_refresh:
+            session.expires_at = now + session_lifetime
+            self.db.commit()
+
+        return user
 
     def logout_user(self, session_token: str) -> bool:
         """Выход пользователя (завершение сессии)"""
@@ -127,9 +155,46 @@ class AuthService:
             return False
 
         session.is_active = False
+        session.deactivated_at = datetime.now()
         self.db.commit()
         return True
 
+    def purge_sessions(
+            self,
+            retention_days: int = SESSION_RETENTION_DAYS,
+            batch_size: int = SESSION_GC_BATCH_SIZE,
+            pause_seconds: float = SESSION_GC_BATCH_PAUSE_SECONDS
+    ) -> int:
+        """
+        Удаление истекших и неактивных сессий старше срока хранения.
+
+        Истекшие сессии и сессии, деактивированные до порога, удаляются
+        отдельными проходами, каждый по своему индексу (expires_at и
+        deactivated_at). Удаление идет пачками по batch_size строк с фиксацией
+        после каждой пачки и паузой между ними, чтобы не держать длинные блокировки.
+        """
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        removed = self._delete_sessions_in_batches(UserSession.expires_at < cutoff, batch_size, pause_seconds)
+        removed += self._delete_sessions_in_batches(
+            UserSession.deactivated_at < cutoff, batch_size, pause_seconds
+        )
+        return removed
+
+    def _delete_sessions_in_batches(self, condition, batch_size: int, pause_seconds: float) -> int:
+        removed = 0
+        while True:
+            batch_ids = select(UserSession.id).where(condition).limit(batch_size)
+            stmt = delete(UserSession).where(UserSession.id.in_(batch_ids))
+            result = self.db.execute(stmt, execution_options={"synchronize_session": False})
+            self.db.commit()
+
+            removed += result.rowcount
+            if result.rowcount < batch_size:
+                return removed
+
+            if pause_seconds:
+                time.sleep(pause_seconds)
+
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Получение пользователя по ID"""
         stmt = select(User).where(User.id == user_id)
@@ -1,24 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from .database import get_db
 from .auth import AuthService
-from .schemas import UserCreate, UserLogin, TokenResponse, UserResponse, LogoutResponse
+from .hashing import PasswordHasherOverloaded
+from .rate_limit import auth_rate_limiter, enforce_rate_limit
+from .schemas import (
+    UserCreate, UserLogin, TokenResponse, UserResponse, LogoutResponse, RefreshTokenRequest
+)
 from .dependencies import get_current_user
+from .tokens import (
+    TokenError, token_auth_enabled, create_token_pair, revoke_access_token, rotate_refresh_token
+)
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 
+def password_hasher_overloaded() -> HTTPException:
+    """Ответ при переполнении очереди хеширования паролей"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Сервис перегружен, повторите попытку позже",
+        headers={"Retry-After": "1"}
+    )
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
         user_data: UserCreate,
+        request: Request,
         db: Session = Depends(get_db)
 ):
     """
-    Регистрация нового пользователя
+    Регистрация нового пользователя.
+
+    Обработчик асинхронный, чтобы ожидание пула bcrypt не занимало поток;
+    синхронные обращения к БД выполняются в пуле потоков.
     """
+    await enforce_rate_limit(auth_rate_limiter, request, "register", user_data.username)
+
     auth_service = AuthService(db)
-    user = auth_service.register_user(user_data)
+    try:
+        user = await auth_service.register_user(user_data)
+    except PasswordHasherOverloaded:
+        raise password_hasher_overloaded()
 
     if not user:
         raise HTTPException(
@@ -30,15 +56,21 @@ def register(
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(
+async def login(
         login_data: UserLogin,
+        request: Request,
         db: Session = Depends(get_db)
 ):
     """
     Вход пользователя в систему
     """
+    await enforce_rate_limit(auth_rate_limiter, request, "login", login_data.username)
+
     auth_service = AuthService(db)
-    user = auth_service.authenticate_user(login_data.username, login_data.password)
+    try:
+        user = await auth_service.authenticate_user(login_data.username, login_data.password)
+    except PasswordHasherOverloaded:
+        raise password_hasher_overloaded()
 
     if not user:
         raise HTTPException(
@@ -46,7 +78,14 @@ def login(
             detail="Неверное имя пользователя или пароль"
         )
 
-    session_token = auth_service.create_session(user.id)
+    if token_auth_enabled():
+        return TokenResponse(
+            user_id=user.id,
+            username=user.username,
+            **create_token_pair(user)
+        )
+
+    session_token = await run_in_threadpool(auth_service.create_session, user.id)
 
     if not session_token:
         raise HTTPException(
@@ -72,8 +111,11 @@ def logout(
     """
     try:
         scheme, session_token = authorization.split()
-        auth_service = AuthService(db)
-        success = auth_service.logout_user(session_token)
+        if token_auth_enabled():
+            success = revoke_access_token(session_token)
+        else:
+            auth_service = AuthService(db)
+            success = auth_service.logout_user(session_token)
 
         if not success:
             raise HTTPException(
@@ -90,6 +132,44 @@ def logout(
         )
 
 
+@router.post("/refresh", response_model=TokenResponse)
+def refresh(
+        refresh_data: RefreshTokenRequest,
+        db: Session = Depends(get_db)
+):
+    """
+    Обновление пары токенов по токену обновления (только в режиме token)
+    """
+    if not token_auth_enabled():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Обновление токенов доступно только в режиме подписанных токенов"
+        )
+
+    try:
+        payload = rotate_refresh_token(refresh_data.refresh_token)
+    except TokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверный или просроченный токен обновления"
+        )
+
+    auth_service = AuthService(db)
+    user = auth_service.get_user_by_id(int(payload["sub"]))
+
+    if not user or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Пользователь не найден или неактивен"
+        )
+
+    return TokenResponse(
+        user_id=user.id,
+        username=user.username,
+        **create_token_pair(user, session_id=payload["sid"])
+    )
+
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(
         current_user: UserResponse = Depends(get_current_user)
@@ -1,21 +1,267 @@
-import csv
+import json
+import logging
 import os
-from typing import List
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+from celery import Celery
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
-from .crud import StudentManager
+from .auth import AuthService
+from .crud import (
+    BULK_BATCH_SIZE, BULK_SLEEP_SECONDS, StudentManager, BackgroundTaskManager, TaskCancelled, TaskTimedOut
+)
 from .cache import cache
+from .database import SessionLocal
+from .models import BackgroundTask
+from .exporters import export_path, purge_exports
+from .importers import RejectedRowsReport, UploadAborted, iter_csv_rows
 
+logger = logging.getLogger(__name__)
 
-async def load_students_from_csv(db: Session, csv_file_path: str):
+# Срок хранения записей о завершенных задачах
+TASK_RETENTION_HOURS = int(os.getenv("TASK_RETENTION_HOURS", "24"))
+
+# Ограничения одновременно выполняемых задач: по типам ("load_csv=1,upload_csv=1"),
+# для типов без явного лимита и общее для процесса. При TASK_EXECUTOR=local лишние задачи
+# ждут в очереди, не занимая потоков, поэтому не занимают все соединения пула БД
+TASK_CONCURRENCY_LIMITS = os.getenv(
+    "TASK_CONCURRENCY_LIMITS", "load_csv=1,upload_csv=1,delete_students=1,rollback_import=1,export_students=1,"
+    "delete_by_filter=1,update_by_filter=1"
+)
+TASK_CONCURRENCY_DEFAULT = int(os.getenv("TASK_CONCURRENCY_DEFAULT", "1"))
+TASK_MAX_CONCURRENT = int(os.getenv("TASK_MAX_CONCURRENT", "2"))
+# Максимальное время выполнения задачи (0 - без ограничения)
+TASK_TIMEOUT_SECONDS = int(os.getenv("TASK_TIMEOUT_SECONDS", "3600"))
+# Выполняемая задача без обновлений дольше этого срока считается прерванной
+# (например, после перезапуска процесса) и может быть возобновлена
+TASK_STALE_SECONDS = int(os.getenv("TASK_STALE_SECONDS", "600"))
+
+# Где выполняются тяжелые задачи: local - в процессе API, celery - в отдельных воркерах
+TASK_EXECUTOR = os.getenv("TASK_EXECUTOR", "local")
+
+# Настройки Celery. По умолчанию брокер в памяти, для продакшена - Redis,
+# для локальных тестов можно использовать sqla+sqlite:///celery.db
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "memory://")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "cache+memory://")
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", "2"))
+CELERY_TASK_MAX_RETRIES = int(os.getenv("CELERY_TASK_MAX_RETRIES", "3"))
+
+celery_app = Celery("app.background_tasks", broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND)
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    # Задача подтверждается после выполнения и не теряется при падении воркера
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Воркер не забирает из очереди больше задач, чем может выполнить
+    worker_prefetch_multiplier=1,
+    worker_concurrency=CELERY_WORKER_CONCURRENCY,
+    task_always_eager=os.getenv("CELERY_TASK_ALWAYS_EAGER", "False").lower() == "true",
+    # Жесткий предел на случай, если задача перестала проверять свой срок
+    task_time_limit=TASK_TIMEOUT_SECONDS + 60 if TASK_TIMEOUT_SECONDS > 0 else None,
+)
+
+
+def parse_concurrency_limits(value: str) -> Dict[str, int]:
+    """Разбор строки вида "load_csv=1,delete_students=2" """
+    limits = {}
+    for item in value.split(","):
+        if "=" in item:
+            task_type, limit = item.split("=", 1)
+            limits[task_type.strip()] = int(limit)
+    return limits
+
+
+class TaskSlots:
+    """
+    Ограничение числа одновременно выполняемых задач в процессе:
+    отдельно для каждого типа задач и в сумме.
+    """
+
+    def __init__(self, limits: Dict[str, int], default_limit: int, total_limit: int):
+        self.limits = limits
+        self.default_limit = default_limit
+        self.total_limit = total_limit
+        self._running = Counter()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, task_type: str) -> bool:
+        """Занять место для задачи, если оно свободно; не ждет"""
+        with self._lock:
+            limit = self.limits.get(task_type, self.default_limit)
+            if limit > 0 and self._running[task_type] >= limit:
+                return False
+            if self.total_limit > 0 and sum(self._running.values()) >= self.total_limit:
+                return False
+            self._running[task_type] += 1
+            return True
+
+    def release(self, task_type: str) -> None:
+        """Освободить место, занятое задачей"""
+        with self._lock:
+            self._running[task_type] -= 1
+
+
+class LocalTaskQueue:
+    """
+    Очередь задач, выполняемых в процессе API (TASK_EXECUTOR=local).
+
+    Задачи выполняются в собственном пуле потоков, а не в общем пуле Starlette,
+    который нужен синхронным зависимостям и эндпоинтам. Задача, для которой
+    нет свободного места в TaskSlots, ждет в очереди, не занимая поток;
+    освободившееся место получает первая подходящая задача из очереди.
+    """
+
+    def __init__(self, slots: TaskSlots, max_workers: Optional[int] = None):
+        self.slots = slots
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="background-task")
+        self._pending = deque()
+        # Поставленные в очередь и еще не завершившиеся задачи
+        self._unfinished = 0
+        self._lock = threading.Condition()
+
+    def submit(self, task_type: str, func: Callable, *args) -> None:
+        """Поставить задачу в очередь"""
+        with self._lock:
+            self._pending.append((task_type, func, args))
+            self._unfinished += 1
+        self._dispatch()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Ожидание завершения всех поставленных задач; False, если время истекло"""
+        with self._lock:
+            return self._lock.wait_for(lambda: self._unfinished == 0, timeout)
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            ready = [job for job in self._pending if self.slots.try_acquire(job[0])]
+            for job in ready:
+                self._pending.remove(job)
+        for task_type, func, args in ready:
+            self._executor.submit(self._run, task_type, func, args)
+
+    def _run(self, task_type: str, func: Callable, args: tuple) -> None:
+        try:
+            func(*args)
+        except Exception:
+            logger.exception("Ошибка при выполнении фоновой задачи %s", task_type)
+        finally:
+            self.slots.release(task_type)
+            self._dispatch()
+            with self._lock:
+                self._unfinished -= 1
+                self._lock.notify_all()
+
+
+task_slots = TaskSlots(
+    parse_concurrency_limits(TASK_CONCURRENCY_LIMITS), TASK_CONCURRENCY_DEFAULT, TASK_MAX_CONCURRENT
+)
+# Потоков столько, сколько задач может выполняться одновременно
+task_queue = LocalTaskQueue(task_slots, max_workers=TASK_MAX_CONCURRENT or None)
+
+
+class TaskContext:
     """
-    Фоновая задача для загрузки студентов из CSV файла
+    Контекст выполняемой задачи, передается в функцию задачи.
+    Через него задача сообщает о прогрессе в реестр задач.
+    """
+
+    def __init__(
+            self,
+            registry: BackgroundTaskManager,
+            task_id: str,
+            timeout_seconds: Optional[float] = None,
+            checkpoint: Optional[dict] = None
+    ):
+        self.registry = registry
+        self.task_id = task_id
+        # Контрольная точка предыдущего запуска при возобновлении задачи
+        self.checkpoint = checkpoint
+        self.timeout_seconds = TASK_TIMEOUT_SECONDS if timeout_seconds is None else timeout_seconds
+        self.deadline = time.monotonic() + self.timeout_seconds if self.timeout_seconds > 0 else None
+
+    def check_cancelled(self) -> None:
+        """Прервать задачу, если запрошена отмена или истекло время выполнения"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TaskTimedOut(f"Превышено время выполнения задачи ({self.timeout_seconds} с)")
+        if self.registry.is_cancel_requested(self.task_id):
+            raise TaskCancelled()
+
+    def save_checkpoint(self, checkpoint: dict) -> None:
+        """Сохранить контрольную точку в транзакции текущей пачки"""
+        self.registry.save_checkpoint(self.task_id, checkpoint)
+
+    def report_progress(self, progress: dict) -> None:
+        """Сохранить прогресс выполнения задачи и проверить запрос на отмену"""
+        self.registry.update_progress(self.task_id, progress)
+        self.check_cancelled()
+
+
+def execute_registered_task(db: Session, task_id: str, task_func, *args, reraise: tuple = ()):
+    """
+    Выполнение задачи с сохранением статуса и результата в реестре задач.
+    Исключения из reraise пробрасываются без сохранения результата.
+    """
+    registry = BackgroundTaskManager(db)
+    task = registry.get_task(task_id)
+    status = None
+
+    try:
+        if not registry.mark_running(task_id):
+            return {"success": False, "message": "Задача отменена до запуска"}
+        checkpoint = json.loads(task.checkpoint) if task.checkpoint else None
+        result = task_func(db, *args, context=TaskContext(registry, task_id, checkpoint=checkpoint))
+    except TaskTimedOut as e:
+        db.rollback()
+        result = {"success": False, "message": str(e)}
+    except TaskCancelled:
+        db.rollback()
+        result = {"success": False, "message": "Задача отменена"}
+        status = "cancelled"
+    except reraise:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        result = {"success": False, "message": f"Ошибка при выполнении задачи: {str(e)}"}
+
+    registry.finish_task(task_id, result, status)
+    return result
+
+
+def load_students_from_csv(
+        db: Session,
+        csv_file_path: str,
+        file_format: Optional[str] = None,
+        column_map: Optional[Dict[str, str]] = None,
+        context: Optional[TaskContext] = None
+):
+    """
+    Фоновая задача для загрузки студентов из файла CSV, JSON Lines или Parquet
     """
     try:
         if not os.path.exists(csv_file_path):
             return {"success": False, "message": f"Файл {csv_file_path} не найден", "count": 0}
 
         manager = StudentManager(db)
-        count = manager.load_from_csv(csv_file_path)
+        rejects = RejectedRowsReport(context.task_id) if context else None
+        count = manager.load_from_file(
+            csv_file_path,
+            file_format,
+            column_map,
+            progress_callback=context.report_progress if context else None,
+            checkpoint=context.checkpoint if context else None,
+            checkpoint_callback=context.save_checkpoint if context else None,
+            import_batch_id=context.task_id if context else None,
+            rejects=rejects
+        )
+        if rejects:
+            rejects.close()
 
         # Инвалидируем кеш после загрузки новых данных
         cache.delete_pattern("students:*")
@@ -25,9 +271,16 @@ async def load_students_from_csv(db: Session, csv_file_path: str):
         return {
             "success": True,
             "message": f"Успешно загружено {count} записей из {csv_file_path}",
-            "count": count
+            "count": count,
+            "import_batch_id": context.task_id if context else None,
+            "rejected_rows": rejects.summary() if rejects else None
         }
 
+    except (OperationalError, TaskCancelled):
+        # Временные ошибки БД пробрасываются, чтобы задачу можно было повторить,
+        # отмена - чтобы задача завершилась со статусом cancelled
+        raise
+
     except Exception as e:
         return {
             "success": False,
@@ -36,24 +289,171 @@ async def load_students_from_csv(db: Session, csv_file_path: str):
         }
 
 
-async def delete_students_by_ids(db: Session, student_ids: List[int]):
+def import_students_from_stream(db: Session, csv_stream: TextIO, context: Optional[TaskContext] = None):
     """
-    Фоновая задача для удаления студентов по списку ID
+    Импорт студентов из потока CSV, например из загружаемого файла.
+    Если загрузка оборвалась, добавленные строки удаляются: возобновить
+    импорт из потока нельзя, а неполный файл не должен оставаться в БД.
     """
+    manager = StudentManager(db)
     try:
-        manager = StudentManager(db)
-        deleted_count = 0
-
-        for student_id in student_ids:
-            success = manager.delete_student(student_id)
-            if success:
-                deleted_count += 1
+        rejects = RejectedRowsReport(context.task_id) if context else None
+        count = manager.import_rows(
+            iter_csv_rows(csv_stream),
+            progress_callback=context.report_progress if context else None,
+            import_batch_id=context.task_id if context else None,
+            rejects=rejects
+        )
+        if rejects:
+            rejects.close()
 
-        # Инвалидируем кеш после удаления
+        # Инвалидируем кеш после загрузки новых данных
         cache.delete_pattern("students:*")
         cache.delete_pattern("courses:*")
         cache.delete_pattern("faculties:*")
 
+        return {
+            "success": True,
+            "message": f"Успешно загружено {count} записей",
+            "count": count,
+            "import_batch_id": context.task_id if context else None,
+            "rejected_rows": rejects.summary() if rejects else None
+        }
+
+    except UploadAborted as e:
+        db.rollback()
+        removed = manager.delete_import_batch(context.task_id) if context else 0
+        if removed:
+            cache.delete_pattern("students:*")
+            cache.delete_pattern("courses:*")
+            cache.delete_pattern("faculties:*")
+        return {
+            "success": False,
+            "message": f"Загрузка прервана: {str(e)}; добавленные записи удалены ({removed})",
+            "count": 0
+        }
+
+    except (OperationalError, TaskCancelled):
+        raise
+
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Ошибка при загрузке CSV: {str(e)}",
+            "count": 0
+        }
+
+
+def export_students(
+        db: Session,
+        file_format: str = "csv",
+        faculty: Optional[str] = None,
+        course: Optional[str] = None,
+        context: Optional[TaskContext] = None
+):
+    """
+    Фоновая задача выгрузки студентов в файл CSV или Parquet
+    """
+    try:
+        export_id = context.task_id if context else str(uuid.uuid4())
+        file_path = export_path(export_id, file_format)
+        count = StudentManager(db).export_to_file(
+            file_path,
+            file_format,
+            faculty=faculty,
+            course=course,
+            progress_callback=context.report_progress if context else None
+        )
+
+        return {
+            "success": True,
+            "message": f"Выгружено {count} записей",
+            "count": count,
+            "file_format": file_format,
+            "size_bytes": os.path.getsize(file_path),
+            "download_url": f"/background/tasks/{export_id}/download"
+        }
+
+    except (OperationalError, TaskCancelled):
+        raise
+
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Ошибка при выгрузке студентов: {str(e)}",
+            "count": 0
+        }
+
+
+def invalidate_students_cache(changed_rows: List[Tuple[int, str]]) -> None:
+    """
+    Точечная инвалидация кеша после удаления или изменения строк (id, faculty):
+    записи студентов, выборки по их факультетам и общие списки
+    """
+    faculties = {faculty for _, faculty in changed_rows}
+    keys = ["students:all", "courses:all"]
+    keys += [f"students:{student_id}" for student_id, _ in changed_rows]
+    keys += [f"students:faculty:{faculty}" for faculty in faculties]
+    keys += [f"faculties:average:{faculty}" for faculty in faculties]
+    cache.delete_many(keys)
+
+
+def rollback_import(db: Session, import_batch_id: str, context: Optional[TaskContext] = None):
+    """
+    Фоновая задача отката импорта: удаление добавленных им студентов
+    """
+    deleted_count = 0
+    try:
+        manager = StudentManager(db)
+
+        def on_chunk(deleted_rows):
+            nonlocal deleted_count
+            deleted_count += len(deleted_rows)
+            invalidate_students_cache(deleted_rows)
+            if context:
+                context.report_progress({"deleted_count": deleted_count})
+
+        manager.delete_import_batch(import_batch_id, chunk_callback=on_chunk)
+
+        return {
+            "success": True,
+            "message": f"Удалено {deleted_count} студентов, добавленных импортом {import_batch_id}",
+            "deleted_count": deleted_count
+        }
+
+    except (OperationalError, TaskCancelled):
+        raise
+
+    except Exception as e:
+        return {
+            "success": False,
+            "message": f"Ошибка при откате импорта: {str(e)}",
+            "deleted_count": 0
+        }
+
+
+def delete_students_by_ids(db: Session, student_ids: List[int], context: Optional[TaskContext] = None):
+    """
+    Фоновая задача для удаления студентов по списку ID
+    """
+    deleted_count = 0
+    try:
+        manager = StudentManager(db)
+        requested = len(set(student_ids))
+        processed = 0
+
+        def on_chunk(deleted_rows):
+            nonlocal deleted_count, processed
+            deleted_count += len(deleted_rows)
+            processed = min(requested, processed + BULK_BATCH_SIZE)
+            invalidate_students_cache(deleted_rows)
+            if context:
+                context.report_progress({"processed": processed, "deleted_count": deleted_count})
+
+        manager.delete_students_by_ids(
+            student_ids, batch_size=BULK_BATCH_SIZE, sleep_seconds=BULK_SLEEP_SECONDS, chunk_callback=on_chunk
+        )
+
         return {
             "success": True,
             "message": f"Успешно удалено {deleted_count} студентов из {len(student_ids)} запрошенных",
@@ -61,16 +461,122 @@ async def delete_students_by_ids(db: Session, student_ids: List[int]):
             "requested_count": len(student_ids)
         }
 
+    except (OperationalError, TaskCancelled):
+        raise
+
     except Exception as e:
+        # Пачки до ошибки уже зафиксированы
+        db.rollback()
         return {
             "success": False,
             "message": f"Ошибка при удалении студентов: {str(e)}",
-            "deleted_count": 0,
+            "deleted_count": deleted_count,
             "requested_count": len(student_ids)
         }
 
 
-async def delete_all_students(db: Session):
+def delete_students_by_filter(
+        db: Session,
+        filters: dict,
+        batch_size: Optional[int] = None,
+        sleep_seconds: Optional[float] = None,
+        context: Optional[TaskContext] = None
+):
+    """
+    Фоновая задача массового удаления студентов по условиям отбора
+    """
+    deleted_count = 0
+    try:
+        manager = StudentManager(db)
+
+        def on_chunk(deleted_rows):
+            nonlocal deleted_count
+            deleted_count += len(deleted_rows)
+            invalidate_students_cache(deleted_rows)
+            if context:
+                context.report_progress({"deleted_count": deleted_count})
+
+        manager.delete_students_by_filter(
+            filters,
+            batch_size=batch_size or BULK_BATCH_SIZE,
+            sleep_seconds=BULK_SLEEP_SECONDS if sleep_seconds is None else sleep_seconds,
+            chunk_callback=on_chunk
+        )
+
+        return {
+            "success": True,
+            "message": f"Удалено {deleted_count} студентов",
+            "deleted_count": deleted_count
+        }
+
+    except (OperationalError, TaskCancelled):
+        raise
+
+    except Exception as e:
+        # Пачки до ошибки уже зафиксированы
+        db.rollback()
+        return {
+            "success": False,
+            "message": f"Ошибка при удалении студентов: {str(e)}",
+            "deleted_count": deleted_count
+        }
+
+
+def update_students_by_filter(
+        db: Session,
+        filters: dict,
+        changes: dict,
+        batch_size: Optional[int] = None,
+        sleep_seconds: Optional[float] = None,
+        context: Optional[TaskContext] = None
+):
+    """
+    Фоновая задача массового изменения студентов по условиям отбора
+    """
+    updated_count = 0
+    try:
+        manager = StudentManager(db)
+
+        def on_chunk(updated_rows):
+            nonlocal updated_count
+            updated_count += len(updated_rows)
+            invalidate_students_cache(updated_rows)
+            if context:
+                context.report_progress({"updated_count": updated_count})
+
+        manager.update_students_by_filter(
+            filters,
+            changes,
+            batch_size=batch_size or BULK_BATCH_SIZE,
+            sleep_seconds=BULK_SLEEP_SECONDS if sleep_seconds is None else sleep_seconds,
+            chunk_callback=on_chunk
+        )
+
+        if "faculty" in changes:
+            # Прежние факультеты строк неизвестны, поэтому сбрасываются все выборки по факультетам
+            cache.delete_pattern("students:faculty:*")
+            cache.delete_pattern("faculties:*")
+
+        return {
+            "success": True,
+            "message": f"Изменено {updated_count} студентов",
+            "updated_count": updated_count
+        }
+
+    except (OperationalError, TaskCancelled):
+        raise
+
+    except Exception as e:
+        # Пачки до ошибки (например, нарушения уникальности) уже зафиксированы
+        db.rollback()
+        return {
+            "success": False,
+            "message": f"Ошибка при изменении студентов: {str(e)}",
+            "updated_count": updated_count
+        }
+
+
+def delete_all_students(db: Session, context: Optional[TaskContext] = None):
     """
     Фоновая задача для удаления всех студентов
     """
@@ -89,9 +595,222 @@ async def delete_all_students(db: Session):
             "count": count
         }
 
+    except (OperationalError, TaskCancelled):
+        raise
+
     except Exception as e:
         return {
             "success": False,
             "message": f"Ошибка при удалении студентов: {str(e)}",
             "count": 0
-        }
\ No newline at end of file
+        }
+
+
+def run_task_in_new_session(task_id: str, task_func, *args, reraise: tuple = ()):
+    """
+    Выполнение задачи с собственной сессией БД.
+    Сессия запроса к этому моменту уже может быть закрыта, поэтому не используется.
+    """
+    db = SessionLocal()
+    try:
+        return execute_registered_task(db, task_id, task_func, *args, reraise=reraise)
+    finally:
+        db.close()
+
+
+def run_celery_task(celery_task, task_id: str, task_func, *args):
+    """
+    Выполнение задачи в воркере Celery.
+    Временные ошибки БД повторяются с экспоненциальной задержкой.
+    """
+    can_retry = celery_task.request.retries < celery_task.max_retries
+    try:
+        return run_task_in_new_session(
+            task_id, task_func, *args, reraise=(OperationalError,) if can_retry else ()
+        )
+    except OperationalError as e:
+        raise celery_task.retry(exc=e, countdown=2 ** celery_task.request.retries)
+
+
+@celery_app.task(bind=True, name="students.load_csv", max_retries=CELERY_TASK_MAX_RETRIES)
+def load_students_from_csv_task(
+        self,
+        task_id: str,
+        csv_file_path: str,
+        file_format: Optional[str] = None,
+        column_map: Optional[Dict[str, str]] = None
+):
+    """Загрузка студентов из файла в воркере Celery"""
+    return run_celery_task(self, task_id, load_students_from_csv, csv_file_path, file_format, column_map)
+
+
+@celery_app.task(bind=True, name="students.delete_by_ids", max_retries=CELERY_TASK_MAX_RETRIES)
+def delete_students_by_ids_task(self, task_id: str, student_ids: List[int]):
+    """Удаление студентов по списку ID в воркере Celery"""
+    return run_celery_task(self, task_id, delete_students_by_ids, student_ids)
+
+
+@celery_app.task(bind=True, name="students.delete_all", max_retries=CELERY_TASK_MAX_RETRIES)
+def delete_all_students_task(self, task_id: str):
+    """Удаление всех студентов в воркере Celery"""
+    return run_celery_task(self, task_id, delete_all_students)
+
+
+@celery_app.task(bind=True, name="students.rollback_import", max_retries=CELERY_TASK_MAX_RETRIES)
+def rollback_import_task(self, task_id: str, import_batch_id: str):
+    """Откат импорта в воркере Celery"""
+    return run_celery_task(self, task_id, rollback_import, import_batch_id)
+
+
+@celery_app.task(bind=True, name="students.export", max_retries=CELERY_TASK_MAX_RETRIES)
+def export_students_task(
+        self,
+        task_id: str,
+        file_format: str = "csv",
+        faculty: Optional[str] = None,
+        course: Optional[str] = None
+):
+    """Выгрузка студентов в файл в воркере Celery"""
+    return run_celery_task(self, task_id, export_students, file_format, faculty, course)
+
+
+@celery_app.task(bind=True, name="students.delete_by_filter", max_retries=CELERY_TASK_MAX_RETRIES)
+def delete_students_by_filter_task(
+        self,
+        task_id: str,
+        filters: dict,
+        batch_size: Optional[int] = None,
+        sleep_seconds: Optional[float] = None
+):
+    """Массовое удаление студентов по условиям в воркере Celery"""
+    return run_celery_task(self, task_id, delete_students_by_filter, filters, batch_size, sleep_seconds)
+
+
+@celery_app.task(bind=True, name="students.update_by_filter", max_retries=CELERY_TASK_MAX_RETRIES)
+def update_students_by_filter_task(
+        self,
+        task_id: str,
+        filters: dict,
+        changes: dict,
+        batch_size: Optional[int] = None,
+        sleep_seconds: Optional[float] = None
+):
+    """Массовое изменение студентов по условиям в воркере Celery"""
+    return run_celery_task(self, task_id, update_students_by_filter, filters, changes, batch_size, sleep_seconds)
+
+
+CELERY_TASKS = {
+    load_students_from_csv: load_students_from_csv_task,
+    delete_students_by_ids: delete_students_by_ids_task,
+    delete_all_students: delete_all_students_task,
+    rollback_import: rollback_import_task,
+    export_students: export_students_task,
+    delete_students_by_filter: delete_students_by_filter_task,
+    update_students_by_filter: update_students_by_filter_task,
+}
+
+
+def submit_task(task: BackgroundTask, task_func, *args):
+    """
+    Запуск зарегистрированной задачи: в воркерах Celery при TASK_EXECUTOR=celery,
+    иначе в очереди задач процесса API
+    """
+    if TASK_EXECUTOR == "celery":
+        CELERY_TASKS[task_func].apply_async(args=(task.task_id, *args), task_id=task.task_id)
+    else:
+        # Синхронная функция выполняется в пуле очереди со своей сессией БД
+        task_queue.submit(task.task_type, run_task_in_new_session, task.task_id, task_func, *args)
+
+
+def purge_expired_sessions():
+    """
+    Периодическая задача удаления истекших и неактивных сессий
+    """
+    db = SessionLocal()
+    try:
+        removed = AuthService(db).purge_sessions()
+        logger.info("Удалено устаревших сессий: %s", removed)
+        return {"success": True, "removed": removed}
+
+    except Exception as e:
+        logger.exception("Ошибка при очистке сессий")
+        return {"success": False, "message": f"Ошибка при очистке сессий: {str(e)}", "removed": 0}
+
+    finally:
+        db.close()
+
+
+def repair_faculty_aggregates():
+    """
+    Периодическая задача пересчета средних баллов факультетов в кеше.
+    Устаревшие и оставшиеся от удаленных факультетов записи заменяются
+    значениями, посчитанными одним запросом.
+    """
+    db = SessionLocal()
+    try:
+        averages = StudentManager(db).get_average_grades_by_faculties()
+        cache.delete_pattern("faculties:average:*")
+        # Значения и время жизни совпадают с кешируемым ответом эндпоинта
+        for faculty, average_grade in averages.items():
+            cache.set(
+                f"faculties:average:{faculty}",
+                {"faculty": faculty, "average_grade": average_grade},
+                expire=600
+            )
+        logger.info("Пересчитаны средние баллы факультетов: %s", len(averages))
+        return {"success": True, "faculties": len(averages)}
+
+    except Exception as e:
+        logger.exception("Ошибка при пересчете средних баллов факультетов")
+        return {"success": False, "message": f"Ошибка при пересчете средних баллов: {str(e)}"}
+
+    finally:
+        db.close()
+
+
+def warm_up_cache():
+    """
+    Периодическая задача прогрева кеша списка курсов.
+
+    Прогреваются только агрегаты, которые считаются одним запросом без выборки
+    строк: списки студентов по факультетам не загружаются, так как любая запись
+    студента снова сбрасывает их (students:*). Средние баллы факультетов
+    прогревает repair_faculty_aggregates.
+    """
+    db = SessionLocal()
+    try:
+        courses = StudentManager(db).get_unique_courses()
+        # Значение и время жизни совпадают с кешируемым ответом эндпоинта
+        cache.set("courses:all", {"courses": courses}, expire=600)
+        logger.info("Кеш прогрет: курсов %s", len(courses))
+        return {"success": True, "courses": len(courses)}
+
+    except Exception as e:
+        logger.exception("Ошибка при прогреве кеша")
+        return {"success": False, "message": f"Ошибка при прогреве кеша: {str(e)}"}
+
+    finally:
+        db.close()
+
+
+def purge_task_records():
+    """
+    Периодическая задача удаления записей о завершенных фоновых задачах
+    """
+    db = SessionLocal()
+    try:
+        removed = BackgroundTaskManager(db).purge_finished_tasks(TASK_RETENTION_HOURS)
+        removed_reports = RejectedRowsReport.purge_reports(TASK_RETENTION_HOURS)
+        removed_exports = purge_exports(TASK_RETENTION_HOURS)
+        logger.info(
+            "Удалено записей о фоновых задачах: %s, отчетов импорта: %s, файлов экспорта: %s",
+            removed, removed_reports, removed_exports
+        )
+        return {"success": True, "removed": removed}
+
+    except Exception as e:
+        logger.exception("Ошибка при очистке реестра задач")
+        return {"success": False, "message": f"Ошибка при очистке реестра задач: {str(e)}", "removed": 0}
+
+    finally:
+        db.close()
@@ -1,13 +1,16 @@
+import os
 import redis
 import json
 import pickle
-from typing import Any, Optional
+from typing import Any, List, Optional
 from functools import wraps
 
+from redis import asyncio as redis_asyncio
+
 # Настройки Redis
-REDIS_HOST = "localhost"
-REDIS_PORT = 6379
-REDIS_DB = 0
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_DB = int(os.getenv("REDIS_DB", "0"))
 CACHE_EXPIRE_SECONDS = 300  # 5 минут
 
 
@@ -45,6 +48,15 @@ class RedisCache:
         except Exception:
             return False
 
+    def delete_many(self, keys: List[str]) -> bool:
+        """Удалить несколько ключей одной командой"""
+        try:
+            if keys:
+                self.redis_client.delete(*keys)
+            return True
+        except Exception:
+            return False
+
     def delete_pattern(self, pattern: str) -> bool:
         """Удалить все ключи по паттерну"""
         try:
@@ -67,6 +79,11 @@ class RedisCache:
 cache = RedisCache()
 
 
+def create_async_redis_client() -> redis_asyncio.Redis:
+    """Асинхронный клиент Redis с теми же настройками подключения, что и у кеша"""
+    return redis_asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+
+
 def cached(key_pattern: str = None, expire: int = CACHE_EXPIRE_SECONDS):
     """
     Декоратор для кеширования результатов функций
@@ -1,8 +1,40 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import distinct, func, select
-from .models import Student
-import csv
-from typing import List, Optional
+from sqlalchemy import distinct, func, or_, select, update, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from .models import Student, BackgroundTask
+from .exporters import EXPORT_CHUNK_SIZE, write_export
+from .task_events import task_events
+from .importers import (
+    IMPORT_BATCH_SIZE, IMPORT_CHUNK_BYTES, IMPORT_MODE, IMPORT_PARSE_WORKERS,
+    IMPORT_PARSE_ORDERED, IMPORT_POSTGRES_COPY, IMPORT_ROLLBACK_BATCH_SIZE, IMPORT_COPY_COLUMNS,
+    IMPORT_READERS, STUDENT_COLUMNS, STUDENT_NATURAL_KEY, ImportStats,
+    ParsedChunk, RejectedRowsReport, RowValidationError, batched, deduplicate_batch, parse_csv_parallel, parse_student_row, rows_to_copy_buffer,
+    resolve_column_map, resolve_import_format
+)
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Массовые изменения по фильтру: размер пачки (одна транзакция) и пауза между пачками
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_SLEEP_SECONDS = float(os.getenv("BULK_SLEEP_SECONDS", "0"))
+
+# Диалекты с поддержкой INSERT ... ON CONFLICT
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+# Код ошибки PostgreSQL при нарушении уникальности
+PG_UNIQUE_VIOLATION = "23505"
 
 
 class StudentManager:
@@ -27,6 +59,131 @@ class StudentManager:
             self.db.refresh(student)
         return students
 
+    def insert_students_batch(
+            self,
+            students_data: List[dict],
+            mode: str = IMPORT_MODE,
+            commit: bool = True,
+            import_batch_id: Optional[str] = None
+    ) -> int:
+        """
+        Запись пачки студентов без загрузки объектов в сессию.
+        В режиме upsert записи с тем же естественным ключом обновляются,
+        а неизмененные не перезаписываются; в режиме insert существующие записи
+        пропускаются. Возвращает число добавленных и измененных записей.
+        В PostgreSQL используется COPY, в остальных СУБД - один INSERT на пачку.
+        При commit=False фиксацию выполняет вызывающий код.
+
+        Новые записи помечаются import_batch_id; у обновленных метка
+        не меняется, поэтому откат импорта удаляет только добавленные им строки.
+        """
+        if not students_data:
+            return 0
+
+        if mode == "upsert":
+            students_data = deduplicate_batch(students_data)
+        students_data = [{**data, "import_batch_id": import_batch_id} for data in students_data]
+
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql" and IMPORT_POSTGRES_COPY != "off":
+            inserted = self._copy_students_batch(students_data, mode, commit)
+            if inserted is not None:
+                return inserted
+
+        if dialect in UPSERT_INSERTS:
+            result = self.db.execute(self._upsert_statement(UPSERT_INSERTS[dialect], mode), students_data)
+            written = result.rowcount if result.rowcount >= 0 else len(students_data)
+        else:
+            self.db.execute(insert(Student), students_data)
+            written = len(students_data)
+
+        if commit:
+            self.db.commit()
+        return written
+
+    @staticmethod
+    def _upsert_statement(dialect_insert, mode: str = IMPORT_MODE):
+        """INSERT ... ON CONFLICT по естественному ключу"""
+        # Вставка по таблице, а не по модели, возвращает число затронутых строк
+        table = Student.__table__
+        stmt = dialect_insert(table)
+        key_columns = list(STUDENT_NATURAL_KEY)
+        update_columns = [column for column in STUDENT_COLUMNS if column not in STUDENT_NATURAL_KEY]
+        if mode != "upsert" or not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=key_columns)
+
+        return stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: stmt.excluded[column] for column in update_columns},
+            # Повторный импорт тех же данных не переписывает строки
+            where=or_(*(table.c[column] != stmt.excluded[column] for column in update_columns))
+        )
+
+    @staticmethod
+    def _on_conflict_sql(mode: str) -> str:
+        """Условие ON CONFLICT для переноса строк из промежуточной таблицы"""
+        key = ", ".join(STUDENT_NATURAL_KEY)
+        update_columns = [column for column in STUDENT_COLUMNS if column not in STUDENT_NATURAL_KEY]
+        if mode != "upsert" or not update_columns:
+            return f"ON CONFLICT ({key}) DO NOTHING"
+
+        assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+        changed = " OR ".join(f"students.{column} IS DISTINCT FROM EXCLUDED.{column}" for column in update_columns)
+        return f"ON CONFLICT ({key}) DO UPDATE SET {assignments} WHERE {changed}"
+
+    def _copy_students_batch(self, students_data: List[dict], mode: str = IMPORT_MODE, commit: bool = True) -> Optional[int]:
+        """
+        Загрузка пачки через COPY ... FROM STDIN.
+        Возвращает None, если драйвер не поддерживает COPY.
+        """
+        cursor = self.db.connection().connection.cursor()
+        if not hasattr(cursor, "copy_expert"):
+            cursor.close()
+            return None
+
+        columns = ", ".join(IMPORT_COPY_COLUMNS)
+        buffer = rows_to_copy_buffer(students_data, IMPORT_COPY_COLUMNS)
+
+        try:
+            # COPY не умеет разрешать конфликты, поэтому при upsert строки идут через временную таблицу
+            if mode == "upsert" or IMPORT_POSTGRES_COPY == "staging":
+                inserted = self._copy_via_staging(cursor, buffer, mode)
+            else:
+                # Прямой COPY быстрее при загрузке новых записей; если часть пачки уже
+                # есть в таблице, пачка откатывается до точки сохранения и идет через staging
+                cursor.execute("SAVEPOINT students_copy")
+                try:
+                    cursor.copy_expert(f"COPY students ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+                    inserted = len(students_data)
+                except Exception as e:
+                    if getattr(e, "pgcode", None) != PG_UNIQUE_VIOLATION:
+                        raise
+                    cursor.execute("ROLLBACK TO SAVEPOINT students_copy")
+                    buffer.seek(0)
+                    inserted = self._copy_via_staging(cursor, buffer, mode)
+                cursor.execute("RELEASE SAVEPOINT students_copy")
+        finally:
+            cursor.close()
+
+        if commit:
+            self.db.commit()
+        return inserted
+
+    def _copy_via_staging(self, cursor, buffer, mode: str) -> int:
+        """COPY во временную таблицу и перенос строк в students с разрешением конфликтов"""
+        columns = ", ".join(IMPORT_COPY_COLUMNS)
+        # Временная таблица живет в рамках соединения и очищается при фиксации
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS students_staging ON COMMIT DELETE ROWS "
+            f"AS SELECT {columns} FROM students WITH NO DATA"
+        )
+        cursor.copy_expert(f"COPY students_staging ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f"INSERT INTO students ({columns}) "
+            f"SELECT {columns} FROM students_staging {self._on_conflict_sql(mode)}"
+        )
+        return cursor.rowcount
+
     # READ operations
     def get_all_students(self) -> List[Student]:
         """Получение всех студентов"""
@@ -55,12 +212,103 @@ class StudentManager:
         result = self.db.scalar(stmt)
         return round(result, 2) if result else 0.0
 
+    def get_average_grades_by_faculties(self) -> Dict[str, float]:
+        """Средний балл всех факультетов одним запросом"""
+        stmt = select(Student.faculty, func.avg(Student.grade)).group_by(Student.faculty)
+        return {faculty: round(avg, 2) if avg else 0.0 for faculty, avg in self.db.execute(stmt)}
+
     def get_all_faculties(self) -> List[str]:
         """Получение списка всех факультетов"""
         stmt = select(distinct(Student.faculty))
         faculties = self.db.scalars(stmt).all()
         return list(faculties)
 
+    @staticmethod
+    def filter_conditions(
+            faculty: Optional[str] = None,
+            course: Optional[str] = None,
+            grade_gte: Optional[int] = None,
+            grade_lt: Optional[int] = None
+    ) -> list:
+        """Условия отбора студентов; незаданные критерии не ограничивают выборку"""
+        table = Student.__table__
+        conditions = []
+        if faculty is not None:
+            conditions.append(table.c.faculty == faculty)
+        if course is not None:
+            conditions.append(table.c.course == course)
+        if grade_gte is not None:
+            conditions.append(table.c.grade >= grade_gte)
+        if grade_lt is not None:
+            conditions.append(table.c.grade < grade_lt)
+        return conditions
+
+    def export_to_file(
+            self,
+            file_path: str,
+            file_format: str = "csv",
+            faculty: Optional[str] = None,
+            course: Optional[str] = None,
+            chunk_size: int = EXPORT_CHUNK_SIZE,
+            progress_callback: Optional[Callable[[dict], None]] = None
+    ) -> int:
+        """
+        Выгрузка студентов в файл, при необходимости с отбором
+        по факультету и курсу; память ограничена размером пачки chunk_size.
+
+        В PostgreSQL срез читается одним потоковым запросом в отдельном
+        соединении в транзакции REPEATABLE READ вместе с подсчетом строк,
+        поэтому изменения во время выгрузки в файл не попадают.
+        В SQLite незавершенное чтение блокирует запись в файл БД, и прогресс
+        задачи не удалось бы сохранить, поэтому строки читаются пачками
+        по возрастанию id короткими запросами в соединении сессии.
+        """
+        conditions = self.filter_conditions(faculty=faculty, course=course)
+        columns = [Student.__table__.c[column] for column in STUDENT_COLUMNS]
+        count_stmt = select(func.count(Student.id)).where(*conditions)
+        started_at = time.monotonic()
+        total = 0
+
+        def on_chunk(written: int) -> None:
+            if progress_callback:
+                elapsed = time.monotonic() - started_at
+                progress_callback({
+                    "rows_written": written,
+                    "total": total,
+                    "rows_per_sec": round(written / elapsed, 1) if elapsed > 0 else 0.0,
+                })
+
+        if self.db.get_bind().dialect.name != "postgresql":
+            total = self.db.scalar(count_stmt)
+            return write_export(file_path, file_format, self._iter_rows_by_id(conditions, columns, chunk_size), on_chunk)
+
+        with self.db.get_bind().connect() as connection:
+            connection.execution_options(isolation_level="REPEATABLE READ")
+            with connection.begin():
+                total = connection.scalar(count_stmt)
+                result = connection.execution_options(yield_per=chunk_size).execute(
+                    select(*columns).where(*conditions).order_by(Student.id)
+                )
+                chunks = ([tuple(row) for row in partition] for partition in result.partitions())
+                return write_export(file_path, file_format, chunks, on_chunk)
+
+    def _iter_rows_by_id(self, conditions: list, columns: list, chunk_size: int) -> Iterable[List[Tuple]]:
+        """Чтение строк пачками по возрастанию id; каждая пачка - отдельный запрос"""
+        table = Student.__table__
+        last_id = 0
+        while True:
+            rows = self.db.execute(
+                select(table.c.id, *columns)
+                .where(*conditions, table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).all()
+            if rows:
+                last_id = rows[-1][0]
+                yield [tuple(row[1:]) for row in rows]
+            if len(rows) < chunk_size:
+                return
+
     # UPDATE operations
     def update_student(self, student_id: int, student_data) -> Optional[Student]:
         """Обновление данных студента"""
@@ -77,6 +325,24 @@ class StudentManager:
         self.db.refresh(student)
         return student
 
+    def update_students_by_filter(
+            self,
+            filters: dict,
+            changes: dict,
+            batch_size: int = BULK_BATCH_SIZE,
+            sleep_seconds: float = BULK_SLEEP_SECONDS,
+            chunk_callback: Optional[Callable[[List[Tuple[int, str]]], None]] = None
+    ) -> int:
+        """
+        Массовое изменение студентов, отобранных по filters, пачками по batch_size.
+        Возвращает число измененных строк.
+        """
+        table = Student.__table__
+        return self._modify_in_batches(
+            lambda where: update(table).where(where).values(**changes),
+            self.filter_conditions(**filters), batch_size, sleep_seconds, chunk_callback
+        )
+
     # DELETE operations
     def delete_student(self, student_id: int) -> bool:
         """Удаление студента по ID"""
@@ -88,6 +354,33 @@ class StudentManager:
         self.db.commit()
         return True
 
+    def delete_students_by_ids(
+            self,
+            student_ids: List[int],
+            batch_size: int = BULK_BATCH_SIZE,
+            sleep_seconds: float = BULK_SLEEP_SECONDS,
+            chunk_callback: Optional[Callable[[List[Tuple[int, str]]], None]] = None
+    ) -> int:
+        """
+        Удаление студентов по списку ID пачками по batch_size ID: один
+        DELETE ... WHERE id IN (...) на пачку, каждая в своей транзакции.
+        После каждой пачки в chunk_callback передаются (id, faculty) удаленных строк.
+        """
+        table = Student.__table__
+        removed = 0
+        for number, ids in enumerate(batched(dict.fromkeys(student_ids), batch_size)):
+            if number and sleep_seconds > 0:
+                time.sleep(sleep_seconds)
+
+            stmt = delete(table).where(table.c.id.in_(ids)).returning(table.c.id, table.c.faculty)
+            deleted_rows = [tuple(row) for row in self.db.execute(stmt)]
+            self.db.commit()
+
+            removed += len(deleted_rows)
+            if chunk_callback:
+                chunk_callback(deleted_rows)
+        return removed
+
     def delete_all_students(self) -> int:
         """Удаление всех студентов"""
         stmt = select(Student)
@@ -100,40 +393,512 @@ class StudentManager:
         self.db.commit()
         return count
 
+    def delete_students_by_filter(
+            self,
+            filters: dict,
+            batch_size: int = BULK_BATCH_SIZE,
+            sleep_seconds: float = BULK_SLEEP_SECONDS,
+            chunk_callback: Optional[Callable[[List[Tuple[int, str]]], None]] = None
+    ) -> int:
+        """
+        Массовое удаление студентов, отобранных по filters, пачками по batch_size.
+        Возвращает число удаленных строк.
+        """
+        return self._modify_in_batches(
+            lambda where: delete(Student.__table__).where(where),
+            self.filter_conditions(**filters), batch_size, sleep_seconds, chunk_callback
+        )
+
+    def _modify_in_batches(
+            self,
+            make_statement: Callable,
+            conditions: list,
+            batch_size: int,
+            sleep_seconds: float,
+            chunk_callback: Optional[Callable[[List[Tuple[int, str]]], None]] = None
+    ) -> int:
+        """
+        Выполнение UPDATE/DELETE ... WHERE id IN (SELECT id ... LIMIT n) пачками,
+        каждая в своей транзакции. Пачки идут по возрастанию id после последней
+        обработанной строки, поэтому измененные строки, которые все еще подходят
+        под условия, не обрабатываются повторно. Пауза sleep_seconds между пачками
+        ограничивает нагрузку на БД и отставание реплик.
+        После каждой пачки в chunk_callback передаются (id, faculty) затронутых строк.
+        """
+        table = Student.__table__
+        processed = 0
+        last_id = 0
+        while True:
+            batch_ids = (
+                select(table.c.id)
+                .where(*conditions, table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(batch_size)
+            )
+            stmt = make_statement(table.c.id.in_(batch_ids)).returning(table.c.id, table.c.faculty)
+            rows = [tuple(row) for row in self.db.execute(stmt)]
+            self.db.commit()
+
+            processed += len(rows)
+            if rows:
+                last_id = max(student_id for student_id, _ in rows)
+                if chunk_callback:
+                    chunk_callback(rows)
+            if len(rows) < batch_size:
+                return processed
+
+            if sleep_seconds > 0:
+                time.sleep(sleep_seconds)
+
     # CSV operations
-    def load_from_csv(self, csv_file_path: str) -> int:
+    def delete_import_batch(
+            self,
+            import_batch_id: str,
+            batch_size: int = IMPORT_ROLLBACK_BATCH_SIZE,
+            chunk_callback: Optional[Callable[[List[Tuple[int, str]]], None]] = None
+    ) -> int:
+        """
+        Откат импорта: удаление добавленных им строк пачками по индексу import_batch_id.
+        После каждой пачки в chunk_callback передаются (id, faculty) удаленных строк.
+        """
+        table = Student.__table__
+        removed = 0
+        while True:
+            batch_ids = select(table.c.id).where(table.c.import_batch_id == import_batch_id).limit(batch_size)
+            stmt = delete(table).where(table.c.id.in_(batch_ids)).returning(table.c.id, table.c.faculty)
+            deleted_rows = [tuple(row) for row in self.db.execute(stmt)]
+            self.db.commit()
+
+            removed += len(deleted_rows)
+            if deleted_rows and chunk_callback:
+                chunk_callback(deleted_rows)
+            if len(deleted_rows) < batch_size:
+                return removed
+
+    def import_rows(
+            self,
+            rows: Iterable[Tuple[int, dict]],
+            batch_size: int = IMPORT_BATCH_SIZE,
+            progress_callback: Optional[Callable[[dict], None]] = None,
+            checkpoint_callback: Optional[Callable[[ImportStats], None]] = None,
+            stats: Optional[ImportStats] = None,
+            import_batch_id: Optional[str] = None,
+            rejects: Optional[RejectedRowsReport] = None,
+            column_map: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        Потоковый импорт строк пачками с фиксацией после каждой пачки.
+        Память ограничена размером пачки независимо от объема данных.
+        checkpoint_callback вызывается до фиксации, поэтому контрольная точка
+        сохраняется в одной транзакции с пачкой. Отклоненные строки
+        собираются в rejects, столбцы строк сопоставляются полям по column_map.
+        """
+        stats = stats or ImportStats()
+
+        for batch in batched(rows, batch_size):
+            students_data = []
+            for row_num, row in batch:
+                stats.rows_read += 1
+                try:
+                    students_data.append(parse_student_row(row, column_map))
+                except RowValidationError as e:
+                    stats.rejected += 1
+                    if rejects:
+                        rejects.add(row_num, e.field, e.reason)
+
+            stats.inserted += self.insert_students_batch(
+                students_data, commit=False, import_batch_id=import_batch_id
+            )
+            if checkpoint_callback:
+                checkpoint_callback(stats)
+            self.db.commit()
+
+            if progress_callback:
+                progress_callback(stats.to_dict())
+
+        return stats.inserted
+
+    def import_parsed_chunks(
+            self,
+            chunks: Iterable[ParsedChunk],
+            batch_size: int = IMPORT_BATCH_SIZE,
+            progress_callback: Optional[Callable[[dict], None]] = None,
+            checkpoint_callback: Optional[Callable[[ImportStats, int], None]] = None,
+            stats: Optional[ImportStats] = None,
+            import_batch_id: Optional[str] = None,
+            rejects: Optional[RejectedRowsReport] = None
+    ) -> int:
         """
-        Заполнение модели данными из CSV файла
+        Запись уже разобранных и проверенных блоков файла пачками.
+        Номера строк в сообщениях об ошибках сквозные, если блоки идут по порядку.
+        Контрольная точка (конец блока) фиксируется вместе с последней пачкой блока.
         """
-        students_data = []
+        stats = stats or ImportStats()
+
+        for chunk in chunks:
+            if rejects:
+                for row_num, field, reason in chunk.rejected:
+                    rejects.add(stats.rows_read + row_num, field, reason)
+            stats.rows_read += chunk.rows_read
+            stats.rejected += len(chunk.rejected)
+
+            for batch in batched(chunk.rows, batch_size):
+                # Предыдущая пачка фиксируется сразу, последняя - вместе с контрольной точкой
+                self.db.commit()
+                stats.inserted += self.insert_students_batch(
+                    batch, commit=False, import_batch_id=import_batch_id
+                )
+
+            if checkpoint_callback:
+                checkpoint_callback(stats, chunk.end)
+            self.db.commit()
+
+            if progress_callback:
+                progress_callback(stats.to_dict())
+
+        return stats.inserted
+
+    def load_from_file(
+            self,
+            file_path: str,
+            file_format: Optional[str] = None,
+            column_map: Optional[Dict[str, str]] = None,
+            batch_size: int = IMPORT_BATCH_SIZE,
+            progress_callback: Optional[Callable[[dict], None]] = None,
+            parse_workers: int = IMPORT_PARSE_WORKERS,
+            chunk_bytes: int = IMPORT_CHUNK_BYTES,
+            checkpoint: Optional[dict] = None,
+            checkpoint_callback: Optional[Callable[[dict], None]] = None,
+            import_batch_id: Optional[str] = None,
+            rejects: Optional[RejectedRowsReport] = None
+    ) -> int:
+        """
+        Заполнение модели данными из файла CSV, JSON Lines или Parquet.
+        Формат определяется по расширению, если не задан явно; column_map
+        дополняет сопоставление столбцов по умолчанию для формата.
+        При parse_workers > 1 CSV файл разбирается параллельно в пуле процессов.
+
+        После каждой зафиксированной пачки в checkpoint_callback передается
+        контрольная точка (смещение и счетчики). Переданный checkpoint
+        продолжает импорт с сохраненного места. Возвращает общее число
+        записанных строк с учетом предыдущих запусков.
+        Добавленные строки помечаются import_batch_id, отклоненные собираются в rejects;
+        состояние отчета rejects сохраняется в контрольной точке.
+
+        Для отсутствующего файла возвращается 0. При любой другой ошибке
+        незафиксированная пачка откатывается, а исключение пробрасывается:
+        зафиксированные пачки и контрольная точка остаются, и задачу можно возобновить.
+        """
+        checkpoint = checkpoint or {}
+        stats = ImportStats(
+            rows_read=checkpoint.get("rows_read", 0),
+            inserted=checkpoint.get("inserted", 0),
+            rejected=checkpoint.get("rejected", 0)
+        )
+
+        if rejects:
+            rejects.restore(checkpoint.get("rejects") or {})
+
+        def save_checkpoint(offset: int) -> None:
+            if checkpoint_callback:
+                checkpoint_callback({
+                    "offset": offset,
+                    "rows_read": stats.rows_read,
+                    "inserted": stats.inserted,
+                    "rejected": stats.rejected,
+                    "rejects": rejects.checkpoint() if rejects else None
+                })
 
         try:
-            with open(csv_file_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.DictReader(file)
-
-                for row_num, row in enumerate(csv_reader, 1):
-                    try:
-                        student_data = {
-                            'last_name': row['Фамилия'],
-                            'first_name': row['Имя'],
-                            'faculty': row['Факультет'],
-                            'course': row['Курс'],
-                            'grade': int(row['Оценка'])
-                        }
-                        students_data.append(student_data)
-                    except (KeyError, ValueError) as e:
-                        print(f"Ошибка в строке {row_num}: {e}")
-                        continue
-
-            if students_data:
-                students = self.insert_multiple_students(students_data)
-                return len(students)
-            else:
-                return 0
+            file_format = resolve_import_format(file_path, file_format)
+            column_map = resolve_column_map(file_format, column_map)
+
+            if parse_workers > 1 and file_format == "csv":
+                # При разборе не по порядку блоки завершаются вразнобой и смещение не монотонно
+                chunks = parse_csv_parallel(
+                    file_path, parse_workers, chunk_bytes,
+                    start_offset=checkpoint.get("offset", 0), column_map=column_map
+                )
+                return self.import_parsed_chunks(
+                    chunks, batch_size, progress_callback,
+                    checkpoint_callback=(lambda _, end: save_checkpoint(end)) if IMPORT_PARSE_ORDERED else None,
+                    stats=stats,
+                    import_batch_id=import_batch_id,
+                    rejects=rejects
+                )
+
+            reader_class, _ = IMPORT_READERS[file_format]
+            with open(file_path, 'rb') as file:
+                reader = reader_class(file, checkpoint.get("offset", 0), stats.rows_read)
+                return self.import_rows(
+                    reader, batch_size, progress_callback,
+                    checkpoint_callback=lambda _: save_checkpoint(reader.offset),
+                    stats=stats,
+                    import_batch_id=import_batch_id,
+                    rejects=rejects,
+                    column_map=column_map
+                )
 
         except FileNotFoundError:
-            print(f"Файл {csv_file_path} не найден")
+            logger.warning("Файл %s не найден", file_path)
             return 0
-        except Exception as e:
-            print(f"Ошибка при чтении CSV файла: {e}")
-            return 0
\ No newline at end of file
+        except BaseException:
+            self.db.rollback()
+            raise
+
+    def load_from_csv(self, csv_file_path: str, **kwargs) -> int:
+        """Заполнение модели данными из CSV файла"""
+        return self.load_from_file(csv_file_path, "csv", **kwargs)
+
+
+class TaskCancelled(Exception):
+    """Выполнение задачи прервано по запросу пользователя"""
+
+
+class TaskTimedOut(TaskCancelled):
+    """Задача выполняется дольше допустимого времени"""
+
+
+# Статусы, в которых задача еще не завершена
+ACTIVE_TASK_STATUSES = ("pending", "running", "cancelling")
+
+
+class BackgroundTaskManager:
+    """Реестр фоновых задач в таблице background_tasks"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def params_hash(parameters: dict) -> str:
+        """Хеш параметров задачи, не зависящий от порядка ключей"""
+        serialized = json.dumps(parameters, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def create_task(
+            self,
+            task_type: str,
+            parameters: dict,
+            created_by: Optional[int] = None,
+            idempotency_key: Optional[str] = None
+    ) -> BackgroundTask:
+        """Регистрация новой задачи в статусе pending"""
+        task = BackgroundTask(
+            task_id=str(uuid.uuid4()),
+            task_type=task_type,
+            status="pending",
+            parameters=json.dumps(parameters, ensure_ascii=False),
+            created_by=created_by,
+            idempotency_key=idempotency_key,
+            params_hash=self.params_hash(parameters)
+        )
+        self.db.add(task)
+        self.db.commit()
+        self.db.refresh(task)
+        return task
+
+    def find_existing_task(
+            self,
+            task_type: str,
+            parameters: dict,
+            created_by: Optional[int] = None,
+            idempotency_key: Optional[str] = None,
+            match_parameters: bool = True
+    ) -> Optional[BackgroundTask]:
+        """
+        Поиск ранее созданной задачи: по ключу идемпотентности пользователя
+        или среди незавершенных задач того же типа с теми же параметрами
+        """
+        if idempotency_key:
+            stmt = select(BackgroundTask).where(
+                BackgroundTask.created_by == created_by,
+                BackgroundTask.idempotency_key == idempotency_key
+            )
+            task = self.db.scalar(stmt)
+            if task:
+                return task
+
+        if not match_parameters:
+            return None
+
+        stmt = (
+            select(BackgroundTask)
+            .where(
+                BackgroundTask.task_type == task_type,
+                BackgroundTask.params_hash == self.params_hash(parameters),
+                BackgroundTask.status.in_(ACTIVE_TASK_STATUSES)
+            )
+            .order_by(BackgroundTask.id)
+            .limit(1)
+        )
+        return self.db.scalar(stmt)
+
+    def get_or_create_task(
+            self,
+            task_type: str,
+            parameters: dict,
+            created_by: Optional[int] = None,
+            idempotency_key: Optional[str] = None,
+            match_parameters: bool = True
+    ) -> Tuple[BackgroundTask, bool]:
+        """
+        Регистрация задачи без дублей.
+        Возвращает задачу и признак того, что она создана этим вызовом.
+        """
+        args = (task_type, parameters, created_by, idempotency_key)
+        task = self.find_existing_task(*args, match_parameters=match_parameters)
+        if task:
+            return task, False
+
+        try:
+            return self.create_task(*args), True
+        except IntegrityError:
+            # Параллельный запрос с тем же ключом успел создать задачу
+            self.db.rollback()
+            task = self.find_existing_task(*args, match_parameters=False)
+            if task is None:
+                raise
+            return task, False
+
+    def get_task(self, task_id: str) -> Optional[BackgroundTask]:
+        """Получение задачи по ее идентификатору"""
+        stmt = select(BackgroundTask).where(BackgroundTask.task_id == task_id)
+        return self.db.scalar(stmt)
+
+    def _update(self, task_id: str, **values) -> None:
+        # Время изменения задается явно, в том же часовом поясе, что и completed_at
+        values.setdefault("updated_at", datetime.now())
+        stmt = update(BackgroundTask).where(BackgroundTask.task_id == task_id).values(**values)
+        self.db.execute(stmt, execution_options={"synchronize_session": False})
+        self.db.commit()
+
+    def mark_running(self, task_id: str) -> bool:
+        """
+        Перевод задачи в статус running.
+        Возвращает False, если задачу отменили до запуска.
+        """
+        stmt = (
+            update(BackgroundTask)
+            .where(BackgroundTask.task_id == task_id, BackgroundTask.status.in_(("pending", "running")))
+            .values(status="running", updated_at=datetime.now())
+        )
+        result = self.db.execute(stmt, execution_options={"synchronize_session": False})
+        self.db.commit()
+        if result.rowcount == 1:
+            task_events.publish(task_id, "status", {"task_id": task_id, "status": "running"})
+        return result.rowcount == 1
+
+    def request_cancel(self, task_id: str) -> Optional[BackgroundTask]:
+        """
+        Запрос на отмену задачи. Ожидающая задача отменяется сразу,
+        выполняемая переходит в статус cancelling и останавливается между пачками.
+        """
+        stmt = (
+            update(BackgroundTask)
+            .where(BackgroundTask.task_id == task_id, BackgroundTask.status == "pending")
+            .values(status="cancelled", completed_at=datetime.now())
+        )
+        self.db.execute(stmt, execution_options={"synchronize_session": False})
+        stmt = (
+            update(BackgroundTask)
+            .where(BackgroundTask.task_id == task_id, BackgroundTask.status == "running")
+            .values(status="cancelling", updated_at=datetime.now())
+        )
+        self.db.execute(stmt, execution_options={"synchronize_session": False})
+        self.db.commit()
+
+        task = self.get_task(task_id)
+        if task:
+            event = "status" if task.status in ACTIVE_TASK_STATUSES else "finished"
+            task_events.publish(task_id, event, {"task_id": task_id, "status": task.status})
+        return task
+
+    def is_cancel_requested(self, task_id: str) -> bool:
+        """Проверка, запрошена ли отмена задачи"""
+        stmt = select(BackgroundTask.status).where(BackgroundTask.task_id == task_id)
+        status = self.db.scalar(stmt)
+        self.db.commit()
+        return status in ("cancelling", "cancelled")
+
+    def update_progress(self, task_id: str, progress: dict) -> None:
+        """Сохранение промежуточного прогресса задачи"""
+        self._update(task_id, progress=json.dumps(progress, ensure_ascii=False))
+        task_events.publish(task_id, "progress", progress)
+
+    def save_checkpoint(self, task_id: str, checkpoint: dict) -> None:
+        """
+        Сохранение контрольной точки без фиксации:
+        она фиксируется в одной транзакции с записанной пачкой
+        """
+        stmt = (
+            update(BackgroundTask)
+            .where(BackgroundTask.task_id == task_id)
+            .values(checkpoint=json.dumps(checkpoint), updated_at=datetime.now())
+        )
+        self.db.execute(stmt, execution_options={"synchronize_session": False})
+
+    def prepare_resume(self, task_id: str, stale_after_seconds: int) -> bool:
+        """
+        Возврат прерванной задачи в очередь с сохранением контрольной точки.
+        Возобновить можно завершившуюся с ошибкой или отмененную задачу, а также
+        выполняемую, которая не обновлялась stale_after_seconds (процесс перезапущен).
+        """
+        stale_before = datetime.now() - timedelta(seconds=stale_after_seconds)
+        stmt = (
+            update(BackgroundTask)
+            .where(
+                BackgroundTask.task_id == task_id,
+                or_(
+                    BackgroundTask.status.in_(("failed", "cancelled")),
+                    (BackgroundTask.status.in_(("running", "cancelling")) & (BackgroundTask.updated_at < stale_before))
+                )
+            )
+            .values(status="pending", result=None, completed_at=None, updated_at=datetime.now())
+        )
+        result = self.db.execute(stmt, execution_options={"synchronize_session": False})
+        self.db.commit()
+        return result.rowcount == 1
+
+    def finish_task(self, task_id: str, result: dict, status: Optional[str] = None) -> None:
+        """Сохранение результата; по умолчанию статус определяется полем success"""
+        status = status or ("completed" if result.get("success") else "failed")
+        self._update(
+            task_id,
+            status=status,
+            result=json.dumps(result, ensure_ascii=False),
+            completed_at=datetime.now()
+        )
+        task_events.publish(task_id, "finished", {"task_id": task_id, "status": status, "result": result})
+
+    def purge_finished_tasks(self, retention_hours: int, batch_size: int = 1000) -> int:
+        """Удаление записей о завершенных задачах старше срока хранения"""
+        cutoff = datetime.now() - timedelta(hours=retention_hours)
+        removed = 0
+        while True:
+            batch_ids = (
+                select(BackgroundTask.id)
+                .where(BackgroundTask.completed_at < cutoff)
+                .limit(batch_size)
+            )
+            stmt = delete(BackgroundTask).where(BackgroundTask.id.in_(batch_ids))
+            result = self.db.execute(stmt, execution_options={"synchronize_session": False})
+            self.db.commit()
+
+            removed += result.rowcount
+            if result.rowcount < batch_size:
+                return removed
+
+    @staticmethod
+    def to_dict(task: BackgroundTask) -> dict:
+        """Представление задачи для ответа API"""
+        return {
+            "task_id": task.task_id,
+            "task_type": task.task_type,
+            "status": task.status,
+            "parameters": json.loads(task.parameters) if task.parameters else None,
+            "progress": json.loads(task.progress) if task.progress else None,
+            "checkpoint": json.loads(task.checkpoint) if task.checkpoint else None,
+            "result": json.loads(task.result) if task.result else None,
+            "created_at": task.created_at,
+            "completed_at": task.completed_at
+        }
@@ -4,6 +4,7 @@ from typing import Optional
 
 from .database import get_db
 from .auth import AuthService
+from .tokens import token_auth_enabled, get_user_from_access_token
 
 
 def get_current_user(
@@ -31,8 +32,12 @@ def get_current_user(
             detail="Неверный формат заголовка авторизации"
         )
 
-    auth_service = AuthService(db)
-    user = auth_service.get_user_by_session_token(session_token)
+    if token_auth_enabled():
+        # Подписанный токен проверяется без обращения к БД
+        user = get_user_from_access_token(session_token)
+    else:
+        auth_service = AuthService(db)
+        user = auth_service.get_user_by_session_token(session_token)
 
     if not user:
         raise HTTPException(
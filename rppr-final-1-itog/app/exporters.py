@@ -0,0 +1,160 @@
+import csv
+import os
+import tempfile
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from .importers import CSV_COLUMNS, STUDENT_COLUMNS, purge_old_files
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Каталог файлов экспорта и число строк, читаемых и записываемых за один шаг
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "exports"))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+# Размер фрагмента при отдаче файла клиенту
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class CSVExportWriter:
+    """Запись экспорта в CSV с теми же заголовками, что ожидает импорт"""
+
+    extension = "csv"
+    media_type = "text/csv"
+
+    def __init__(self, path: str):
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([CSV_COLUMNS[column] for column in STUDENT_COLUMNS])
+
+    def write(self, rows: Sequence[Sequence]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetExportWriter:
+    """Запись экспорта в Parquet: каждая пачка становится отдельной группой строк"""
+
+    extension = "parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, path: str):
+        if pq is None:
+            raise ImportError("Для экспорта в Parquet нужен пакет pyarrow")
+        self._schema = pa.schema(
+            [(column, pa.string()) for column in STUDENT_COLUMNS if column != 'grade'] + [('grade', pa.int32())]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows: Sequence[Sequence]) -> None:
+        columns = list(zip(*rows))
+        self._writer.write_table(pa.Table.from_arrays(
+            [pa.array(columns[STUDENT_COLUMNS.index(field.name)], field.type) for field in self._schema],
+            schema=self._schema
+        ))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+EXPORT_WRITERS = {
+    "csv": CSVExportWriter,
+    "parquet": ParquetExportWriter,
+}
+
+
+def resolve_export_format(file_format: str) -> str:
+    """Проверка формата экспорта; неподдерживаемый формат - ValueError"""
+    if file_format not in EXPORT_WRITERS:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+    if file_format == "parquet" and pq is None:
+        raise ValueError("Для экспорта в Parquet нужен пакет pyarrow")
+    return file_format
+
+
+def export_path(export_id: str, file_format: str, export_dir: Optional[str] = None) -> str:
+    """Путь к готовому файлу экспорта"""
+    extension = EXPORT_WRITERS[file_format].extension
+    return os.path.join(export_dir or EXPORT_DIR, f"{export_id}.{extension}")
+
+
+def purge_exports(retention_hours: int, export_dir: Optional[str] = None) -> int:
+    """Удаление файлов экспорта старше срока хранения"""
+    return purge_old_files(export_dir or EXPORT_DIR, retention_hours)
+
+
+def parse_byte_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбор заголовка Range с одним диапазоном байтов.
+    Возвращает (start, end) включительно или None, если заголовок не поддерживается
+    и нужно отдать файл целиком. Диапазон вне файла - ValueError (ответ 416).
+    """
+    units, _, spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_value, separator, end_value = spec.strip().partition("-")
+    values = [value for value in (start_value, end_value) if value]
+    if not separator or not values or not all(value.isdigit() for value in values):
+        return None
+
+    if not start_value:
+        # Суффиксный диапазон: последние N байтов
+        suffix_length = int(end_value)
+        if suffix_length == 0 or file_size == 0:
+            raise ValueError("Пустой диапазон")
+        return max(0, file_size - suffix_length), file_size - 1
+
+    start = int(start_value)
+    end = min(int(end_value), file_size - 1) if end_value else file_size - 1
+    if start >= file_size or start > end:
+        raise ValueError("Диапазон вне файла")
+    return start, end
+
+
+def iter_file_range(path: str, start: int, end: int, chunk_bytes: int = DOWNLOAD_CHUNK_BYTES) -> Iterator[bytes]:
+    """Чтение диапазона байтов файла [start, end] фрагментами"""
+    remaining = end - start + 1
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while remaining > 0:
+            data = file.read(min(chunk_bytes, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def write_export(path: str, file_format: str, chunks: Iterator[List[Tuple]], on_chunk=None) -> int:
+    """
+    Запись пачек строк в файл экспорта. Файл пишется под временным именем
+    и переименовывается после успешного завершения, поэтому скачать можно
+    только полный файл. on_chunk(число записанных строк) вызывается после каждой пачки.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f"{path}.part"
+    written = 0
+
+    try:
+        writer = EXPORT_WRITERS[file_format](partial_path)
+        try:
+            for rows in chunks:
+                writer.write(rows)
+                written += len(rows)
+                if on_chunk:
+                    on_chunk(written)
+        finally:
+            writer.close()
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    return written
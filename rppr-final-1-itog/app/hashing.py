@@ -0,0 +1,121 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+
+# Настройки хеширования паролей
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 1)))
+# Максимум одновременно принятых задач (выполняемых и ожидающих), сверх него запросы отклоняются
+BCRYPT_MAX_QUEUE_DEPTH = int(os.getenv("BCRYPT_MAX_QUEUE_DEPTH", str(BCRYPT_WORKERS * 4)))
+
+
+class PasswordHasherOverloaded(Exception):
+    """Очередь хеширования паролей заполнена"""
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    salt = bcrypt.gensalt(rounds=rounds)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+class PasswordHasher:
+    """
+    Выполнение bcrypt в отдельном пуле процессов ограниченного размера.
+
+    Пул не разделяет потоки с обработчиками запросов, а превышение
+    глубины очереди приводит к немедленному отказу вместо ожидания.
+    """
+
+    def __init__(
+            self,
+            max_workers: int = BCRYPT_WORKERS,
+            max_queue_depth: int = BCRYPT_MAX_QUEUE_DEPTH,
+            rounds: int = BCRYPT_ROUNDS
+    ):
+        self.max_workers = max_workers
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_queue_depth) if max_queue_depth > 0 else None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Пул создается при первом обращении, чтобы импорт модуля не порождал процессы
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _submit(self, fn, *args) -> Future:
+        # Без ограничения глубины очереди (max_queue_depth=0) задачи принимаются всегда
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            raise PasswordHasherOverloaded()
+
+        try:
+            future = self._submit_to_pool(fn, *args)
+        except Exception:
+            self._release_slot()
+            raise
+
+        future.add_done_callback(lambda _: self._release_slot())
+        return future
+
+    def _submit_to_pool(self, fn, *args) -> Future:
+        executor = self._get_executor()
+        try:
+            return executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Рабочий процесс аварийно завершился: пул больше не принимает задачи,
+            # поэтому он пересоздается и задача отправляется повторно
+            self._discard_executor(executor)
+            return self._get_executor().submit(fn, *args)
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _release_slot(self) -> None:
+        if self._slots is not None:
+            self._slots.release()
+
+    async def _run(self, fn, *args):
+        future = self._submit(fn, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # Задача была принята пулом, который сломался до ее выполнения
+            return await asyncio.wrap_future(self._submit(fn, *args))
+
+    async def hash(self, password: str) -> str:
+        """Хеширование пароля"""
+        return await self._run(_hash_password, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверка пароля"""
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Остановка пула процессов"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+# Глобальный экземпляр для всего приложения
+password_hasher = PasswordHasher()
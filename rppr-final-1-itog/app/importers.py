@@ -0,0 +1,713 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# Размер пачки строк, фиксируемой одной транзакцией
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+
+# Загрузка в PostgreSQL через COPY: direct - напрямую в students,
+# staging - через временную таблицу с отбором дублей, off - обычные INSERT
+IMPORT_POSTGRES_COPY = os.getenv("IMPORT_POSTGRES_COPY", "direct")
+
+# Параллельный разбор больших файлов: число процессов (0 или 1 - без параллелизма)
+# и размер блока файла, который разбирает один процесс
+IMPORT_PARSE_WORKERS = int(os.getenv("IMPORT_PARSE_WORKERS", "0"))
+IMPORT_CHUNK_BYTES = int(os.getenv("IMPORT_CHUNK_BYTES", str(16 * 1024 * 1024)))
+# False - блоки записываются по мере готовности, без сохранения порядка строк
+IMPORT_PARSE_ORDERED = os.getenv("IMPORT_PARSE_ORDERED", "True").lower() == "true"
+
+# Отклоненные строки: сколько хранится в памяти, прежде чем отчет переносится в файл,
+# и каталог файлов отчетов
+IMPORT_REJECTS_BUFFER_ROWS = int(os.getenv("IMPORT_REJECTS_BUFFER_ROWS", "1000"))
+IMPORT_REPORTS_DIR = os.getenv("IMPORT_REPORTS_DIR", os.path.join(tempfile.gettempdir(), "import_reports"))
+
+# Каталог, из которого разрешено загружать файлы по пути на сервере;
+# пути вне него отклоняются, относительные пути отсчитываются от него
+IMPORT_BASE_DIR = os.getenv("IMPORT_BASE_DIR") or os.path.join(tempfile.gettempdir(), "imports")
+# Сколько фрагментов загружаемого файла может ждать записи в БД
+UPLOAD_QUEUE_CHUNKS = int(os.getenv("UPLOAD_QUEUE_CHUNKS", "16"))
+
+# Соответствие полей модели Student заголовкам CSV
+CSV_COLUMNS = {
+    'last_name': 'Фамилия',
+    'first_name': 'Имя',
+    'faculty': 'Факультет',
+    'course': 'Курс',
+    'grade': 'Оценка',
+}
+# В JSON Lines и Parquet по умолчанию ключи совпадают с полями модели
+FIELD_COLUMNS = {field: field for field in CSV_COLUMNS}
+
+# Ограничения полей совпадают со схемой StudentBase
+STRING_FIELD_MAX_LENGTH = {
+    'last_name': 50,
+    'first_name': 50,
+    'faculty': 50,
+    'course': 100,
+}
+GRADE_MIN = 0
+GRADE_MAX = 100
+
+# Порядок столбцов при загрузке через COPY
+STUDENT_COLUMNS = tuple(CSV_COLUMNS)
+# Столбцы COPY вместе с меткой импорта, которой помечаются загруженные строки
+IMPORT_COPY_COLUMNS = STUDENT_COLUMNS + ('import_batch_id',)
+# Размер пачки при откате импорта
+IMPORT_ROLLBACK_BATCH_SIZE = int(os.getenv("IMPORT_ROLLBACK_BATCH_SIZE", "10000"))
+
+# Режим импорта: upsert - обновление существующих записей по естественному ключу,
+# insert - только добавление новых записей, существующие пропускаются без изменений
+IMPORT_MODE = os.getenv("IMPORT_MODE", "upsert")
+if IMPORT_MODE not in ("upsert", "insert"):
+    raise ValueError(f"Неизвестный режим импорта IMPORT_MODE: {IMPORT_MODE}")
+# Естественный ключ студента; совпадает со столбцами уникального индекса
+# uq_students_natural_key (модель Student, миграция 0006), по которому работает ON CONFLICT
+STUDENT_NATURAL_KEY = ('last_name', 'first_name', 'faculty', 'course')
+
+
+def purge_old_files(directory: str, retention_hours: int) -> int:
+    """Удаление файлов каталога, измененных раньше срока хранения"""
+    if not os.path.isdir(directory):
+        return 0
+
+    cutoff = time.time() - retention_hours * 3600
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+class RowValidationError(ValueError):
+    """Некорректное значение в строке файла импорта"""
+
+    def __init__(self, field: str, reason: str):
+        super().__init__(f"{field}: {reason}")
+        self.field = field
+        self.reason = reason
+
+
+def parse_student_row(row: dict, column_map: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Проверка и нормализация строки файла импорта.
+    column_map сопоставляет поля модели столбцам источника (по умолчанию CSV_COLUMNS).
+    Выбрасывает RowValidationError с названием столбца и причиной.
+    """
+    column_map = column_map or CSV_COLUMNS
+    if not isinstance(row, dict):
+        raise RowValidationError("", "строка не является объектом")
+
+    for column in column_map.values():
+        if column not in row:
+            raise RowValidationError(column, "нет столбца в заголовке файла")
+
+    student_data = {}
+    for field, max_length in STRING_FIELD_MAX_LENGTH.items():
+        column = column_map[field]
+        value = row[column]
+        value = '' if value is None else str(value).strip()
+        if not value:
+            raise RowValidationError(column, "пустое значение")
+        if len(value) > max_length:
+            raise RowValidationError(column, f"длиннее {max_length} символов")
+        student_data[field] = value
+
+    column = column_map['grade']
+    grade_value = row[column]
+    if grade_value is None:
+        raise RowValidationError(column, "пустое значение")
+    # JSON и Parquet передают числа, CSV - строки; дробные и логические значения отклоняются
+    if isinstance(grade_value, bool) or not isinstance(grade_value, (int, str)):
+        raise RowValidationError(column, f"не целое число: {grade_value!r}")
+    try:
+        grade = int(grade_value)
+    except ValueError:
+        raise RowValidationError(column, f"не целое число: {grade_value!r}")
+    if not GRADE_MIN <= grade <= GRADE_MAX:
+        raise RowValidationError(column, f"{grade} вне диапазона {GRADE_MIN}..{GRADE_MAX}")
+    student_data['grade'] = grade
+
+    return student_data
+
+
+class RejectedRowsReport:
+    """
+    Отчет об отклоненных строках импорта: номер строки, столбец и причина.
+
+    Первые max_buffered строк хранятся в памяти. При переполнении буфер
+    дописывается в CSV файл отчета, поэтому память ограничена при любом
+    числе ошибок. Состояние отчета сохраняется в контрольной точке импорта
+    (checkpoint), и при возобновлении отчет продолжается с нее (restore).
+    """
+
+    HEADER = ("row", "field", "reason")
+
+    def __init__(
+            self,
+            report_id: str,
+            max_buffered: Optional[int] = None,
+            reports_dir: Optional[str] = None
+    ):
+        self.path = self.report_path(report_id, reports_dir)
+        self.max_buffered = max_buffered or IMPORT_REJECTS_BUFFER_ROWS
+        self.total = 0
+        self.by_field = Counter()
+        self.rows: List[Tuple[int, str, str]] = []
+        self.spilled = os.path.exists(self.path)
+
+    @staticmethod
+    def report_path(report_id: str, reports_dir: Optional[str] = None) -> str:
+        """Путь к файлу отчета"""
+        return os.path.join(reports_dir or IMPORT_REPORTS_DIR, f"{report_id}.csv")
+
+    @classmethod
+    def rows_to_csv(cls, rows: Iterable) -> str:
+        """Отчет, хранящийся в результате задачи, в формате CSV"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(cls.HEADER)
+        writer.writerows(rows)
+        return buffer.getvalue()
+
+    @staticmethod
+    def purge_reports(retention_hours: int, reports_dir: Optional[str] = None) -> int:
+        """Удаление файлов отчетов старше срока хранения"""
+        return purge_old_files(reports_dir or IMPORT_REPORTS_DIR, retention_hours)
+
+    def add(self, row_num: int, field: str, reason: str) -> None:
+        """Добавить отклоненную строку"""
+        self.total += 1
+        self.by_field[field] += 1
+        self.rows.append((row_num, field, reason))
+        if len(self.rows) >= self.max_buffered:
+            self._spill()
+
+    def _spill(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        with open(self.path, 'a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            if is_new:
+                writer.writerow(self.HEADER)
+            writer.writerows(self.rows)
+        self.rows = []
+        self.spilled = True
+
+    def checkpoint(self) -> dict:
+        """Состояние отчета для контрольной точки: счетчики, буфер и размер файла"""
+        return {
+            "total": self.total,
+            "by_field": dict(self.by_field),
+            "rows": [list(row) for row in self.rows],
+            "offset": os.path.getsize(self.path) if self.spilled else 0,
+        }
+
+    def restore(self, state: dict) -> None:
+        """
+        Продолжение отчета с контрольной точки. Строки, записанные в файл
+        после нее, отбрасываются: их пачки не зафиксированы и будут прочитаны заново.
+        Пустое состояние начинает отчет с начала.
+        """
+        self.total = state.get("total", 0)
+        self.by_field = Counter(state.get("by_field", {}))
+        self.rows = [tuple(row) for row in state.get("rows", [])]
+        offset = state.get("offset", 0)
+        self.spilled = bool(offset) and os.path.exists(self.path)
+        if self.spilled:
+            with open(self.path, 'r+b') as file:
+                file.truncate(offset)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self) -> None:
+        """Дописать остаток буфера, если отчет уже перенесен в файл"""
+        if self.spilled and self.rows:
+            self._spill()
+
+    def summary(self) -> dict:
+        """Сводка для результата задачи; небольшой отчет включается целиком"""
+        return {
+            "total": self.total,
+            "by_field": dict(self.by_field),
+            "in_file": self.spilled,
+            "rows": [] if self.spilled else [list(row) for row in self.rows],
+        }
+
+
+def iter_csv_rows(file: TextIO) -> Iterator[Tuple[int, dict]]:
+    """Потоковое чтение CSV: пары (номер строки данных, словарь значений)"""
+    return enumerate(csv.DictReader(file), 1)
+
+
+class CheckpointedCSVReader:
+    """
+    Чтение CSV из файла с отслеживанием смещения в байтах.
+
+    После выдачи строки offset указывает на ее конец в файле (с учетом
+    переводов строк внутри кавычек), поэтому чтение можно продолжить
+    с сохраненного смещения.
+    """
+
+    def __init__(self, file: BinaryIO, offset: int = 0, row_num: int = 0):
+        self._file = file
+        header = file.readline()
+        self.fieldnames = next(csv.reader([header.decode('utf-8')]), [])
+        if offset:
+            file.seek(offset)
+        self.offset = file.tell()
+        self.row_num = row_num
+
+    def _lines(self) -> Iterator[str]:
+        for line in self._file:
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def __iter__(self) -> Iterator[Tuple[int, dict]]:
+        for row in csv.DictReader(self._lines(), fieldnames=self.fieldnames):
+            self.row_num += 1
+            yield self.row_num, row
+
+
+class JSONLinesReader:
+    """
+    Чтение JSON Lines (NDJSON) с отслеживанием смещения в байтах.
+    Пустые строки пропускаются, строка с некорректным JSON выдается как None
+    и отклоняется при проверке.
+    """
+
+    def __init__(self, file: BinaryIO, offset: int = 0, row_num: int = 0):
+        self._file = file
+        if offset:
+            file.seek(offset)
+        self.offset = file.tell()
+        self.row_num = row_num
+
+    def __iter__(self) -> Iterator[Tuple[int, Optional[dict]]]:
+        for line in self._file:
+            self.offset += len(line)
+            if not line.strip():
+                continue
+            self.row_num += 1
+            try:
+                yield self.row_num, json.loads(line)
+            except ValueError:
+                yield self.row_num, None
+
+
+class ParquetReader:
+    """
+    Чтение Parquet по группам строк (row groups): в памяти одна группа,
+    а не весь файл. Смещение offset - число уже прочитанных строк;
+    при возобновлении целиком пропущенные группы не читаются.
+    """
+
+    def __init__(self, file: BinaryIO, offset: int = 0, row_num: int = 0):
+        if pq is None:
+            raise ImportError("Для импорта Parquet нужен пакет pyarrow")
+        self._parquet = pq.ParquetFile(file)
+        self.offset = offset
+        self.row_num = row_num
+
+    def __iter__(self) -> Iterator[Tuple[int, dict]]:
+        skip = self.offset
+        for index in range(self._parquet.num_row_groups):
+            group_rows = self._parquet.metadata.row_group(index).num_rows
+            if skip >= group_rows:
+                skip -= group_rows
+                continue
+
+            table = self._parquet.read_row_group(index).slice(skip)
+            skip = 0
+            for row in table.to_pylist():
+                self.offset += 1
+                self.row_num += 1
+                yield self.row_num, row
+
+
+# Читатели форматов импорта: класс с конструктором (file, offset, row_num),
+# выдающий пары (номер строки, словарь значений), и сопоставление столбцов по умолчанию
+IMPORT_READERS = {
+    "csv": (CheckpointedCSVReader, CSV_COLUMNS),
+    "jsonl": (JSONLinesReader, FIELD_COLUMNS),
+    "parquet": (ParquetReader, FIELD_COLUMNS),
+}
+IMPORT_FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".parquet": "parquet",
+}
+
+
+def register_import_reader(file_format: str, reader_class, default_column_map: Dict[str, str], *extensions: str) -> None:
+    """Подключение читателя дополнительного формата"""
+    IMPORT_READERS[file_format] = (reader_class, default_column_map)
+    for extension in extensions:
+        IMPORT_FORMAT_EXTENSIONS[extension.lower()] = file_format
+
+
+def resolve_import_format(file_path: str, file_format: Optional[str] = None) -> str:
+    """
+    Формат файла: явно заданный или по расширению (неизвестное расширение - CSV).
+    Выбрасывает ValueError, если формат не поддерживается.
+    """
+    if file_format is None:
+        extension = os.path.splitext(file_path)[1].lower()
+        file_format = IMPORT_FORMAT_EXTENSIONS.get(extension, "csv")
+
+    if file_format not in IMPORT_READERS:
+        raise ValueError(f"Неподдерживаемый формат импорта: {file_format}")
+    if file_format == "parquet" and pq is None:
+        raise ValueError("Для импорта Parquet нужен пакет pyarrow")
+    return file_format
+
+
+def resolve_column_map(file_format: str, overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Сопоставление полей модели столбцам источника: значения по умолчанию
+    для формата, дополненные переданными. Неизвестные поля - ValueError.
+    """
+    overrides = overrides or {}
+    unknown_fields = set(overrides) - set(STUDENT_COLUMNS)
+    if unknown_fields:
+        raise ValueError(f"Неизвестные поля в сопоставлении столбцов: {sorted(unknown_fields)}")
+    return {**IMPORT_READERS[file_format][1], **overrides}
+
+
+def resolve_import_path(csv_file_path: str) -> Optional[str]:
+    """
+    Проверка пути к файлу на сервере.
+    Возвращает абсолютный путь или None, если файл вне IMPORT_BASE_DIR.
+    """
+    base_dir = os.path.realpath(IMPORT_BASE_DIR)
+    resolved_path = os.path.realpath(os.path.join(base_dir, csv_file_path))
+    if os.path.commonpath([base_dir, resolved_path]) != base_dir:
+        return None
+    return resolved_path
+
+
+def rows_to_copy_buffer(students_data: List[dict], columns: Tuple[str, ...] = STUDENT_COLUMNS) -> io.StringIO:
+    """
+    Сериализация пачки нормализованных строк в CSV для COPY ... FROM STDIN.
+    None записывается пустым полем без кавычек, которое COPY читает как NULL.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([data[column] for column in columns] for data in students_data)
+    buffer.seek(0)
+    return buffer
+
+
+def deduplicate_batch(students_data: List[dict], key_columns: Tuple[str, ...] = STUDENT_NATURAL_KEY) -> List[dict]:
+    """
+    Удаление повторов естественного ключа внутри пачки; сохраняется последняя строка.
+    Один INSERT ... ON CONFLICT не может изменить одну запись дважды.
+    """
+    unique_rows = {}
+    for data in students_data:
+        unique_rows[tuple(data[column] for column in key_columns)] = data
+    return list(unique_rows.values())
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Разбиение итератора на списки длиной не более size"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ImportStats:
+    """Счетчики импорта для отчета о прогрессе"""
+
+    def __init__(self, rows_read: int = 0, inserted: int = 0, rejected: int = 0):
+        self.rows_read = rows_read
+        self.inserted = inserted
+        self.rejected = rejected
+        self.started_at = time.monotonic()
+        self._rows_at_start = rows_read
+
+    def to_dict(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        rows_this_run = self.rows_read - self._rows_at_start
+        return {
+            "rows_read": self.rows_read,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "rows_per_sec": round(rows_this_run / elapsed, 1) if elapsed > 0 else 0.0,
+            "elapsed_sec": round(elapsed, 2),
+        }
+
+
+class ParsedChunk(NamedTuple):
+    """Результат разбора одного блока файла"""
+    start: int
+    end: int
+    rows_read: int
+    rows: List[dict]
+    rejected: List[Tuple[int, str, str]]
+
+
+def split_csv_byte_ranges(
+        csv_file_path: str,
+        chunk_bytes: int = IMPORT_CHUNK_BYTES,
+        start_offset: int = 0
+) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Разбиение файла на диапазоны байтов, выровненные по границам строк.
+    Возвращает заголовок и список диапазонов (start, end) для строк данных,
+    начиная с start_offset, если он задан.
+
+    Файл читается последовательно с подсчетом кавычек: граница блока
+    переносится на конец строки, пока внутри значения в кавычках остается
+    открытым перевод строки, поэтому многострочные значения не разрезаются.
+    """
+    file_size = os.path.getsize(csv_file_path)
+    ranges = []
+
+    with open(csv_file_path, 'rb') as file:
+        header_line = file.readline()
+        fieldnames = next(csv.reader([header_line.decode('utf-8')]))
+        start = max(file.tell(), start_offset)
+        file.seek(start)
+        in_quotes = False
+
+        while start < file_size:
+            block = file.read(chunk_bytes)
+            in_quotes ^= block.count(b'"') % 2 == 1
+            while file.tell() < file_size:
+                line = file.readline()
+                in_quotes ^= line.count(b'"') % 2 == 1
+                if not in_quotes:
+                    break
+            end = file.tell()
+            ranges.append((start, end))
+            start = end
+
+    return fieldnames, ranges
+
+
+def parse_csv_chunk(
+        csv_file_path: str,
+        start: int,
+        end: int,
+        fieldnames: List[str],
+        column_map: Optional[Dict[str, str]] = None
+) -> ParsedChunk:
+    """Разбор и проверка одного блока файла (выполняется в процессе пула)"""
+    with open(csv_file_path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode('utf-8')
+
+    rows = []
+    rejected = []
+    rows_read = 0
+    for row_num, row in enumerate(csv.DictReader(io.StringIO(text, newline=''), fieldnames=fieldnames), 1):
+        rows_read += 1
+        try:
+            rows.append(parse_student_row(row, column_map))
+        except RowValidationError as e:
+            rejected.append((row_num, e.field, e.reason))
+
+    return ParsedChunk(start, end, rows_read, rows, rejected)
+
+
+def parse_csv_parallel(
+        csv_file_path: str,
+        workers: int,
+        chunk_bytes: int = IMPORT_CHUNK_BYTES,
+        ordered: bool = IMPORT_PARSE_ORDERED,
+        start_offset: int = 0,
+        column_map: Optional[Dict[str, str]] = None
+) -> Iterator[ParsedChunk]:
+    """
+    Параллельный разбор CSV в пуле процессов.
+
+    Одновременно в работе не больше 2 * workers блоков, поэтому память
+    ограничена даже при медленной записи в БД. При ordered=True блоки
+    отдаются в порядке следования в файле, иначе - по мере готовности.
+    """
+    fieldnames, ranges = split_csv_byte_ranges(csv_file_path, chunk_bytes, start_offset)
+    max_in_flight = workers * 2
+    pending_ranges = iter(ranges)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        def submit_next():
+            byte_range = next(pending_ranges, None)
+            if byte_range is None:
+                return None
+            return executor.submit(parse_csv_chunk, csv_file_path, *byte_range, fieldnames, column_map)
+
+        in_flight = deque()
+        while len(in_flight) < max_in_flight and (future := submit_next()):
+            in_flight.append(future)
+
+        while in_flight:
+            if ordered:
+                done = [in_flight.popleft()]
+            else:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.remove(future)
+
+            for future in done:
+                yield future.result()
+                if next_future := submit_next():
+                    in_flight.append(next_future)
+
+
+class UploadAborted(Exception):
+    """Загрузка файла прервана до конца тела запроса"""
+
+
+class _QueueReader(io.RawIOBase):
+    """
+    Поток байтов, читаемый из очереди фрагментов (None - конец данных).
+    Исключение из очереди выбрасывается читателю, например при обрыве загрузки.
+    """
+
+    def __init__(self, chunks: queue.Queue):
+        self._chunks = chunks
+        self._buffer = b""
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer and not self._eof:
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+            elif isinstance(chunk, Exception):
+                raise chunk
+            else:
+                self._buffer = chunk
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class MultipartUploadStream:
+    """
+    Потоковый разбор тела multipart/form-data.
+
+    Содержимое первого файлового поля передается через ограниченную очередь
+    в текстовый поток, который читает конвейер импорта в другом потоке.
+    Файл не сохраняется ни на диск, ни целиком в память. Конец файла
+    передается читателю, только если получена завершающая граница multipart;
+    иначе загрузка прерывается (abort) и читатель получает UploadAborted.
+    """
+
+    def __init__(self, boundary: bytes, max_queued_chunks: int = UPLOAD_QUEUE_CHUNKS):
+        self.filename: Optional[str] = None
+        self._chunks = queue.Queue(maxsize=max_queued_chunks)
+        self._consumer_done = threading.Event()
+        self._ready = []
+        self._header_field = b""
+        self._header_value = b""
+        self._part_is_file = False
+        self._file_seen = False
+        # Получена завершающая граница: тело запроса принято целиком
+        self.complete = False
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_end": self._on_end,
+        })
+
+    @staticmethod
+    def get_boundary(content_type: str) -> Optional[bytes]:
+        """Граница multipart из заголовка Content-Type"""
+        media_type, options = parse_options_header(content_type)
+        if media_type != b"multipart/form-data":
+            return None
+        return options.get(b"boundary")
+
+    def _on_part_begin(self):
+        self._part_is_file = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_field.lower() == b"content-disposition":
+            _, options = parse_options_header(self._header_value)
+            if b"filename" in options and not self._file_seen:
+                self._part_is_file = True
+                self.filename = options[b"filename"].decode("utf-8", errors="replace")
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._part_is_file:
+            self._ready.append(data[start:end])
+
+    def _on_part_end(self):
+        if self._part_is_file:
+            self._file_seen = True
+            self._part_is_file = False
+
+    def _on_end(self):
+        self.complete = True
+
+    def feed(self, body_chunk: bytes) -> List[bytes]:
+        """Разобрать очередной фрагмент тела запроса; возвращает данные файла"""
+        self._parser.write(body_chunk)
+        ready, self._ready = self._ready, []
+        return ready
+
+    def put(self, data: bytes) -> bool:
+        """
+        Передать данные читателю, ожидая свободного места в очереди.
+        Возвращает False, если читатель уже завершил работу.
+        """
+        while not self._consumer_done.is_set():
+            try:
+                self._chunks.put(data, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self) -> None:
+        """Сообщить читателю о конце файла"""
+        self.put(None)
+
+    def abort(self, reason: str) -> None:
+        """Прервать чтение: читатель получит UploadAborted вместо конца файла"""
+        self.put(UploadAborted(reason))
+
+    def consumer_finished(self) -> None:
+        """Отметить, что читатель больше не забирает данные"""
+        self._consumer_done.set()
+
+    def text_stream(self) -> TextIO:
+        """Текстовый поток содержимого файла для csv.DictReader"""
+        return io.TextIOWrapper(io.BufferedReader(_QueueReader(self._chunks)), encoding="utf-8", newline="")
@@ -6,18 +6,48 @@ from dotenv import load_dotenv
 from .database import create_tables, engine
 from .models import Base
 from .api import app as api_router
+from .background_tasks import purge_expired_sessions, purge_task_records, repair_faculty_aggregates, warm_up_cache
+from .scheduler import SCHEDULER_ENABLED, parse_schedule, scheduler
+from .tokens import revoked_tokens, token_auth_enabled, validate_token_settings
 
 # Загрузка переменных окружения
 load_dotenv()
 
+# Расписания периодических задач обслуживания: интервал в секундах
+# или выражение cron из пяти полей (пусто или 0 - отключено)
+SESSION_GC_SCHEDULE = os.getenv("SESSION_GC_SCHEDULE", os.getenv("SESSION_GC_INTERVAL_SECONDS", "3600"))
+TASK_PURGE_SCHEDULE = os.getenv("TASK_PURGE_SCHEDULE", os.getenv("TASK_PURGE_INTERVAL_SECONDS", "3600"))
+FACULTY_AGGREGATES_SCHEDULE = os.getenv("FACULTY_AGGREGATES_SCHEDULE", "*/30 * * * *")
+# Прогрев кеша по умолчанию отключен
+CACHE_WARMUP_SCHEDULE = os.getenv("CACHE_WARMUP_SCHEDULE", "")
+
+
+def register_maintenance_jobs() -> None:
+    """Регистрация задач обслуживания в планировщике"""
+    scheduler.add_job("purge_expired_sessions", purge_expired_sessions, parse_schedule(SESSION_GC_SCHEDULE))
+    scheduler.add_job("purge_task_records", purge_task_records, parse_schedule(TASK_PURGE_SCHEDULE))
+    scheduler.add_job(
+        "repair_faculty_aggregates", repair_faculty_aggregates, parse_schedule(FACULTY_AGGREGATES_SCHEDULE)
+    )
+    scheduler.add_job("warm_up_cache", warm_up_cache, parse_schedule(CACHE_WARMUP_SCHEDULE))
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting Student Management API...")
+    validate_token_settings()
     create_tables()
     print("✅ Database tables created")
+    if SCHEDULER_ENABLED:
+        register_maintenance_jobs()
+        scheduler.start()
+    if token_auth_enabled():
+        revoked_tokens.start()
     yield
     # Shutdown
+    await scheduler.stop()
+    revoked_tokens.stop()
     print("👋 Shutting down Student Management API...")
 
 app = FastAPI(
@@ -30,7 +60,7 @@ app = FastAPI(
 )
 
 # Подключение роутеров
-app.include_router(api_router)
+app.include_router(api_router.router)
 
 @app.get("/")
 async def root():
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -13,19 +14,28 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    sessions = relationship("UserSession", back_populates="user", passive_deletes=True)
+
     def __repr__(self):
         return f"<User(id={self.id}, username={self.username})>"
 
 
 class UserSession(Base):
     __tablename__ = 'user_sessions'
+    __table_args__ = (
+        Index('ix_user_sessions_user_id_is_active', 'user_id', 'is_active'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     session_token = Column(String(255), unique=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     is_active = Column(Boolean, default=True)
+    # Когда сессия была деактивирована (выход или вытеснение новой сессией)
+    deactivated_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    user = relationship("User", back_populates="sessions")
 
     def __repr__(self):
         return f"<UserSession(user_id={self.user_id}, active={self.is_active})>"
@@ -33,6 +43,10 @@ class UserSession(Base):
 
 class Student(Base):
     __tablename__ = 'students'
+    __table_args__ = (
+        # Естественный ключ для импорта с обновлением (INSERT ... ON CONFLICT)
+        Index('uq_students_natural_key', 'last_name', 'first_name', 'faculty', 'course', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     last_name = Column(String(50), nullable=False)
@@ -41,6 +55,8 @@ class Student(Base):
     course = Column(String(100), nullable=False)
     grade = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Идентификатор задачи импорта, добавившей запись; по нему импорт можно откатить
+    import_batch_id = Column(String(36), nullable=True, index=True)
 
     def __repr__(self):
         return f"<Student(id={self.id}, {self.last_name} {self.first_name}, grade={self.grade})>"
@@ -48,16 +64,45 @@ class Student(Base):
 
 class BackgroundTask(Base):
     __tablename__ = 'background_tasks'
+    __table_args__ = (
+        # Повтор запроса с тем же ключом возвращает уже созданную задачу
+        Index('ix_background_tasks_created_by_idempotency_key', 'created_by', 'idempotency_key', unique=True),
+        # Поиск выполняемой задачи с теми же параметрами
+        Index('ix_background_tasks_task_type_params_hash', 'task_type', 'params_hash'),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     task_id = Column(String(36), unique=True, nullable=False)
     task_type = Column(String(50), nullable=False)
     status = Column(String(20), nullable=False, default='pending')
     parameters = Column(Text)
+    progress = Column(Text)
+    checkpoint = Column(Text)
     result = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    completed_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    completed_at = Column(DateTime(timezone=True), index=True)
     created_by = Column(Integer, nullable=True)
+    idempotency_key = Column(String(255), nullable=True)
+    params_hash = Column(String(64), nullable=True)
+
+    def __repr__(self):
+        return f"<BackgroundTask(id={self.id}, type={self.task_type}, status={self.status})>"
+
+
+class SchedulerLock(Base):
+    """Блокировка периодической задачи и сведения о ее последнем запуске"""
+    __tablename__ = 'scheduler_locks'
+
+    job_name = Column(String(100), primary_key=True)
+    owner = Column(String(255), nullable=True)
+    # Задачу не запускает никто другой до этого момента: во время выполнения
+    # и после него - до следующего запуска по расписанию
+    locked_until = Column(DateTime, nullable=False)
+    last_run_at = Column(DateTime, nullable=True)
+    last_duration = Column(Float, nullable=True)
+    last_jitter = Column(Float, nullable=True)
+    last_status = Column(String(20), nullable=True)
 
     def __repr__(self):
-        return f"<BackgroundTask(id={self.id}, type={self.task_type}, status={self.status})>"
\ No newline at end of file
+        return f"<SchedulerLock(job={self.job_name}, owner={self.owner})>"
@@ -0,0 +1,174 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request, status
+
+from .cache import cache, create_async_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Настройки ограничения частоты запросов аутентификации
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory или redis
+RATE_LIMIT_AUTH_CAPACITY = int(os.getenv("RATE_LIMIT_AUTH_CAPACITY", "10"))
+RATE_LIMIT_AUTH_REFILL_PER_SECOND = float(os.getenv("RATE_LIMIT_AUTH_REFILL_PER_SECOND", "0.2"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Что делать с запросом, если Redis недоступен: allow - пропустить без проверки лимита,
+# deny - отклонить с 429 (вход и регистрация недоступны, пока Redis не восстановится)
+RATE_LIMIT_ON_REDIS_ERROR = os.getenv("RATE_LIMIT_ON_REDIS_ERROR", "allow")
+if RATE_LIMIT_ON_REDIS_ERROR not in ("allow", "deny"):
+    raise ValueError(f"Неизвестное значение RATE_LIMIT_ON_REDIS_ERROR: {RATE_LIMIT_ON_REDIS_ERROR}")
+# Через сколько секунд повторить запрос, отклоненный из-за недоступности Redis
+RATE_LIMIT_REDIS_ERROR_RETRY_SECONDS = 1.0
+
+RATE_LIMIT_PREFIX = "rate_limit:"
+
+# Атомарное списание токена из корзины в Redis.
+# Время берется с сервера Redis, чтобы у всех воркеров были одинаковые часы.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_rate)
+
+local retry_after = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    retry_after = (requested - tokens) / refill_rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_rate * 1000))
+return tostring(retry_after)
+"""
+
+
+class InMemoryTokenBucket:
+    """
+    Корзина токенов в памяти процесса для развертывания на одном узле.
+    Число отслеживаемых ключей ограничено, давно не использованные вытесняются.
+    """
+
+    def __init__(
+            self,
+            capacity: int = RATE_LIMIT_AUTH_CAPACITY,
+            refill_rate: float = RATE_LIMIT_AUTH_REFILL_PER_SECOND,
+            max_keys: int = RATE_LIMIT_MAX_KEYS
+    ):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def consume(self, key: str, tokens: int = 1) -> float:
+        """Списать токены; возвращает 0 или число секунд до повторной попытки"""
+        now = time.monotonic()
+        with self._lock:
+            available, updated_at = self._buckets.pop(key, (self.capacity, now))
+            available = min(self.capacity, available + (now - updated_at) * self.refill_rate)
+
+            retry_after = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                retry_after = (tokens - available) / self.refill_rate
+
+            self._buckets[key] = (available, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return retry_after
+
+    def reset(self) -> None:
+        """Сбросить все корзины"""
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisTokenBucket:
+    """
+    Корзина токенов в Redis для нескольких воркеров.
+    Используется асинхронный клиент, чтобы обращение к Redis не блокировало цикл событий.
+    При недоступности Redis запрос пропускается или отклоняется согласно on_error.
+    """
+
+    def __init__(
+            self,
+            capacity: int = RATE_LIMIT_AUTH_CAPACITY,
+            refill_rate: float = RATE_LIMIT_AUTH_REFILL_PER_SECOND,
+            on_error: str = RATE_LIMIT_ON_REDIS_ERROR
+    ):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.on_error = on_error
+        self._script = None
+
+    def _get_script(self):
+        # Клиент создается при первом запросе, в цикле событий приложения
+        if self._script is None:
+            client = create_async_redis_client()
+            self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+        return self._script
+
+    async def consume(self, key: str, tokens: int = 1) -> float:
+        """Списать токены; возвращает 0 или число секунд до повторной попытки"""
+        try:
+            retry_after = await self._get_script()(
+                keys=[f"{RATE_LIMIT_PREFIX}{key}"],
+                args=[self.capacity, self.refill_rate, tokens]
+            )
+            return float(retry_after)
+        except Exception:
+            if self.on_error == "deny":
+                logger.warning("Redis недоступен, запрос %s отклонен ограничителем частоты", key, exc_info=True)
+                return RATE_LIMIT_REDIS_ERROR_RETRY_SECONDS
+            logger.warning("Redis недоступен, запрос %s пропущен без проверки лимита", key, exc_info=True)
+            return 0.0
+
+    def reset(self) -> None:
+        """Сбросить все корзины"""
+        cache.delete_pattern(f"{RATE_LIMIT_PREFIX}*")
+
+
+def create_rate_limiter():
+    """Создание ограничителя в соответствии с RATE_LIMIT_BACKEND"""
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisTokenBucket()
+    return InMemoryTokenBucket()
+
+
+# Ограничитель для эндпоинтов входа и регистрации
+auth_rate_limiter = create_rate_limiter()
+
+
+async def enforce_rate_limit(limiter, request: Request, scope: str, username: str) -> None:
+    """
+    Проверка лимитов по IP клиента и по имени пользователя.
+    При превышении выбрасывает 429 с заголовком Retry-After.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+
+    for key in (f"{scope}:ip:{client_ip}", f"{scope}:user:{username}"):
+        retry_after = await limiter.consume(key)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Слишком много запросов, повторите попытку позже",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from .cache import cache
+from .database import SessionLocal
+from .models import SchedulerLock
+
+logger = logging.getLogger(__name__)
+
+# Настройки планировщика периодических задач
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "True").lower() == "true"
+# Блокировка, чтобы задачу выполнял один воркер: db - таблица scheduler_locks, redis - ключи Redis
+SCHEDULER_LOCK_BACKEND = os.getenv("SCHEDULER_LOCK_BACKEND", "db")
+# Максимальное время выполнения задачи: после него блокировку упавшего воркера может забрать другой
+SCHEDULER_LOCK_TTL_SECONDS = int(os.getenv("SCHEDULER_LOCK_TTL_SECONDS", "3600"))
+# Допустимое расхождение часов воркеров: блокировка освобождается раньше следующего запуска на это время
+SCHEDULER_CLOCK_SKEW_SECONDS = int(os.getenv("SCHEDULER_CLOCK_SKEW_SECONDS", "5"))
+
+SCHEDULER_LOCK_PREFIX = "scheduler_lock:"
+
+# Продление блокировки в Redis только ее владельцем
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class IntervalSchedule:
+    """Запуск через равные промежутки времени"""
+
+    def __init__(self, seconds: int):
+        if seconds <= 0:
+            raise ValueError("Интервал должен быть положительным")
+        self.seconds = seconds
+
+    def next_run(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.seconds)
+
+    def __str__(self) -> str:
+        return f"every {self.seconds}s"
+
+
+class CronSchedule:
+    """
+    Расписание в формате cron из пяти полей: минута, час, день месяца, месяц,
+    день недели (0 или 7 - воскресенье). Поддерживаются *, списки через запятую,
+    диапазоны a-b и шаг /n. Время - локальное время сервера.
+    """
+
+    FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Ожидается 5 полей cron: {expression!r}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, self.FIELD_RANGES)
+        )
+        self.weekdays = {day % 7 for day in weekdays}
+        # Как в cron: если ограничены и день месяца, и день недели, подходит любой из них
+        self._day_or_weekday = not fields[2].startswith("*") and not fields[4].startswith("*")
+
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in field.split(","):
+            expression, has_step, step_value = part.partition("/")
+            step = int(step_value) if has_step else 1
+            if expression == "*":
+                start, end = low, high
+            elif "-" in expression:
+                start, end = (int(value) for value in expression.split("-", 1))
+            else:
+                start = int(expression)
+                end = high if has_step else start
+            if step < 1 or start < low or end > high or start > end:
+                raise ValueError(f"Недопустимое поле cron: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_matches = moment.day in self.days
+        weekday_matches = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._day_or_weekday:
+            return day_matches or weekday_matches
+        return day_matches and weekday_matches
+
+    def next_run(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Неподходящие месяцы, дни и часы пропускаются целиком
+        for _ in range(100000):
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+            elif moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Расписание никогда не срабатывает: {self.expression!r}")
+
+    def __str__(self) -> str:
+        return self.expression
+
+
+def parse_schedule(spec: str):
+    """
+    Расписание из строки настройки: число - интервал в секундах,
+    пять полей - cron. Пустая строка или 0 отключают задачу (None).
+    """
+    spec = spec.strip()
+    if not spec or spec == "0":
+        return None
+    if spec.isdigit():
+        return IntervalSchedule(int(spec))
+    return CronSchedule(spec)
+
+
+class DatabaseJobLock:
+    """Блокировка задач через таблицу scheduler_locks; там же сохраняются сведения о запусках"""
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or SessionLocal
+
+    def acquire(self, job_name: str, owner: str, ttl_seconds: int) -> bool:
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            stmt = (
+                update(SchedulerLock)
+                .where(SchedulerLock.job_name == job_name)
+                .where(or_(SchedulerLock.locked_until <= now, SchedulerLock.owner == owner))
+                .values(owner=owner, locked_until=now + timedelta(seconds=ttl_seconds))
+            )
+            if db.execute(stmt).rowcount:
+                db.commit()
+                return True
+
+            try:
+                db.add(SchedulerLock(
+                    job_name=job_name, owner=owner, locked_until=now + timedelta(seconds=ttl_seconds)
+                ))
+                db.commit()
+                return True
+            except IntegrityError:
+                # Запись уже есть и блокировка занята другим воркером
+                db.rollback()
+                return False
+        finally:
+            db.close()
+
+    def release(self, job_name: str, owner: str, hold_until: datetime, metrics: dict) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(SchedulerLock)
+                .where(SchedulerLock.job_name == job_name, SchedulerLock.owner == owner)
+                .values(
+                    locked_until=hold_until,
+                    last_run_at=metrics["last_run_at"],
+                    last_duration=metrics["last_duration"],
+                    last_jitter=metrics["last_jitter"],
+                    last_status=metrics["last_status"]
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+
+class RedisJobLock:
+    """
+    Блокировка задач через ключи Redis (SET NX с временем жизни).
+    При недоступности Redis задача пропускается, чтобы не выполниться на всех воркерах.
+    """
+
+    def __init__(self):
+        self._release_script = cache.redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+    def acquire(self, job_name: str, owner: str, ttl_seconds: int) -> bool:
+        try:
+            return bool(cache.redis_client.set(
+                f"{SCHEDULER_LOCK_PREFIX}{job_name}", owner, nx=True, ex=ttl_seconds
+            ))
+        except Exception:
+            logger.warning("Redis недоступен, задача %s пропущена", job_name)
+            return False
+
+    def release(self, job_name: str, owner: str, hold_until: datetime, metrics: dict) -> None:
+        hold_ms = int((hold_until - datetime.now()).total_seconds() * 1000)
+        key = f"{SCHEDULER_LOCK_PREFIX}{job_name}"
+        try:
+            if hold_ms > 0:
+                self._release_script(keys=[key], args=[owner, hold_ms])
+            elif cache.redis_client.get(key) == owner.encode():
+                cache.redis_client.delete(key)
+        except Exception:
+            pass
+
+
+def create_job_lock():
+    """Создание блокировки в соответствии с SCHEDULER_LOCK_BACKEND"""
+    if SCHEDULER_LOCK_BACKEND == "redis":
+        return RedisJobLock()
+    return DatabaseJobLock()
+
+
+class ScheduledJob:
+    """Периодическая задача и метрики ее запусков в этом процессе"""
+
+    def __init__(self, name: str, func: Callable[[], Optional[dict]], schedule):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.next_run_at: Optional[datetime] = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_jitter: Optional[float] = None
+        self.last_status: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "schedule": str(self.schedule),
+            "next_run_at": self.next_run_at,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_run_at": self.last_run_at,
+            "last_duration": self.last_duration,
+            "last_jitter": self.last_jitter,
+            "last_status": self.last_status,
+        }
+
+
+class Scheduler:
+    """
+    Планировщик периодических задач обслуживания внутри процесса API.
+
+    Каждая задача ждет своего времени в цикле событий и выполняется в пуле
+    потоков. Перед запуском берется блокировка, поэтому при нескольких воркерах
+    задачу в каждый момент расписания выполняет только один из них. После
+    выполнения блокировка удерживается до следующего запуска по расписанию.
+    Для каждой задачи сохраняются задержка запуска относительно расписания
+    (jitter) и длительность последнего выполнения.
+    """
+
+    def __init__(
+            self,
+            lock=None,
+            lock_ttl_seconds: int = SCHEDULER_LOCK_TTL_SECONDS,
+            clock_skew_seconds: int = SCHEDULER_CLOCK_SKEW_SECONDS
+    ):
+        self._lock = lock
+        self.lock_ttl_seconds = lock_ttl_seconds
+        self.clock_skew_seconds = clock_skew_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._jobs_lock = threading.Lock()
+
+    @property
+    def lock(self):
+        # Блокировка создается при первом обращении, чтобы импорт модуля не требовал Redis
+        if self._lock is None:
+            self._lock = create_job_lock()
+        return self._lock
+
+    def add_job(self, name: str, func: Callable[[], Optional[dict]], schedule) -> Optional[ScheduledJob]:
+        """Регистрация задачи; schedule=None - задача отключена"""
+        if schedule is None:
+            return None
+        job = ScheduledJob(name, func, schedule)
+        with self._jobs_lock:
+            self.jobs[name] = job
+        return job
+
+    def run_job(self, job: ScheduledJob, scheduled_at: datetime) -> bool:
+        """
+        Выполнение задачи, запланированной на scheduled_at, под блокировкой.
+        Возвращает False, если задачу уже выполняет или выполнил другой воркер.
+        """
+        started_at = datetime.now()
+        if not self.lock.acquire(job.name, self.owner, self.lock_ttl_seconds):
+            job.skipped += 1
+            return False
+
+        started = time.monotonic()
+        try:
+            result = job.func()
+            status = "failed" if isinstance(result, dict) and result.get("success") is False else "completed"
+        except Exception:
+            logger.exception("Ошибка периодической задачи %s", job.name)
+            status = "failed"
+
+        job.runs += 1
+        if status == "failed":
+            job.failures += 1
+        job.last_run_at = started_at
+        job.last_duration = round(time.monotonic() - started, 3)
+        job.last_jitter = round((started_at - scheduled_at).total_seconds(), 3)
+        job.last_status = status
+        logger.info(
+            "Периодическая задача %s: %s за %.3f с, задержка запуска %.3f с",
+            job.name, status, job.last_duration, job.last_jitter
+        )
+
+        hold_until = max(
+            datetime.now(),
+            job.schedule.next_run(scheduled_at) - timedelta(seconds=self.clock_skew_seconds)
+        )
+        try:
+            self.lock.release(job.name, self.owner, hold_until, job.to_dict())
+        except Exception:
+            logger.exception("Не удалось освободить блокировку задачи %s", job.name)
+        return True
+
+    async def _run_forever(self, job: ScheduledJob) -> None:
+        scheduled_at = job.schedule.next_run(datetime.now())
+        while True:
+            job.next_run_at = scheduled_at
+            await asyncio.sleep(max(0.0, (scheduled_at - datetime.now()).total_seconds()))
+            await asyncio.to_thread(self.run_job, job, scheduled_at)
+            # Пропущенные во время долгого выполнения запуски не наверстываются
+            scheduled_at = job.schedule.next_run(max(scheduled_at, datetime.now()))
+
+    def start(self) -> None:
+        """Запуск циклов всех зарегистрированных задач в текущем цикле событий"""
+        self._tasks = [asyncio.create_task(self._run_forever(job)) for job in self.jobs.values()]
+
+    async def stop(self) -> None:
+        """Остановка циклов задач; выполняемая задача дорабатывает в своем потоке"""
+        for task in self._tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    def metrics(self) -> List[dict]:
+        """Метрики задач для мониторинга"""
+        with self._jobs_lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+
+# Глобальный планировщик; задачи регистрируются при запуске приложения
+scheduler = Scheduler()
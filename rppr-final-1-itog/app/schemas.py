@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
 
@@ -66,6 +66,12 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
     user_id: int
     username: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str = Field(..., description="Токен обновления")
 
 
 class LogoutResponse(BaseModel):
@@ -74,7 +80,34 @@ class LogoutResponse(BaseModel):
 
 # Background tasks schemas
 class CSVLoadRequest(BaseModel):
-    csv_file_path: str = Field(..., description="Путь к CSV файлу")
+    csv_file_path: str = Field(..., description="Путь к файлу CSV, JSON Lines или Parquet")
+    file_format: Optional[str] = Field(None, description="csv, jsonl или parquet; по умолчанию по расширению файла")
+    column_map: Optional[Dict[str, str]] = Field(
+        None, description="Сопоставление полей студента столбцам файла, например {\"last_name\": \"surname\"}"
+    )
+
+
+class StudentFilter(BaseModel):
+    faculty: Optional[str] = Field(None, description="Факультет")
+    course: Optional[str] = Field(None, description="Курс")
+    grade_gte: Optional[int] = Field(None, description="Оценка не ниже")
+    grade_lt: Optional[int] = Field(None, description="Оценка ниже")
+
+
+class FilteredDeleteRequest(BaseModel):
+    filter: StudentFilter = Field(..., description="Условия отбора; хотя бы одно должно быть задано")
+    batch_size: Optional[int] = Field(None, ge=1, le=100000, description="Строк в одной транзакции")
+    sleep_seconds: Optional[float] = Field(None, ge=0, le=60, description="Пауза между пачками")
+
+
+class FilteredUpdateRequest(FilteredDeleteRequest):
+    changes: StudentUpdate = Field(..., description="Новые значения полей")
+
+
+class ExportRequest(BaseModel):
+    file_format: str = Field("csv", description="csv или parquet")
+    faculty: Optional[str] = Field(None, description="Выгрузить только студентов факультета")
+    course: Optional[str] = Field(None, description="Выгрузить только студентов курса")
 
 
 class DeleteStudentsRequest(BaseModel):
@@ -87,6 +120,18 @@ class BackgroundTaskResponse(BaseModel):
     message: str
 
 
+class BackgroundTaskStatusResponse(BaseModel):
+    task_id: str
+    task_type: str
+    status: str
+    parameters: Optional[dict] = None
+    progress: Optional[dict] = None
+    checkpoint: Optional[dict] = None
+    result: Optional[dict] = None
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
 class CSVLoadResponse(BaseModel):
     success: bool
     message: str
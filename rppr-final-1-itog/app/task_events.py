@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+from .cache import cache, create_async_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Доставка событий фоновых задач подписчикам (SSE): memory - в пределах процесса,
+# redis - через каналы Redis, нужно при TASK_EXECUTOR=celery и нескольких воркерах API.
+# По умолчанию redis, если задачи выполняются в воркерах Celery
+TASK_EVENTS_BACKEND = os.getenv("TASK_EVENTS_BACKEND") or (
+    "redis" if os.getenv("TASK_EXECUTOR", "local") == "celery" else "memory"
+)
+# Сколько непрочитанных событий хранится на подписчика; при переполнении отбрасываются старые
+TASK_EVENTS_QUEUE_SIZE = int(os.getenv("TASK_EVENTS_QUEUE_SIZE", "100"))
+# Как часто поток SSE без событий отправляет keep-alive и сверяет статус задачи с БД
+TASK_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("TASK_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+TASK_EVENTS_CHANNEL_PREFIX = "task_events:"
+
+
+class _Subscription:
+    """Очередь событий одного подписчика в его цикле событий"""
+
+    def __init__(self, max_queued: int):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=max_queued)
+
+    def push(self, message: dict) -> None:
+        """Передать событие из любого потока"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # Цикл событий подписчика уже закрыт
+            pass
+
+    def _put(self, message: dict) -> None:
+        if self._queue.full():
+            # Прогресс важен только последний, поэтому старые события отбрасываются
+            self._queue.get_nowait()
+        self._queue.put_nowait(message)
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        """Следующее событие или None, если его не было за timeout секунд"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class InMemoryTaskEvents:
+    """
+    Публикация событий задач подписчикам в том же процессе.
+    Задачи публикуют из потоков пула, подписчики читают в цикле событий.
+    """
+
+    def __init__(self, max_queued: int = TASK_EVENTS_QUEUE_SIZE):
+        self.max_queued = max_queued
+        self._subscribers: Dict[str, Set[_Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, task_id: str, event: str, data: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(task_id, ()))
+        for subscription in subscribers:
+            subscription.push({"event": event, "data": data})
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[_Subscription]:
+        subscription = _Subscription(self.max_queued)
+        with self._lock:
+            self._subscribers[task_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscribers[task_id].discard(subscription)
+                if not self._subscribers[task_id]:
+                    del self._subscribers[task_id]
+
+
+class _RedisSubscription:
+    """Подписка на канал Redis; без Redis события не приходят"""
+
+    def __init__(self, pubsub=None):
+        self._pubsub = pubsub
+
+    async def get(self, timeout: float) -> Optional[dict]:
+        if self._pubsub is None:
+            await asyncio.sleep(timeout)
+            return None
+        try:
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        except Exception:
+            return None
+        return json.loads(message["data"]) if message else None
+
+
+class RedisTaskEvents:
+    """
+    Публикация событий задач через каналы Redis, в том числе из воркеров Celery.
+    При недоступности Redis события теряются, как и записи кеша.
+    """
+
+    def publish(self, task_id: str, event: str, data: dict) -> None:
+        try:
+            cache.redis_client.publish(
+                f"{TASK_EVENTS_CHANNEL_PREFIX}{task_id}",
+                json.dumps({"event": event, "data": data}, ensure_ascii=False, default=str)
+            )
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[_RedisSubscription]:
+        client = create_async_redis_client()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(f"{TASK_EVENTS_CHANNEL_PREFIX}{task_id}")
+        except Exception:
+            logger.warning("Redis недоступен, события задачи %s не будут доставлены", task_id)
+            pubsub = None
+
+        try:
+            yield _RedisSubscription(pubsub)
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
+            await client.aclose()
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Сообщение в формате text/event-stream"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+def create_task_events():
+    """Создание канала событий в соответствии с TASK_EVENTS_BACKEND"""
+    if TASK_EVENTS_BACKEND == "redis":
+        return RedisTaskEvents()
+    return InMemoryTaskEvents()
+
+
+# Канал событий фоновых задач
+task_events = create_task_events()
@@ -0,0 +1,289 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import redis
+
+from .cache import cache
+from .models import User
+from .schemas import UserResponse
+
+# Режим аутентификации: "session" - непрозрачные токены в таблице user_sessions,
+# "token" - подписанные HMAC токены, которые проверяются без обращения к БД
+AUTH_MODE = os.getenv("AUTH_MODE", "session")
+
+# Ключ подписи токенов; в режиме token обязателен, иначе приложение не запустится
+SECRET_KEY = os.getenv("SECRET_KEY", "")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Отозванные идентификаторы хранятся в сортированном множестве Redis (score - срок действия),
+# а о новых отзывах воркеры узнают из канала с тем же именем
+REVOKED_TOKENS_KEY = "revoked_tokens"
+REVOKED_TOKENS_CHANNEL = "revoked_tokens"
+# Как часто локальная копия полностью сверяется с Redis на случай пропущенных сообщений
+REVOKED_TOKENS_SYNC_SECONDS = float(os.getenv("REVOKED_TOKENS_SYNC_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+_HASH_FUNCTIONS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+
+class TokenError(Exception):
+    """Токен поврежден, подделан, просрочен или отозван"""
+
+
+def token_auth_enabled() -> bool:
+    """Включен ли режим подписанных токенов"""
+    return AUTH_MODE == "token"
+
+
+def validate_token_settings() -> None:
+    """
+    Проверка настроек при запуске: ключ, сгенерированный на процесс, делал бы
+    токены недействительными в других воркерах и после перезапуска
+    """
+    if token_auth_enabled() and not SECRET_KEY:
+        raise RuntimeError("AUTH_MODE=token требует заданного SECRET_KEY")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(signing_input: bytes) -> bytes:
+    hash_function = _HASH_FUNCTIONS.get(ALGORITHM)
+    if hash_function is None:
+        raise TokenError(f"Неподдерживаемый алгоритм подписи: {ALGORITHM}")
+    return hmac.new(SECRET_KEY.encode("utf-8"), signing_input, hash_function).digest()
+
+
+def encode_token(payload: dict) -> str:
+    """Подпись полезной нагрузки в формате JWT (header.payload.signature)"""
+    header = _b64encode(json.dumps({"alg": ALGORITHM, "typ": "JWT"}, separators=(",", ":")).encode("utf-8"))
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    signing_input = f"{header}.{body}".encode("ascii")
+    return f"{header}.{body}.{_b64encode(_sign(signing_input))}"
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    """Проверка подписи, типа и срока действия токена"""
+    try:
+        header, body, signature = token.split(".")
+        expected_signature = _sign(f"{header}.{body}".encode("ascii"))
+        if not hmac.compare_digest(expected_signature, _b64decode(signature)):
+            raise TokenError("Неверная подпись токена")
+        payload = json.loads(_b64decode(body))
+    except TokenError:
+        raise
+    except (ValueError, UnicodeError):
+        raise TokenError("Неверный формат токена")
+
+    if not isinstance(payload, dict):
+        raise TokenError("Неверный формат токена")
+
+    if payload.get("type") != token_type:
+        raise TokenError("Неверный тип токена")
+    if payload.get("exp", 0) <= time.time():
+        raise TokenError("Срок действия токена истек")
+    if revoked_tokens.is_revoked(payload.get("jti")) or revoked_tokens.is_revoked(payload.get("sid")):
+        raise TokenError("Токен отозван")
+
+    return payload
+
+
+class RevokedTokenStore:
+    """
+    Множество отозванных идентификаторов токенов (jti) и цепочек обновления (sid).
+
+    Записи хранятся до истечения срока действия соответствующего токена,
+    поэтому множество остается небольшим. Проверка токена обращается только
+    к локальной копии; отзывы из других воркеров доставляются через канал
+    Redis фоновым потоком, который также периодически перечитывает полный список.
+    """
+
+    def __init__(self, redis_client=None):
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._redis = redis_client if redis_client is not None else cache.redis_client
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def revoke(self, token_id: str, expires_at: float) -> None:
+        """Отозвать идентификатор до момента expires_at (unix time)"""
+        self._add(token_id, expires_at)
+
+        try:
+            pipeline = self._redis.pipeline()
+            pipeline.zadd(REVOKED_TOKENS_KEY, {token_id: expires_at})
+            pipeline.zremrangebyscore(REVOKED_TOKENS_KEY, "-inf", time.time())
+            pipeline.publish(REVOKED_TOKENS_CHANNEL, json.dumps({"id": token_id, "exp": expires_at}))
+            pipeline.execute()
+        except redis.RedisError:
+            logger.warning("Не удалось передать отзыв токена в Redis, он действует только в этом процессе")
+
+    def is_revoked(self, token_id: Optional[str]) -> bool:
+        """Проверить, отозван ли идентификатор"""
+        if not token_id:
+            return False
+
+        expires_at = self._revoked.get(token_id)
+        return expires_at is not None and expires_at > time.time()
+
+    def sync(self) -> None:
+        """Загрузить из Redis все действующие отзывы"""
+        entries = self._redis.zrangebyscore(REVOKED_TOKENS_KEY, time.time(), "+inf", withscores=True)
+        for token_id, expires_at in entries:
+            if isinstance(token_id, bytes):
+                token_id = token_id.decode("utf-8")
+            self._add(token_id, expires_at)
+
+    def start(self) -> None:
+        """Запустить фоновую синхронизацию с Redis"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="revoked-tokens-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Остановить фоновую синхронизацию"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _add(self, token_id: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._revoked[token_id] = expires_at
+            for expired_id in [key for key, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[expired_id]
+
+    def _on_message(self, message: dict) -> None:
+        data = json.loads(message["data"])
+        self._add(data["id"], float(data["exp"]))
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                # Подписка оформляется до чтения списка, чтобы не пропустить отзывы между ними
+                pubsub.subscribe(REVOKED_TOKENS_CHANNEL)
+                self.sync()
+                next_sync = time.monotonic() + REVOKED_TOKENS_SYNC_SECONDS
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._on_message(message)
+                    if time.monotonic() >= next_sync:
+                        self.sync()
+                        next_sync = time.monotonic() + REVOKED_TOKENS_SYNC_SECONDS
+            except redis.RedisError:
+                logger.warning("Синхронизация отозванных токенов с Redis прервана, повтор через 1 с")
+                self._stop.wait(1.0)
+            finally:
+                pubsub.close()
+
+
+revoked_tokens = RevokedTokenStore()
+
+
+def create_token_pair(user: User, session_id: Optional[str] = None) -> dict:
+    """
+    Выпуск пары токенов доступа и обновления.
+
+    Все токены одного входа в систему разделяют идентификатор цепочки sid,
+    чтобы выход из системы отзывал и токен обновления.
+    """
+    now = int(time.time())
+    session_id = session_id or secrets.token_hex(16)
+    access_expires_in = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    access_token = encode_token({
+        "type": "access",
+        "sub": str(user.id),
+        "username": user.username,
+        "email": user.email,
+        "is_active": user.is_active,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "sid": session_id,
+        "jti": secrets.token_hex(16),
+        "iat": now,
+        "exp": now + access_expires_in,
+    })
+    refresh_token = encode_token({
+        "type": "refresh",
+        "sub": str(user.id),
+        "sid": session_id,
+        "jti": secrets.token_hex(16),
+        "iat": now,
+        "exp": now + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
+    })
+
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "expires_in": access_expires_in,
+    }
+
+
+def get_user_from_access_token(token: str) -> Optional[UserResponse]:
+    """Получение пользователя из токена доступа без обращения к БД"""
+    try:
+        payload = decode_token(token, "access")
+    except TokenError:
+        return None
+
+    if not payload.get("is_active"):
+        return None
+
+    created_at = payload.get("created_at")
+    return UserResponse.model_construct(
+        id=int(payload["sub"]),
+        username=payload["username"],
+        email=payload["email"],
+        is_active=payload["is_active"],
+        created_at=datetime.fromisoformat(created_at) if created_at else None,
+    )
+
+
+def revoke_access_token(token: str) -> bool:
+    """Отзыв токена доступа вместе с цепочкой токенов обновления"""
+    try:
+        payload = decode_token(token, "access")
+    except TokenError:
+        return False
+
+    revoked_tokens.revoke(payload["jti"], payload["exp"])
+    # Любой токен обновления этой цепочки выпущен раньше, поэтому истечет не позже этого момента
+    revoked_tokens.revoke(payload["sid"], time.time() + REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60)
+    return True
+
+
+def rotate_refresh_token(refresh_token: str) -> dict:
+    """
+    Проверка токена обновления и его отзыв (одноразовое использование).
+    Возвращает полезную нагрузку для выпуска новой пары токенов.
+    """
+    payload = decode_token(refresh_token, "refresh")
+    revoked_tokens.revoke(payload["jti"], payload["exp"])
+    return payload
@@ -0,0 +1,82 @@
+"""
+Бенчмарк параллельного разбора CSV.
+
+Генерирует синтетический файл в формате students.csv и измеряет скорость
+разбора и проверки строк (без записи в БД) последовательно и в пуле
+процессов с разным числом воркеров.
+
+Запуск из корня проекта:
+    python -m benchmarks.parallel_csv_parse --rows 2000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.importers import CSV_COLUMNS, iter_csv_rows, parse_csv_parallel, parse_student_row
+
+LAST_NAMES = ["Ли", "Ким", "Райт", "Джонс", "Ву", "Чан", "Иванов", "Петрова"]
+FIRST_NAMES = ["Иван", "Петр", "Вероника", "Андрей", "Дмитрий", "Алексей", "Мария"]
+FACULTIES = ["АВТФ", "ФПМИ", "ФЛА", "РЭФ", "ФТФ", "ФИТ"]
+COURSES = ["Теор. Механика", "Мат. Анализ", "Физика", "Программирование"]
+
+
+def generate_csv(path: str, rows: int) -> None:
+    """Генерация файла со случайными студентами"""
+    rng = random.Random(42)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(",".join(CSV_COLUMNS.values()) + "\n")
+        for _ in range(rows):
+            file.write(
+                f"{rng.choice(LAST_NAMES)},{rng.choice(FIRST_NAMES)},"
+                f"{rng.choice(FACULTIES)},{rng.choice(COURSES)},{rng.randint(0, 100)}\n"
+            )
+
+
+def parse_sequential(path: str) -> int:
+    """Последовательный разбор, как в StudentManager.import_rows"""
+    parsed = 0
+    with open(path, "r", encoding="utf-8") as file:
+        for _, row in iter_csv_rows(file):
+            try:
+                parse_student_row(row)
+                parsed += 1
+            except (KeyError, ValueError):
+                pass
+    return parsed
+
+
+def parse_parallel(path: str, workers: int, chunk_bytes: int) -> int:
+    """Параллельный разбор в пуле процессов"""
+    return sum(len(chunk.rows) for chunk in parse_csv_parallel(path, workers, chunk_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunk-bytes", type=int, default=4 * 1024 * 1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "students.csv")
+        generate_csv(path, args.rows)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"Файл: {args.rows} строк, {size_mb:.1f} МБ, CPU: {os.cpu_count()}")
+        print(f"{'режим':<14}{'сек':>8}{'строк/сек':>14}{'ускорение':>12}")
+
+        started = time.perf_counter()
+        parsed = parse_sequential(path)
+        baseline = time.perf_counter() - started
+        print(f"{'sequential':<14}{baseline:>8.2f}{parsed / baseline:>14,.0f}{1.0:>12.2f}")
+
+        for workers in args.workers:
+            started = time.perf_counter()
+            parsed = parse_parallel(path, workers, args.chunk_bytes)
+            elapsed = time.perf_counter() - started
+            print(f"{f'{workers} workers':<14}{elapsed:>8.2f}{parsed / elapsed:>14,.0f}{baseline / elapsed:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,15 @@ import sys
 # Добавляем путь к приложению
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-from app.database import Base
-from app.models import User, UserSession, Faculty, Course, Student, BackgroundTask
+from app.database import Base, DATABASE_URL
+from app.models import User, UserSession, Student, BackgroundTask
 
 # this is the Alembic Config object
 config = context.config
 
+# URL базы берется из окружения приложения, а не из alembic.ini
+config.set_main_option("sqlalchemy.url", DATABASE_URL)
+
 # Interpret the config file for Python logging
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
@@ -0,0 +1,35 @@
+"""Foreign key and (user_id, is_active) index on user_sessions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Сессии удаленных пользователей не пройдут проверку внешнего ключа
+    op.execute('DELETE FROM user_sessions WHERE user_id NOT IN (SELECT id FROM users)')
+
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.create_foreign_key(
+            'fk_user_sessions_user_id_users', 'users',
+            ['user_id'], ['id'], ondelete='CASCADE'
+        )
+        batch_op.create_index('ix_user_sessions_user_id_is_active', ['user_id', 'is_active'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.drop_index('ix_user_sessions_user_id_is_active')
+        batch_op.drop_constraint('fk_user_sessions_user_id_users', type_='foreignkey')
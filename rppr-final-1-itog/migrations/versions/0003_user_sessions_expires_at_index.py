@@ -0,0 +1,25 @@
+"""Index on user_sessions.expires_at for session garbage collection
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_sessions_expires_at', 'user_sessions', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_sessions_expires_at', table_name='user_sessions')
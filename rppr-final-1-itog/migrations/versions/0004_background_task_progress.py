@@ -0,0 +1,32 @@
+"""Progress tracking and retention index for background_tasks
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.add_column(sa.Column('progress', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_background_tasks_completed_at', ['completed_at'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.drop_index('ix_background_tasks_completed_at')
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('progress')
@@ -0,0 +1,36 @@
+"""Idempotency key and parameter hash for background_tasks
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('params_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(
+            'ix_background_tasks_created_by_idempotency_key', ['created_by', 'idempotency_key'], unique=True
+        )
+        batch_op.create_index('ix_background_tasks_task_type_params_hash', ['task_type', 'params_hash'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.drop_index('ix_background_tasks_task_type_params_hash')
+        batch_op.drop_index('ix_background_tasks_created_by_idempotency_key')
+        batch_op.drop_column('params_hash')
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,34 @@
+"""Unique natural key for students
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Повторные импорты оставили дубли; сохраняется последняя загруженная запись
+    op.execute(
+        "DELETE FROM students WHERE id NOT IN ("
+        "SELECT MAX(id) FROM students GROUP BY last_name, first_name, faculty, course)"
+    )
+    with op.batch_alter_table('students') as batch_op:
+        batch_op.create_index(
+            'uq_students_natural_key', ['last_name', 'first_name', 'faculty', 'course'], unique=True
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('students') as batch_op:
+        batch_op.drop_index('uq_students_natural_key')
@@ -0,0 +1,28 @@
+"""Import checkpoint for background_tasks
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.add_column(sa.Column('checkpoint', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('background_tasks') as batch_op:
+        batch_op.drop_column('checkpoint')
@@ -0,0 +1,30 @@
+"""Import batch tag for students
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('students') as batch_op:
+        batch_op.add_column(sa.Column('import_batch_id', sa.String(length=36), nullable=True))
+        batch_op.create_index('ix_students_import_batch_id', ['import_batch_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('students') as batch_op:
+        batch_op.drop_index('ix_students_import_batch_id')
+        batch_op.drop_column('import_batch_id')
@@ -0,0 +1,36 @@
+"""Scheduler job locks and last-run metrics
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'scheduler_locks',
+        sa.Column('job_name', sa.String(length=100), nullable=False),
+        sa.Column('owner', sa.String(length=255), nullable=True),
+        sa.Column('locked_until', sa.DateTime(), nullable=False),
+        sa.Column('last_run_at', sa.DateTime(), nullable=True),
+        sa.Column('last_duration', sa.Float(), nullable=True),
+        sa.Column('last_jitter', sa.Float(), nullable=True),
+        sa.Column('last_status', sa.String(length=20), nullable=True),
+        sa.PrimaryKeyConstraint('job_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scheduler_locks')
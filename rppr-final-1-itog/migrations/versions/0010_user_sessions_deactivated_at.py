@@ -0,0 +1,36 @@
+"""Deactivation time of user sessions for session garbage collection
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.add_column(sa.Column('deactivated_at', sa.DateTime(timezone=True), nullable=True))
+        batch_op.create_index('ix_user_sessions_deactivated_at', ['deactivated_at'])
+
+    # Время деактивации старых сессий неизвестно: срок хранения отсчитывается от миграции
+    op.execute(
+        "UPDATE user_sessions SET deactivated_at = CURRENT_TIMESTAMP "
+        "WHERE is_active = false AND deactivated_at IS NULL"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.drop_index('ix_user_sessions_deactivated_at')
+        batch_op.drop_column('deactivated_at')
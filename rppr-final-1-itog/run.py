@@ -2,6 +2,7 @@ from app.database import create_tables, SessionLocal
 from app.auth import AuthService
 from app.schemas import UserCreate
 import uvicorn
+import asyncio
 import subprocess
 import sys
 import time
@@ -44,7 +45,7 @@ def initialize_database():
                 email="admin@example.com",
                 password="admin123"
             )
-            auth_service.register_user(test_user)
+            asyncio.run(auth_service.register_user(test_user))
             print("✅ Создан тестовый пользователь: admin / admin123")
 
         # Инициализируем тестовые данные студентов
@@ -1,13 +1,21 @@
+import os
+
+# Минимальная стоимость bcrypt ускоряет тесты; задается до импорта приложения
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
 import pytest
 import asyncio
+import time
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app import background_tasks, importers
 from app.database import get_db, Base
 from app.api import app
 from app.models import User, Student
+from app.rate_limit import auth_rate_limiter
 
 # Тестовая база данных
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -20,6 +28,30 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+CSV_HEADER = "Фамилия,Имя,Факультет,Курс,Оценка\n"
+
+
+def wait_for_task(client, headers, task_id, timeout=5.0):
+    """Ожидание завершения фоновой задачи, которая выполняется после ответа API"""
+    deadline = time.monotonic() + timeout
+    while True:
+        data = client.get(f"/background/tasks/{task_id}", headers=headers).json()
+        if data["status"] not in ("pending", "running", "cancelling") or time.monotonic() > deadline:
+            return data
+        time.sleep(0.02)
+
+
+class QueueDrainingTestClient(TestClient):
+    """
+    Тестовый клиент, который после каждого запроса ждет завершения задач,
+    поставленных в очередь процесса, чтобы тесты проверяли их результат
+    """
+
+    def request(self, *args, **kwargs):
+        response = super().request(*args, **kwargs)
+        assert background_tasks.task_queue.join(timeout=10)
+        return response
+
 
 def override_get_db():
     try:
@@ -38,10 +70,25 @@ def test_db():
 
 
 @pytest.fixture(scope="function")
-def client(test_db):
+def db_session(test_db):
+    """Сессия тестовой базы данных для прямых проверок"""
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@pytest.fixture(scope="function")
+def client(test_db, monkeypatch, tmp_path):
     """Тестовый клиент"""
     app.dependency_overrides[get_db] = override_get_db
-    with TestClient(app) as test_client:
+    # Фоновые задачи открывают собственные сессии
+    monkeypatch.setattr(background_tasks, "SessionLocal", TestingSessionLocal)
+    # Импорт по пути разрешен из временного каталога теста, где лежат тестовые файлы
+    monkeypatch.setattr(importers, "IMPORT_BASE_DIR", str(tmp_path))
+    auth_rate_limiter.reset()
+    with QueueDrainingTestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
@@ -67,4 +114,20 @@ def auth_headers(client):
     assert response.status_code == 200
 
     token = response.json()["access_token"]
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(scope="function")
+def csv_file(tmp_path):
+    """CSV файл с корректными и некорректными строками"""
+    path = tmp_path / "students.csv"
+    path.write_text(
+        CSV_HEADER
+        + "Иванов,Иван,ФИТ,Программирование,85\n"
+        + "Петров,Петр,ФИТ,Базы данных,abc\n"
+        + "Сидоров,Сидор,ФГМИ,Математика,92\n"
+        + "Кузнецов,Алексей,РЭФ,Экономика,150\n"
+        + "Смирнова,Анна,ФЛА,Физика,70\n",
+        encoding="utf-8"
+    )
+    return path
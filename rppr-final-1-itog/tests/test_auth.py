@@ -1,5 +1,22 @@
+import asyncio
+import json
+import os
 import pytest
+import queue
+import redis
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
 from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import auth, auth_router, tokens
+from app import cache as cache_module
+from app.hashing import PasswordHasher
+from app.main import app
+from app.rate_limit import InMemoryTokenBucket, RedisTokenBucket
+from app.models import User, UserSession
 
 
 class TestAuthEndpoints:
@@ -132,6 +149,127 @@ class TestAuthEndpoints:
         # Assert
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
+    def test_login_overloaded_password_hasher(self, client, monkeypatch):
+        """Тест: при переполненной очереди bcrypt вход отклоняется с 503"""
+        # Arrange
+        client.post("/auth/register", json={
+            "username": "busyuser",
+            "email": "busy@example.com",
+            "password": "busypassword123"
+        })
+        hasher = PasswordHasher(max_workers=1, max_queue_depth=1)
+        hasher._slots.acquire()
+        monkeypatch.setattr(auth, "password_hasher", hasher)
+
+        # Act
+        response = client.post("/auth/login", json={
+            "username": "busyuser",
+            "password": "busypassword123"
+        })
+
+        # Assert
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "Retry-After" in response.headers
+
+    def test_login_blocking_calls_run_off_event_loop(self, client, monkeypatch):
+        """Тест: создание сессии при входе не выполняется в цикле событий"""
+        # Arrange
+        client.post("/auth/register", json={
+            "username": "loopuser",
+            "email": "loop@example.com",
+            "password": "looppassword123"
+        })
+        calls = []
+
+        def on_event_loop():
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return False
+            return True
+
+        def record(func):
+            def wrapper(*args, **kwargs):
+                calls.append((func.__name__, on_event_loop()))
+                return func(*args, **kwargs)
+            return wrapper
+
+        monkeypatch.setattr(auth.AuthService, "create_session", record(auth.AuthService.create_session))
+
+        # Act
+        response = client.post("/auth/login", json={
+            "username": "loopuser",
+            "password": "looppassword123"
+        })
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert calls == [("create_session", False)]
+
+    def test_redis_rate_limiter_awaits_script(self):
+        """Тест: корзина в Redis списывает токены асинхронным вызовом скрипта"""
+        # Arrange
+        calls = []
+
+        async def script(keys, args):
+            calls.append((keys, args))
+            return b"1.5"
+
+        limiter = RedisTokenBucket(capacity=2, refill_rate=0.5)
+        limiter._script = script
+
+        # Act
+        retry_after = asyncio.run(limiter.consume("login:user:someone"))
+
+        # Assert
+        assert retry_after == 1.5
+        assert calls == [(["rate_limit:login:user:someone"], [2, 0.5, 1])]
+
+    @pytest.mark.parametrize("on_error, expected_retry_after", [("allow", 0.0), ("deny", 1.0)])
+    def test_redis_rate_limiter_unavailable(self, on_error, expected_retry_after, caplog):
+        """Тест: при недоступном Redis запрос пропускается или отклоняется по настройке, сбой пишется в лог"""
+        # Arrange
+        async def script(keys, args):
+            raise redis.ConnectionError("Connection refused")
+
+        limiter = RedisTokenBucket(capacity=2, refill_rate=0.5, on_error=on_error)
+        limiter._script = script
+
+        # Act
+        retry_after = asyncio.run(limiter.consume("login:user:someone"))
+
+        # Assert
+        assert retry_after == expected_retry_after
+        assert "Redis недоступен" in caplog.text
+
+    def test_redis_rate_limiter_uses_configured_host(self, monkeypatch):
+        """Тест: корзина в Redis подключается к серверу из настроек, а не к localhost"""
+        # Arrange
+        monkeypatch.setattr(cache_module, "REDIS_HOST", "redis")
+        monkeypatch.setattr(cache_module, "REDIS_PORT", 6390)
+        limiter = RedisTokenBucket()
+
+        # Act
+        script = limiter._get_script()
+
+        # Assert
+        connection = script.registered_client.connection_pool.connection_kwargs
+        assert (connection["host"], connection["port"]) == ("redis", 6390)
+
+    def test_login_rate_limited(self, client, monkeypatch):
+        """Тест: после исчерпания лимита вход отклоняется с 429"""
+        # Arrange
+        monkeypatch.setattr(auth_router, "auth_rate_limiter", InMemoryTokenBucket(capacity=2, refill_rate=0.01))
+        login_data = {"username": "bruteforce", "password": "guess"}
+
+        # Act
+        responses = [client.post("/auth/login", json=login_data) for _ in range(3)]
+
+        # Assert
+        assert [r.status_code for r in responses[:2]] == [status.HTTP_401_UNAUTHORIZED] * 2
+        assert responses[2].status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(responses[2].headers["Retry-After"]) > 0
+
     def test_get_current_user_success(self, client, auth_headers):
         """Тест успешного получения информации о текущем пользователе"""
         # Act
@@ -171,4 +309,382 @@ class TestAuthEndpoints:
         response = client.post("/auth/logout", headers=invalid_headers)
 
         # Assert
-        assert response.status_code == status.HTTP_401_UNAUTHORIZED
\ No newline at end of file
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+class TestPasswordHasher:
+    """Тесты пула хеширования паролей"""
+
+    def test_unbounded_queue_accepts_tasks(self):
+        """Тест: при max_queue_depth=0 глубина очереди не ограничена"""
+        # Arrange
+        hasher = PasswordHasher(max_workers=1, max_queue_depth=0)
+
+        # Act
+        try:
+            hashed = asyncio.run(hasher.hash("secret"))
+            verified = asyncio.run(hasher.verify("secret", hashed))
+        finally:
+            hasher.shutdown()
+
+        # Assert
+        assert verified
+
+    def test_broken_pool_recreated(self):
+        """Тест: после аварийного завершения рабочего процесса пул пересоздается"""
+        # Arrange
+        hasher = PasswordHasher(max_workers=1, max_queue_depth=2)
+        crashed = hasher._get_executor().submit(os._exit, 1)
+        with pytest.raises(BrokenProcessPool):
+            crashed.result(timeout=30)
+
+        # Act
+        try:
+            hashed = asyncio.run(hasher.hash("secret"))
+            verified = asyncio.run(hasher.verify("secret", hashed))
+        finally:
+            hasher.shutdown()
+
+        # Assert
+        assert verified
+
+
+class TestSessionRefresh:
+    """Тесты продления срока действия сессии"""
+
+    def test_read_request_does_not_refresh_fresh_session(self, client, auth_headers, db_session):
+        """Тест: свежая сессия не перезаписывается при каждом запросе"""
+        # Arrange
+        session = db_session.scalar(select(UserSession))
+        expires_at = session.expires_at
+
+        # Act
+        response = client.get("/auth/me", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        db_session.refresh(session)
+        assert session.expires_at == expires_at
+
+    def test_old_session_is_refreshed(self, client, auth_headers, db_session):
+        """Тест: сессия продлевается после прохождения порога срока жизни"""
+        # Arrange
+        session = db_session.scalar(select(UserSession))
+        session.expires_at = datetime.now() + timedelta(days=1)
+        db_session.commit()
+
+        # Act
+        response = client.get("/auth/me", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        db_session.refresh(session)
+        assert session.expires_at > datetime.now() + timedelta(days=6)
+
+
+class TestTokenAuth:
+    """Тесты режима подписанных токенов доступа"""
+
+    @pytest.fixture
+    def token_headers(self, client, monkeypatch):
+        """Вход в режиме подписанных токенов"""
+        monkeypatch.setattr(tokens, "AUTH_MODE", "token")
+        monkeypatch.setattr(tokens, "SECRET_KEY", "test-secret-key")
+        client.post("/auth/register", json={
+            "username": "tokenuser",
+            "email": "token@example.com",
+            "password": "tokenpassword123"
+        })
+        response = client.post("/auth/login", json={
+            "username": "tokenuser",
+            "password": "tokenpassword123"
+        })
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()
+
+    def test_login_issues_signed_tokens(self, client, token_headers, db_session):
+        """Тест: вход выдает пару токенов без создания сессии в БД"""
+        # Assert
+        assert token_headers["refresh_token"]
+        assert token_headers["expires_in"] > 0
+        assert db_session.scalar(select(UserSession)) is None
+
+    def test_get_current_user_with_access_token(self, client, token_headers):
+        """Тест: токен доступа проверяется без таблицы сессий"""
+        # Act
+        response = client.get(
+            "/auth/me",
+            headers={"Authorization": f"Bearer {token_headers['access_token']}"}
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["username"] == "tokenuser"
+
+    def test_tampered_token_rejected(self, client, token_headers):
+        """Тест: токен с измененной подписью отклоняется"""
+        # Arrange
+        token = token_headers["access_token"]
+        tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+        # Act
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {tampered}"})
+
+        # Assert
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_refresh_rotates_tokens(self, client, token_headers):
+        """Тест: токен обновления выдает новую пару и используется однократно"""
+        # Act
+        response = client.post("/auth/refresh", json={"refresh_token": token_headers["refresh_token"]})
+        reused = client.post("/auth/refresh", json={"refresh_token": token_headers["refresh_token"]})
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["access_token"] != token_headers["access_token"]
+        assert reused.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_logout_revokes_tokens(self, client, token_headers):
+        """Тест: выход отзывает токен доступа и цепочку обновления"""
+        # Arrange
+        headers = {"Authorization": f"Bearer {token_headers['access_token']}"}
+
+        # Act
+        logout_response = client.post("/auth/logout", headers=headers)
+
+        # Assert
+        assert logout_response.status_code == status.HTTP_200_OK
+        assert client.get("/auth/me", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+        refresh_response = client.post("/auth/refresh", json={"refresh_token": token_headers["refresh_token"]})
+        assert refresh_response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+    def test_startup_requires_secret_key(self, monkeypatch):
+        """Тест: в режиме токенов приложение не запускается без SECRET_KEY"""
+        # Arrange
+        monkeypatch.setattr(tokens, "AUTH_MODE", "token")
+        monkeypatch.setattr(tokens, "SECRET_KEY", "")
+
+        # Act
+        with pytest.raises(RuntimeError, match="SECRET_KEY"):
+            with TestClient(app):
+                pass
+
+
+class RecordingRedis:
+    """Заглушка клиента Redis: запоминает вызовы и отдает заданный список отзывов"""
+
+    def __init__(self, entries=()):
+        self.entries = list(entries)
+        self.calls = []
+
+    def zrangebyscore(self, *args, **kwargs):
+        self.calls.append("zrangebyscore")
+        return self.entries
+
+
+class FakeRedisServer:
+    """Минимальный сервер Redis в памяти: сортированные множества и каналы, общие для клиентов"""
+
+    def __init__(self):
+        self.sorted_sets = {}
+        self.subscribers = []
+
+    def pipeline(self):
+        return FakeRedisPipeline(self)
+
+    def zadd(self, key, mapping):
+        self.sorted_sets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, min_score, max_score):
+        entries = self.sorted_sets.get(key, {})
+        for member in [m for m, score in entries.items() if float(min_score) <= score <= float(max_score)]:
+            del entries[member]
+
+    def zrangebyscore(self, key, min_score, max_score, withscores=False):
+        entries = self.sorted_sets.get(key, {})
+        return [
+            (member.encode(), score) for member, score in entries.items()
+            if float(min_score) <= score <= float(max_score)
+        ]
+
+    def publish(self, channel, data):
+        for subscriber in list(self.subscribers):
+            if channel in subscriber.channels:
+                subscriber.messages.put({"type": "message", "channel": channel.encode(), "data": data.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class FakeRedisPipeline:
+    def __init__(self, server):
+        self.server = server
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        for name, args, kwargs in self.commands:
+            getattr(self.server, name)(*args, **kwargs)
+
+
+class FakePubSub:
+    def __init__(self, server):
+        self.server = server
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel):
+        self.channels.add(channel)
+        self.server.subscribers.append(self)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self in self.server.subscribers:
+            self.server.subscribers.remove(self)
+
+
+class TestRevokedTokenStore:
+    """Тесты локальной копии отозванных токенов"""
+
+    def test_check_uses_only_local_set(self):
+        """Тест: проверка токена не обращается к Redis, отзывы приходят сообщениями канала"""
+        # Arrange
+        client = RecordingRedis()
+        store = tokens.RevokedTokenStore(redis_client=client)
+
+        # Act
+        store._on_message({"data": json.dumps({"id": "jti-1", "exp": time.time() + 60})})
+
+        # Assert
+        assert store.is_revoked("jti-1")
+        assert not store.is_revoked("jti-2")
+        assert client.calls == []
+
+    def test_revocation_reaches_other_instance(self):
+        """Тест: отзыв, сделанный одним воркером, виден другому через Redis"""
+        # Arrange
+        server = FakeRedisServer()
+        revoking = tokens.RevokedTokenStore(redis_client=server)
+        checking = tokens.RevokedTokenStore(redis_client=server)
+        revoking.revoke("sid-before-start", time.time() + 60)
+        checking.start()
+
+        # Act
+        try:
+            deadline = time.monotonic() + 5
+            while not server.subscribers and time.monotonic() < deadline:
+                time.sleep(0.01)
+            revoking.revoke("jti-1", time.time() + 60)
+            while not checking.is_revoked("jti-1") and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            checking.stop()
+
+        # Assert
+        assert checking.is_revoked("jti-1")
+        assert checking.is_revoked("sid-before-start")
+        assert not checking.is_revoked("jti-2")
+
+    def test_default_store_uses_cache_client(self):
+        """Тест: по умолчанию отзывы передаются через клиент Redis с настройками кеша"""
+        # Act
+        store = tokens.RevokedTokenStore()
+
+        # Assert
+        assert store._redis is cache_module.cache.redis_client
+
+    def test_sync_loads_active_revocations(self):
+        """Тест: полная сверка загружает из Redis действующие отзывы"""
+        # Arrange
+        client = RecordingRedis(entries=[(b"sid-1", time.time() + 60)])
+        store = tokens.RevokedTokenStore(redis_client=client)
+
+        # Act
+        store.sync()
+
+        # Assert
+        assert store.is_revoked("sid-1")
+        assert client.calls == ["zrangebyscore"]
+
+
+class TestSessionLimit:
+    """Тесты ограничения числа активных сессий"""
+
+    def _active_tokens(self, db_session, user_id):
+        stmt = select(UserSession.session_token).where(
+            (UserSession.user_id == user_id) & (UserSession.is_active == True)
+        )
+        return set(db_session.scalars(stmt).all())
+
+    def test_login_keeps_single_session_by_default(self, db_session):
+        """Тест: по умолчанию новый вход деактивирует предыдущие сессии"""
+        # Arrange
+        user = User(username="single", email="single@example.com", hashed_password="x")
+        db_session.add(user)
+        db_session.commit()
+        service = auth.AuthService(db_session)
+
+        # Act
+        first_token = service.create_session(user.id)
+        last_token = service.create_session(user.id)
+
+        # Assert
+        assert self._active_tokens(db_session, user.id) == {last_token}
+        deactivated_at = db_session.scalar(
+            select(UserSession.deactivated_at).where(UserSession.session_token == first_token)
+        )
+        assert deactivated_at is not None
+
+    def test_login_keeps_n_newest_sessions(self, db_session):
+        """Тест: при лимите N остаются N самых новых сессий"""
+        # Arrange
+        user = User(username="worker", email="worker@example.com", hashed_password="x")
+        db_session.add(user)
+        db_session.commit()
+        service = auth.AuthService(db_session)
+
+        # Act
+        tokens_issued = [service.create_session(user.id, max_active_sessions=2) for _ in range(4)]
+
+        # Assert
+        assert self._active_tokens(db_session, user.id) == set(tokens_issued[-2:])
+
+
+class TestSessionGarbageCollection:
+    """Тесты очистки устаревших сессий"""
+
+    def test_purge_removes_expired_and_inactive_sessions(self, db_session):
+        """Тест: удаляются только истекшие и неактивные сессии старше срока хранения"""
+        # Arrange
+        user = User(username="gcuser", email="gc@example.com", hashed_password="x")
+        db_session.add(user)
+        db_session.commit()
+
+        now = datetime.now()
+        old = now - timedelta(days=10)
+        db_session.add_all([
+            UserSession(user_id=user.id, session_token="expired1", expires_at=old),
+            UserSession(user_id=user.id, session_token="expired2", expires_at=old),
+            UserSession(user_id=user.id, session_token="inactive", expires_at=now + timedelta(days=1),
+                        is_active=False, deactivated_at=old),
+            # Старая сессия, завершенная недавно, еще хранится
+            UserSession(user_id=user.id, session_token="recently_closed", expires_at=now + timedelta(days=1),
+                        is_active=False, created_at=old, deactivated_at=now),
+            UserSession(user_id=user.id, session_token="active", expires_at=now + timedelta(days=7)),
+        ])
+        db_session.commit()
+
+        # Act
+        removed = auth.AuthService(db_session).purge_sessions(retention_days=1, batch_size=2, pause_seconds=0)
+
+        # Assert
+        assert removed == 3
+        remaining = db_session.scalars(select(UserSession.session_token).order_by(UserSession.id)).all()
+        assert remaining == ["recently_closed", "active"]
@@ -0,0 +1,605 @@
+import asyncio
+import json
+import os
+import pytest
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from datetime import datetime, timedelta
+from fastapi import status
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app import api, background_tasks, crud, importers
+from app.crud import BackgroundTaskManager, StudentManager
+from app.models import Student
+from app.task_events import InMemoryTaskEvents
+from conftest import TestingSessionLocal
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestBackgroundTaskRegistry:
+    """Тесты реестра фоновых задач"""
+
+    def test_delete_students_task_status(self, client, auth_headers):
+        """Тест: статус и результат задачи сохраняются в БД"""
+        # Arrange
+        student_data = {
+            "last_name": "Фоновый",
+            "first_name": "Студент",
+            "faculty": "ФИТ",
+            "course": "Программирование",
+            "grade": 70
+        }
+        student_id = client.post("/students/", json=student_data, headers=auth_headers).json()["id"]
+
+        # Act
+        response = client.post(
+            "/background/delete-students",
+            json={"student_ids": [student_id, 9999]},
+            headers=auth_headers
+        )
+        task_id = response.json()["task_id"]
+        status_response = client.get(f"/background/tasks/{task_id}", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert status_response.status_code == status.HTTP_200_OK
+        data = status_response.json()
+        assert data["task_id"] == task_id
+        assert data["task_type"] == "delete_students"
+        assert data["status"] == "completed"
+        assert data["parameters"] == {"student_ids": [student_id, 9999]}
+        assert data["result"]["deleted_count"] == 1
+        assert data["completed_at"] is not None
+
+    def test_load_csv_missing_file_marks_task_failed(self, client, auth_headers, tmp_path):
+        """Тест: ошибка задачи отражается в статусе failed"""
+        # Act
+        response = client.post(
+            "/background/load-csv",
+            json={"csv_file_path": str(tmp_path / "missing.csv")},
+            headers=auth_headers
+        )
+        task_id = response.json()["task_id"]
+        status_response = client.get(f"/background/tasks/{task_id}", headers=auth_headers)
+
+        # Assert
+        data = status_response.json()
+        assert data["status"] == "failed"
+        assert data["result"]["success"] is False
+
+    def test_unknown_task_not_found(self, client, auth_headers):
+        """Тест получения статуса несуществующей задачи"""
+        # Act
+        response = client.get("/background/tasks/unknown", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_purge_finished_tasks(self, db_session):
+        """Тест: удаляются только завершенные задачи старше срока хранения"""
+        # Arrange
+        registry = BackgroundTaskManager(db_session)
+        old_task = registry.create_task("delete_students", {"student_ids": []})
+        recent_task = registry.create_task("delete_students", {"student_ids": []})
+        running_task = registry.create_task("delete_students", {"student_ids": []})
+        registry.finish_task(old_task.task_id, {"success": True})
+        registry.finish_task(recent_task.task_id, {"success": True})
+        old_task.completed_at = datetime.now() - timedelta(hours=48)
+        db_session.commit()
+        old_task_id = old_task.task_id
+
+        # Act
+        removed = registry.purge_finished_tasks(retention_hours=24)
+
+        # Assert
+        assert removed == 1
+        assert registry.get_task(old_task_id) is None
+        assert registry.get_task(recent_task.task_id) is not None
+        assert registry.get_task(running_task.task_id) is not None
+
+
+class TestTaskDeduplication:
+    """Тесты защиты от повторного запуска задач"""
+
+    def test_idempotency_key_returns_existing_task(self, client, auth_headers, csv_file):
+        """Тест: повтор запроса с тем же ключом не запускает импорт повторно"""
+        # Arrange
+        headers = {**auth_headers, "Idempotency-Key": "import-1"}
+
+        # Act
+        first = client.post("/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=headers)
+        second = client.post("/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=headers)
+        students = client.get("/students/", headers=auth_headers).json()
+
+        # Assert
+        assert second.json()["task_id"] == first.json()["task_id"]
+        assert second.json()["status"] == "completed"
+        assert students["total"] == 3
+
+    def test_idempotency_key_for_other_task_type_conflict(self, client, auth_headers, csv_file):
+        """Тест: ключ, использованный для другого типа задачи, отклоняется"""
+        # Arrange
+        headers = {**auth_headers, "Idempotency-Key": "shared-key"}
+        client.post("/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=headers)
+
+        # Act
+        response = client.post("/background/delete-students", json={"student_ids": [1]}, headers=headers)
+
+        # Assert
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_identical_in_flight_task_reused(self, db_session):
+        """Тест: незавершенная задача с теми же параметрами используется повторно"""
+        # Arrange
+        registry = BackgroundTaskManager(db_session)
+        task = registry.create_task("delete_students", {"student_ids": [1, 2]})
+
+        # Act
+        duplicate, duplicate_created = registry.get_or_create_task("delete_students", {"student_ids": [1, 2]})
+        registry.finish_task(task.task_id, {"success": True})
+        new_task, new_created = registry.get_or_create_task("delete_students", {"student_ids": [1, 2]})
+
+        # Assert
+        assert duplicate.task_id == task.task_id
+        assert duplicate_created is False
+        assert new_created is True
+        assert new_task.task_id != task.task_id
+
+
+class TestTaskSessions:
+    """Тесты сессий БД фоновых задач"""
+
+    def test_task_runs_in_own_session(self, db_session, monkeypatch):
+        """Тест: задача получает новую сессию, которая закрывается после выполнения"""
+        # Arrange
+        task_id = BackgroundTaskManager(db_session).create_task("delete_students", {}).task_id
+        opened = []
+
+        def session_factory():
+            session = TestingSessionLocal()
+            opened.append(session)
+            return session
+
+        monkeypatch.setattr(background_tasks, "SessionLocal", session_factory)
+        used_sessions = []
+
+        def job(db, context):
+            used_sessions.append(db)
+            return {"success": True}
+
+        # Act
+        background_tasks.run_task_in_new_session(task_id, job)
+
+        # Assert
+        assert used_sessions == opened
+        assert used_sessions[0] is not db_session
+        assert not opened[0].in_transaction()
+        assert BackgroundTaskManager(db_session).get_task(task_id).status == "completed"
+
+
+class TestTaskCancellation:
+    """Тесты отмены, ограничения времени и очереди задач"""
+
+    def test_cancel_pending_task(self, client, auth_headers, db_session):
+        """Тест: ожидающая задача отменяется сразу и не запускается"""
+        # Arrange
+        task = BackgroundTaskManager(db_session).create_task("delete_students", {"student_ids": []})
+        calls = []
+
+        # Act
+        response = client.delete(f"/background/tasks/{task.task_id}", headers=auth_headers)
+        background_tasks.execute_registered_task(db_session, task.task_id, lambda db, context: calls.append(1))
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "cancelled"
+        assert calls == []
+
+    def test_running_task_stops_between_batches(self, db_session):
+        """Тест: выполняемая задача останавливается при следующем отчете о прогрессе"""
+        # Arrange
+        registry = BackgroundTaskManager(db_session)
+        task_id = registry.create_task("load_csv", {}).task_id
+        batches = []
+
+        def job(db, context):
+            for batch in range(3):
+                batches.append(batch)
+                if batch == 0:
+                    with TestingSessionLocal() as other_db:
+                        BackgroundTaskManager(other_db).request_cancel(task_id)
+                context.report_progress({"batches": len(batches)})
+            return {"success": True}
+
+        # Act
+        result = background_tasks.execute_registered_task(db_session, task_id, job)
+
+        # Assert
+        assert result["success"] is False
+        assert batches == [0]
+        assert registry.get_task(task_id).status == "cancelled"
+
+    def test_task_timeout_marks_failed(self, db_session, monkeypatch):
+        """Тест: задача, превысившая время выполнения, завершается с ошибкой"""
+        # Arrange
+        monkeypatch.setattr(background_tasks, "TASK_TIMEOUT_SECONDS", 0.01)
+        registry = BackgroundTaskManager(db_session)
+        task_id = registry.create_task("load_csv", {}).task_id
+
+        def job(db, context):
+            time.sleep(0.02)
+            context.report_progress({})
+            return {"success": True}
+
+        # Act
+        result = background_tasks.execute_registered_task(db_session, task_id, job)
+
+        # Assert
+        assert "Превышено время" in result["message"]
+        assert registry.get_task(task_id).status == "failed"
+
+    def test_cancel_finished_task_conflict(self, client, auth_headers, db_session):
+        """Тест: завершенную задачу отменить нельзя"""
+        # Arrange
+        registry = BackgroundTaskManager(db_session)
+        task_id = registry.create_task("delete_students", {}).task_id
+        registry.finish_task(task_id, {"success": True})
+
+        # Act
+        response = client.delete(f"/background/tasks/{task_id}", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_task_slots_queue_by_type(self):
+        """Тест: сверх лимита типа задача ждет в очереди без потока и стартует после освобождения места"""
+        # Arrange
+        slots = background_tasks.TaskSlots({"load_csv": 1}, default_limit=1, total_limit=2)
+        queue = background_tasks.LocalTaskQueue(slots, max_workers=4)
+        release_first = threading.Event()
+        started = []
+
+        def job(name, event=None):
+            started.append(name)
+            if event is not None:
+                event.wait(5)
+
+        # Act
+        queue.submit("load_csv", job, "first", release_first)
+        queue.submit("load_csv", job, "second")
+        queue.submit("delete_students", job, "other")
+        time.sleep(0.1)
+        started_while_busy = list(started)
+        release_first.set()
+        finished = queue.join(timeout=5)
+
+        # Assert
+        assert sorted(started_while_busy) == ["first", "other"]
+        assert finished
+        assert started[-1] == "second"
+
+
+@pytest.fixture
+def graded_students(db_session):
+    """Пять студентов ФИТ с оценками 0, 5, 10, 15, 20 и один студент ФГМИ"""
+    manager = StudentManager(db_session)
+    for grade in range(0, 25, 5):
+        manager.create_student({
+            "last_name": f"Студент{grade}", "first_name": "Иван", "faculty": "ФИТ", "course": "Алгебра", "grade": grade
+        })
+    manager.create_student({
+        "last_name": "Сидоров", "first_name": "Сидор", "faculty": "ФГМИ", "course": "Алгебра", "grade": 0
+    })
+
+
+class TestFilteredBulkOperations:
+    """Тесты массового удаления и изменения по условиям"""
+
+    def test_delete_by_filter_in_batches(self, db_session, graded_students):
+        """Тест: удаляются только подходящие строки, по одной пачке за транзакцию"""
+        # Arrange
+        chunks = []
+
+        # Act
+        deleted = StudentManager(db_session).delete_students_by_filter(
+            {"faculty": "ФИТ", "grade_lt": 15}, batch_size=2, chunk_callback=chunks.append
+        )
+
+        # Assert
+        remaining = db_session.scalars(select(Student.last_name).order_by(Student.id)).all()
+        assert deleted == 3
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert remaining == ["Студент15", "Студент20", "Сидоров"]
+
+    def test_delete_by_ids_in_batches(self, db_session, graded_students):
+        """Тест: удаление по списку ID идет одним DELETE на пачку, повторы и несуществующие ID пропускаются"""
+        # Arrange
+        ids = db_session.scalars(select(Student.id).order_by(Student.id)).all()
+        chunks = []
+
+        # Act
+        deleted = StudentManager(db_session).delete_students_by_ids(
+            [ids[0], ids[1], ids[1], 9999, ids[2]], batch_size=2, sleep_seconds=0, chunk_callback=chunks.append
+        )
+
+        # Assert
+        remaining = db_session.scalars(select(Student.id).order_by(Student.id)).all()
+        assert deleted == 3
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert remaining == ids[3:]
+
+    def test_delete_by_ids_task_invalidates_cache_per_chunk(self, db_session, graded_students, monkeypatch):
+        """Тест: задача удаления по ID сбрасывает кеш и сохраняет прогресс один раз на пачку"""
+        # Arrange
+        ids = db_session.scalars(select(Student.id).order_by(Student.id)).all()
+        invalidations = []
+        monkeypatch.setattr(background_tasks, "BULK_BATCH_SIZE", 2)
+        monkeypatch.setattr(background_tasks.cache, "delete_many", invalidations.append)
+
+        # Act
+        result = background_tasks.delete_students_by_ids(db_session, ids[:5])
+
+        # Assert
+        assert result["deleted_count"] == 5
+        assert len(invalidations) == 3
+        assert f"students:{ids[0]}" in invalidations[0]
+
+    def test_update_still_matching_rows_once(self, db_session, graded_students):
+        """Тест: строки, подходящие под условия и после изменения, не обрабатываются повторно"""
+        # Act
+        updated = StudentManager(db_session).update_students_by_filter(
+            {"grade_lt": 10}, {"grade": 1}, batch_size=1
+        )
+
+        # Assert
+        assert updated == 3
+        assert db_session.scalar(select(func.count(Student.id)).where(Student.grade == 1)) == 3
+
+    def test_update_by_filter_endpoint(self, client, auth_headers, graded_students):
+        """Тест: перенос студентов с курса на курс фоновой задачей"""
+        # Act
+        response = client.post(
+            "/background/update-students-by-filter",
+            json={"filter": {"course": "Алгебра", "faculty": "ФИТ"}, "changes": {"course": "Геометрия"},
+                  "batch_size": 2},
+            headers=auth_headers
+        )
+        task = client.get(f"/background/tasks/{response.json()['task_id']}", headers=auth_headers).json()
+
+        # Assert
+        assert task["status"] == "completed"
+        assert task["result"]["updated_count"] == 5
+        assert task["progress"]["updated_count"] == 5
+
+    def test_delete_by_filter_endpoint(self, client, auth_headers, graded_students):
+        """Тест: удаление по условиям фоновой задачей"""
+        # Act
+        response = client.post(
+            "/background/delete-students-by-filter",
+            json={"filter": {"grade_gte": 15}, "sleep_seconds": 0},
+            headers=auth_headers
+        )
+        task = client.get(f"/background/tasks/{response.json()['task_id']}", headers=auth_headers).json()
+
+        # Assert
+        assert task["status"] == "completed"
+        assert task["result"]["deleted_count"] == 2
+
+    def test_empty_filter_rejected(self, client, auth_headers):
+        """Тест: пустой фильтр и пустой набор изменений отклоняются"""
+        # Act
+        delete_response = client.post(
+            "/background/delete-students-by-filter", json={"filter": {}}, headers=auth_headers
+        )
+        update_response = client.post(
+            "/background/update-students-by-filter",
+            json={"filter": {"faculty": "ФИТ"}, "changes": {}},
+            headers=auth_headers
+        )
+
+        # Assert
+        assert delete_response.status_code == status.HTTP_400_BAD_REQUEST
+        assert update_response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestCeleryExecutor:
+    """Тесты выполнения задач через Celery"""
+
+    @pytest.fixture
+    def celery_eager(self, monkeypatch):
+        """Выполнение задач Celery синхронно на тестовой БД"""
+        monkeypatch.setattr(background_tasks, "TASK_EXECUTOR", "celery")
+        monkeypatch.setattr(background_tasks, "SessionLocal", TestingSessionLocal)
+        monkeypatch.setitem(background_tasks.celery_app.conf, "task_always_eager", True)
+
+    def test_delete_students_via_celery(self, client, auth_headers, celery_eager):
+        """Тест: задача удаления выполняется воркером Celery и обновляет реестр"""
+        # Arrange
+        student_data = {
+            "last_name": "Селери",
+            "first_name": "Воркер",
+            "faculty": "ФИТ",
+            "course": "Очереди",
+            "grade": 60
+        }
+        student_id = client.post("/students/", json=student_data, headers=auth_headers).json()["id"]
+
+        # Act
+        response = client.post(
+            "/background/delete-students",
+            json={"student_ids": [student_id]},
+            headers=auth_headers
+        )
+        task_id = response.json()["task_id"]
+        status_response = client.get(f"/background/tasks/{task_id}", headers=auth_headers)
+
+        # Assert
+        data = status_response.json()
+        assert data["status"] == "completed"
+        assert data["result"]["deleted_count"] == 1
+        assert client.get(f"/students/{student_id}", headers=auth_headers).status_code == status.HTTP_404_NOT_FOUND
+
+
+    def test_transient_database_error_retried(self, client, auth_headers, db_session, csv_file, celery_eager,
+                                              monkeypatch):
+        """Тест: временная ошибка БД при импорте повторяется и продолжает импорт с контрольной точки"""
+        # Arrange
+        insert_batch = StudentManager.insert_students_batch
+        calls = []
+
+        def flaky_insert(self, students_data, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            return insert_batch(self, students_data, *args, **kwargs)
+
+        monkeypatch.setattr(StudentManager, "insert_students_batch", flaky_insert)
+        monkeypatch.setattr(crud, "batched", lambda rows, _: importers.batched(rows, 2))
+
+        # Act
+        response = client.post("/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=auth_headers)
+        data = client.get(f"/background/tasks/{response.json()['task_id']}", headers=auth_headers).json()
+
+        # Assert
+        assert data["status"] == "completed"
+        assert data["result"]["count"] == 3
+        assert len(calls) == 4
+        assert db_session.scalar(select(func.count(Student.id))) == 3
+
+
+class TestTaskEvents:
+    """Тесты потока событий фоновых задач"""
+
+    def test_events_delivered_across_threads(self):
+        """Тест: событие, опубликованное из потока задачи, приходит подписчику"""
+        # Arrange
+        events = InMemoryTaskEvents(max_queued=2)
+
+        async def receive():
+            async with events.subscribe("task-1") as subscription:
+                publisher = threading.Thread(target=lambda: [
+                    events.publish("task-1", "progress", {"rows_read": rows}) for rows in (1, 2, 3)
+                ])
+                publisher.start()
+                publisher.join()
+                return [await subscription.get(1), await subscription.get(1), await subscription.get(0.01)]
+
+        # Act
+        received = asyncio.run(receive())
+
+        # Assert
+        assert [message and message["data"]["rows_read"] for message in received] == [2, 3, None]
+
+    def test_redis_events_use_configured_host(self):
+        """Тест: канал событий в Redis подключается к серверу из REDIS_HOST/REDIS_PORT/REDIS_DB"""
+        # Arrange
+        script = textwrap.dedent("""
+            import asyncio, json
+            from app import task_events
+
+            created = []
+            create_client = task_events.create_async_redis_client
+
+            def record_client():
+                created.append(create_client())
+                return created[-1]
+
+            task_events.create_async_redis_client = record_client
+
+            async def subscribe():
+                async with task_events.RedisTaskEvents().subscribe("task-1"):
+                    pass
+
+            asyncio.run(subscribe())
+            subscriber = created[0].connection_pool.connection_kwargs
+            publisher = task_events.cache.redis_client.connection_pool.connection_kwargs
+            print(json.dumps([[c["host"], c["port"], c["db"]] for c in (subscriber, publisher)]))
+        """)
+        env = dict(os.environ, REDIS_HOST="127.0.0.1", REDIS_PORT="6390", REDIS_DB="3")
+
+        # Act
+        result = subprocess.run(
+            [sys.executable, "-c", script], env=env, cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=60
+        )
+
+        # Assert
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout.splitlines()[-1]) == [["127.0.0.1", 6390, 3]] * 2
+
+    def test_stream_of_finished_task(self, client, auth_headers, csv_file):
+        """Тест: для завершенной задачи приходит одно событие status, и поток закрывается"""
+        # Arrange
+        response = client.post("/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=auth_headers)
+
+        # Act
+        stream = client.get(f"/background/tasks/{response.json()['task_id']}/events", headers=auth_headers)
+
+        # Assert
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        assert stream.text.count("event: ") == 1
+        assert stream.text.startswith("event: status\n")
+        assert '"status": "completed"' in stream.text
+
+    def test_stream_reads_task_off_event_loop(self, client, auth_headers, csv_file, monkeypatch):
+        """Тест: поток событий читает состояние задачи из БД не в цикле событий"""
+        # Arrange
+        task_id = client.post(
+            "/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=auth_headers
+        ).json()["task_id"]
+        on_event_loop = []
+        get_task = BackgroundTaskManager.get_task
+
+        def record_get_task(registry, *args):
+            try:
+                asyncio.get_running_loop()
+                on_event_loop.append(True)
+            except RuntimeError:
+                on_event_loop.append(False)
+            return get_task(registry, *args)
+
+        monkeypatch.setattr(BackgroundTaskManager, "get_task", record_get_task)
+
+        # Act
+        stream = client.get(f"/background/tasks/{task_id}/events", headers=auth_headers)
+
+        # Assert
+        assert stream.status_code == status.HTTP_200_OK
+        assert on_event_loop == [False, False]
+
+    def test_stream_pushes_progress_until_finished(self, client, auth_headers, db_session, monkeypatch):
+        """Тест: прогресс и результат выполняемой задачи приходят в одном потоке"""
+        # Arrange
+        monkeypatch.setattr(api, "TASK_EVENTS_HEARTBEAT_SECONDS", 5)
+        task_id = BackgroundTaskManager(db_session).create_task("load_csv", {}).task_id
+
+        def run_task():
+            time.sleep(0.3)
+            registry = BackgroundTaskManager(TestingSessionLocal())
+            registry.mark_running(task_id)
+            registry.update_progress(task_id, {"rows_read": 10})
+            registry.finish_task(task_id, {"success": True, "count": 10})
+
+        worker = threading.Thread(target=run_task)
+        worker.start()
+
+        # Act
+        stream = client.get(f"/background/tasks/{task_id}/events", headers=auth_headers)
+        worker.join()
+
+        # Assert
+        events = [line.split(": ", 1)[1] for line in stream.text.splitlines() if line.startswith("event: ")]
+        assert events == ["status", "status", "progress", "finished"]
+        assert '"count": 10' in stream.text
+
+    def test_stream_unknown_task(self, client, auth_headers):
+        """Тест: поток событий несуществующей задачи"""
+        # Act
+        response = client.get("/background/tasks/unknown/events", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,927 @@
+import csv
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import socket
+import threading
+import time
+import uvicorn
+from types import SimpleNamespace
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app import background_tasks, crud, importers
+from app.crud import BackgroundTaskManager, StudentManager
+from app.api import app
+from app.importers import (
+    CheckpointedCSVReader, JSONLinesReader, RejectedRowsReport, parse_csv_parallel, resolve_import_format,
+    rows_to_copy_buffer, split_csv_byte_ranges
+)
+from app.models import Student
+from conftest import CSV_HEADER, TestingSessionLocal, wait_for_task
+
+
+class TestCSVImport:
+    """Тесты потокового импорта CSV"""
+
+    def test_load_from_csv_in_batches(self, db_session, csv_file):
+        """Тест: импорт пачками с отчетом о прогрессе после каждой пачки"""
+        # Arrange
+        progress = []
+
+        # Act
+        count = StudentManager(db_session).load_from_csv(
+            str(csv_file), batch_size=2, progress_callback=progress.append
+        )
+
+        # Assert
+        assert count == 3
+        assert db_session.scalar(select(func.count(Student.id))) == 3
+        assert [p["rows_read"] for p in progress] == [2, 4, 5]
+        assert progress[-1]["inserted"] == 3
+        assert progress[-1]["rejected"] == 2
+        assert "rows_per_sec" in progress[-1]
+
+    def test_load_from_missing_file(self, db_session, tmp_path):
+        """Тест импорта несуществующего файла"""
+        # Act
+        count = StudentManager(db_session).load_from_csv(str(tmp_path / "missing.csv"))
+
+        # Assert
+        assert count == 0
+
+    def test_background_load_reports_progress(self, client, auth_headers, csv_file):
+        """Тест: прогресс импорта сохраняется в записи задачи"""
+        # Act
+        response = client.post(
+            "/background/load-csv",
+            json={"csv_file_path": str(csv_file)},
+            headers=auth_headers
+        )
+        task_id = response.json()["task_id"]
+        data = client.get(f"/background/tasks/{task_id}", headers=auth_headers).json()
+
+        # Assert
+        assert data["status"] == "completed"
+        assert data["result"]["count"] == 3
+        assert data["progress"]["rows_read"] == 5
+        assert data["progress"]["rejected"] == 2
+
+    def test_upload_csv_streams_into_batches(self, client, auth_headers, csv_file):
+        """Тест: загруженный файл импортируется потоково с отчетом о прогрессе"""
+        # Act
+        response = client.post(
+            "/background/upload-csv",
+            files={"file": ("students.csv", csv_file.read_bytes(), "text/csv")},
+            headers=auth_headers
+        )
+        task_id = response.json()["task_id"]
+        data = wait_for_task(client, auth_headers, task_id)
+
+        # Assert
+        assert response.status_code == 202
+        assert response.headers["location"] == f"/background/tasks/{task_id}"
+        assert data["status"] == "completed"
+        assert data["task_type"] == "upload_csv"
+        assert data["result"]["count"] == 3
+        assert data["progress"]["rows_read"] == 5
+
+    def test_upload_csv_keeps_quoted_newlines(self, client, auth_headers):
+        """Тест: значение с переводом строки в кавычках не разрывает строку"""
+        # Arrange
+        content = (CSV_HEADER + 'Иванов,"Иван\nПетрович",ФИТ,Программирование,85\n').encode("utf-8")
+
+        # Act
+        response = client.post(
+            "/background/upload-csv",
+            files={"file": ("students.csv", content, "text/csv")},
+            headers=auth_headers
+        )
+        data = wait_for_task(client, auth_headers, response.json()["task_id"])
+        students = client.get("/students/", headers=auth_headers).json()["students"]
+
+        # Assert
+        assert data["status"] == "completed"
+        assert students[0]["first_name"] == "Иван\nПетрович"
+
+    def test_truncated_upload_fails_and_rolls_back(self, client, auth_headers, db_session, monkeypatch):
+        """Тест: тело без завершающей границы multipart не импортируется даже частично"""
+        # Arrange
+        rows = "".join(f"Студент{i},Иван,ФИТ,Курс,{i}\n" for i in range(20))
+        body = (
+            "--boundary\r\n"
+            'Content-Disposition: form-data; name="file"; filename="students.csv"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+            + CSV_HEADER + rows + "Обрыв,Ив"
+        ).encode("utf-8")
+        headers = {**auth_headers, "Content-Type": "multipart/form-data; boundary=boundary"}
+        # Пачки до обрыва успевают зафиксироваться
+        monkeypatch.setattr(crud, "batched", lambda rows, _: importers.batched(rows, 5))
+
+        # Act
+        response = client.post("/background/upload-csv", content=body, headers=headers)
+        data = wait_for_task(client, auth_headers, response.json()["task_id"])
+
+        # Assert
+        assert response.status_code == 202
+        assert data["status"] == "failed"
+        assert "Загрузка прервана" in data["result"]["message"]
+        assert db_session.scalar(select(func.count(Student.id))) == 0
+
+    def test_upload_with_expect_continue(self, client, auth_headers, db_session):
+        """Тест: клиент с Expect: 100-continue получает 100 Continue, отправляет тело, и импорт завершается"""
+        # Arrange
+        body = (
+            "--boundary\r\n"
+            'Content-Disposition: form-data; name="file"; filename="students.csv"\r\n'
+            "Content-Type: text/csv\r\n\r\n"
+            + CSV_HEADER + "Иванов,Иван,ФИТ,Физика,90\nПетров,Петр,ФИТ,Физика,85\n"
+            "\r\n--boundary--\r\n"
+        ).encode("utf-8")
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(app, lifespan="off", ws="none", log_level="warning"))
+        thread = threading.Thread(target=server.run, kwargs={"sockets": [listener]}, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not server.started and time.monotonic() < deadline:
+            time.sleep(0.01)
+        request_head = (
+            f"POST /background/upload-csv HTTP/1.1\r\n"
+            f"Host: 127.0.0.1:{port}\r\n"
+            f"Authorization: {auth_headers['Authorization']}\r\n"
+            f"Content-Type: multipart/form-data; boundary=boundary\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Expect: 100-continue\r\n\r\n"
+        ).encode("ascii")
+
+        # Act
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as connection:
+                connection.sendall(request_head)
+                interim = connection.recv(1024)
+                connection.sendall(body)
+                response = b""
+                while b"}" not in response:
+                    chunk = connection.recv(4096)
+                    if not chunk:
+                        break
+                    response += chunk
+        finally:
+            server.should_exit = True
+            thread.join(5)
+        task_id = json.loads(response.split(b"\r\n\r\n", 1)[1])["task_id"]
+        data = wait_for_task(client, auth_headers, task_id)
+
+        # Assert
+        assert interim.startswith(b"HTTP/1.1 100 Continue")
+        assert response.startswith(b"HTTP/1.1 202")
+        assert data["status"] == "completed"
+        assert db_session.scalar(select(func.count(Student.id))) == 2
+
+    def test_upload_csv_requires_multipart(self, client, auth_headers):
+        """Тест: запрос без multipart/form-data отклоняется"""
+        # Act
+        response = client.post("/background/upload-csv", content=b"data", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_load_csv_outside_base_dir_rejected(self, client, auth_headers, csv_file, tmp_path, monkeypatch):
+        """Тест: путь вне IMPORT_BASE_DIR не принимается"""
+        # Arrange
+        allowed_dir = tmp_path / "imports"
+        allowed_dir.mkdir()
+        monkeypatch.setattr(importers, "IMPORT_BASE_DIR", str(allowed_dir))
+
+        # Act
+        response = client.post(
+            "/background/load-csv",
+            json={"csv_file_path": str(allowed_dir / ".." / csv_file.name)},
+            headers=auth_headers
+        )
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_load_csv_relative_path_inside_base_dir(self, client, auth_headers, csv_file):
+        """Тест: относительный путь отсчитывается от IMPORT_BASE_DIR, абсолютный путь вне него отклоняется"""
+        # Act
+        response = client.post("/background/load-csv", json={"csv_file_path": csv_file.name}, headers=auth_headers)
+        outside = client.post("/background/load-csv", json={"csv_file_path": "/etc/passwd"}, headers=auth_headers)
+
+        # Assert
+        assert response.status_code == 200
+        assert client.get(f"/background/tasks/{response.json()['task_id']}", headers=auth_headers).json()["status"] == "completed"
+        assert outside.status_code == 400
+
+    def test_copy_buffer_escapes_values(self):
+        """Тест: буфер для COPY корректно экранирует запятые и кавычки"""
+        # Arrange
+        students_data = [{
+            "last_name": 'О\'Нил, "младший"',
+            "first_name": "Джон",
+            "faculty": "ФИТ",
+            "course": "Базы данных",
+            "grade": 77
+        }]
+
+        # Act
+        buffer = rows_to_copy_buffer(students_data)
+
+        # Assert
+        assert list(csv.reader(buffer)) == [['О\'Нил, "младший"', "Джон", "ФИТ", "Базы данных", "77"]]
+
+
+class FakeCopyCursor:
+    """Курсор DBAPI с copy_expert: запоминает выполненный SQL и данные COPY"""
+
+    def __init__(self, copy_error=None, rowcount=0):
+        self.statements = []
+        self.copied = []
+        self.copy_error = copy_error
+        self.rowcount = rowcount
+        self.closed = False
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, buffer):
+        self.statements.append(sql)
+        self.copied.append(buffer.read())
+        if self.copy_error is not None:
+            error, self.copy_error = self.copy_error, None
+            raise error
+
+    def close(self):
+        self.closed = True
+
+
+class FakePostgresSession:
+    """Сессия, которая отдает соединение PostgreSQL с поддельным курсором"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.commits = 0
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name="postgresql"))
+
+    def connection(self):
+        return SimpleNamespace(connection=SimpleNamespace(cursor=lambda: self.cursor))
+
+    def commit(self):
+        self.commits += 1
+
+
+class PostgresError(Exception):
+    """Ошибка драйвера с кодом SQLSTATE, как у psycopg2"""
+
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+COPY_COLUMNS = "last_name, first_name, faculty, course, grade, import_batch_id"
+NATURAL_KEY = "last_name, first_name, faculty, course"
+
+
+class TestPostgresCopy:
+    """Тесты загрузки пачек в PostgreSQL через COPY на поддельном курсоре"""
+
+    @pytest.fixture(autouse=True)
+    def direct_copy(self, monkeypatch):
+        monkeypatch.setattr(crud, "IMPORT_POSTGRES_COPY", "direct")
+
+    def test_direct_copy_payload(self):
+        """Тест: при insert пачка идет прямым COPY под точкой сохранения, спецсимволы экранируются по правилам CSV"""
+        # Arrange
+        cursor = FakeCopyCursor()
+        session = FakePostgresSession(cursor)
+        students_data = [{
+            "last_name": "Иванов\tмл.", "first_name": "Анна\nМария", "faculty": "C:\\ФИТ",
+            "course": 'Курс "А", ч.1', "grade": 90
+        }]
+
+        # Act
+        inserted = StudentManager(session).insert_students_batch(students_data, mode="insert", import_batch_id="b-1")
+
+        # Assert
+        assert inserted == 1
+        assert cursor.statements == [
+            "SAVEPOINT students_copy",
+            f"COPY students ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT csv)",
+            "RELEASE SAVEPOINT students_copy",
+        ]
+        assert cursor.copied == ['Иванов\tмл.,"Анна\nМария",C:\\ФИТ,"Курс ""А"", ч.1",90,b-1\r\n']
+        assert cursor.closed
+        assert session.commits == 1
+
+    def test_unique_violation_falls_back_to_staging(self):
+        """Тест: при конфликте ключа пачка откатывается до точки сохранения и идет через staging"""
+        # Arrange
+        cursor = FakeCopyCursor(copy_error=PostgresError(crud.PG_UNIQUE_VIOLATION), rowcount=1)
+        students_data = [
+            {"last_name": "Иванов", "first_name": "Иван", "faculty": "ФИТ", "course": "Физика", "grade": 90},
+            {"last_name": "Петров", "first_name": "Петр", "faculty": "ФИТ", "course": "Физика", "grade": 85},
+        ]
+
+        # Act
+        inserted = StudentManager(FakePostgresSession(cursor)).insert_students_batch(
+            students_data, mode="insert", import_batch_id="b-1"
+        )
+
+        # Assert
+        assert inserted == 1
+        assert cursor.statements == [
+            "SAVEPOINT students_copy",
+            f"COPY students ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT csv)",
+            "ROLLBACK TO SAVEPOINT students_copy",
+            f"CREATE TEMP TABLE IF NOT EXISTS students_staging ON COMMIT DELETE ROWS "
+            f"AS SELECT {COPY_COLUMNS} FROM students WITH NO DATA",
+            f"COPY students_staging ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT csv)",
+            f"INSERT INTO students ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM students_staging "
+            f"ON CONFLICT ({NATURAL_KEY}) DO NOTHING",
+            "RELEASE SAVEPOINT students_copy",
+        ]
+        assert cursor.copied[0] == cursor.copied[1]
+        assert cursor.copied[1] == "Иванов,Иван,ФИТ,Физика,90,b-1\r\nПетров,Петр,ФИТ,Физика,85,b-1\r\n"
+
+    def test_other_copy_error_propagates(self):
+        """Тест: ошибки COPY, кроме конфликта ключа, не маскируются переходом на staging"""
+        # Arrange
+        cursor = FakeCopyCursor(copy_error=PostgresError("22P04"))
+        session = FakePostgresSession(cursor)
+        students_data = [{"last_name": "Иванов", "first_name": "Иван", "faculty": "ФИТ", "course": "Физика", "grade": 90}]
+
+        # Act
+        with pytest.raises(PostgresError):
+            StudentManager(session).insert_students_batch(students_data, mode="insert")
+
+        # Assert
+        assert cursor.statements[-1].startswith("COPY students (")
+        assert cursor.closed
+        assert session.commits == 0
+
+    def test_upsert_copies_via_staging(self):
+        """Тест: при upsert строки переносятся из staging с обновлением только изменившихся оценок"""
+        # Arrange
+        cursor = FakeCopyCursor(rowcount=2)
+        students_data = [
+            {"last_name": "Иванов", "first_name": "Иван", "faculty": "ФИТ", "course": "Физика", "grade": 90},
+            {"last_name": "Иванов", "first_name": "Иван", "faculty": "ФИТ", "course": "Физика", "grade": 95},
+        ]
+
+        # Act
+        inserted = StudentManager(FakePostgresSession(cursor)).insert_students_batch(
+            students_data, mode="upsert", import_batch_id="b-1"
+        )
+
+        # Assert
+        assert inserted == 2
+        assert cursor.statements[1:] == [
+            f"COPY students_staging ({COPY_COLUMNS}) FROM STDIN WITH (FORMAT csv)",
+            f"INSERT INTO students ({COPY_COLUMNS}) SELECT {COPY_COLUMNS} FROM students_staging "
+            f"ON CONFLICT ({NATURAL_KEY}) DO UPDATE SET grade = EXCLUDED.grade "
+            f"WHERE students.grade IS DISTINCT FROM EXCLUDED.grade",
+        ]
+        # Повтор ключа внутри пачки схлопывается до последней строки
+        assert cursor.copied == ["Иванов,Иван,ФИТ,Физика,95,b-1\r\n"]
+
+
+class TestRejectedRowsReport:
+    """Тесты отчета об отклоненных строках"""
+
+    def test_report_spills_to_file(self, tmp_path):
+        """Тест: при переполнении буфера отчет переносится в файл"""
+        # Arrange
+        report = RejectedRowsReport("task-1", max_buffered=2, reports_dir=str(tmp_path))
+
+        # Act
+        for row_num in range(1, 6):
+            report.add(row_num, "Оценка", "не целое число")
+        report.close()
+
+        # Assert
+        with open(report.path, encoding="utf-8") as file:
+            lines = list(csv.reader(file))
+        assert lines[0] == ["row", "field", "reason"]
+        assert [line[0] for line in lines[1:]] == ["1", "2", "3", "4", "5"]
+        assert report.summary() == {"total": 5, "by_field": {"Оценка": 5}, "in_file": True, "rows": []}
+
+    def test_task_status_contains_rejected_rows(self, client, auth_headers, csv_file):
+        """Тест: в статусе задачи есть сводка, отчет скачивается в формате CSV"""
+        # Act
+        task_id = client.post(
+            "/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=auth_headers
+        ).json()["task_id"]
+        data = client.get(f"/background/tasks/{task_id}", headers=auth_headers).json()
+        report = client.get(f"/background/tasks/{task_id}/rejected-rows", headers=auth_headers)
+
+        # Assert
+        rejected = data["result"]["rejected_rows"]
+        assert rejected["total"] == 2
+        assert rejected["by_field"] == {"Оценка": 2}
+        assert report.headers["content-type"].startswith("text/csv")
+        assert [row[0] for row in csv.reader(report.text.splitlines())] == ["row", "2", "4"]
+
+    def test_large_report_downloaded_from_file(self, client, auth_headers, csv_file, tmp_path, monkeypatch):
+        """Тест: отчет, перенесенный в файл, отдается из файла"""
+        # Arrange
+        monkeypatch.setattr(importers, "IMPORT_REJECTS_BUFFER_ROWS", 1)
+        monkeypatch.setattr(importers, "IMPORT_REPORTS_DIR", str(tmp_path / "reports"))
+
+        # Act
+        task_id = client.post(
+            "/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=auth_headers
+        ).json()["task_id"]
+        data = client.get(f"/background/tasks/{task_id}", headers=auth_headers).json()
+        report = client.get(f"/background/tasks/{task_id}/rejected-rows", headers=auth_headers)
+
+        # Assert
+        assert data["result"]["rejected_rows"]["in_file"] is True
+        assert len(report.text.splitlines()) == 3
+
+
+    @pytest.mark.parametrize("max_buffered", [1000, 1])
+    def test_report_resumed_from_checkpoint(self, db_session, csv_file, tmp_path, max_buffered):
+        """Тест: после возобновления отчет совпадает со счетчиком отклоненных строк"""
+        # Arrange
+        manager = StudentManager(db_session)
+        checkpoints = []
+
+        def crash(progress):
+            raise RuntimeError("Процесс остановлен")
+
+        def report():
+            return RejectedRowsReport("task-1", max_buffered=max_buffered, reports_dir=str(tmp_path))
+
+        with pytest.raises(RuntimeError):
+            manager.load_from_csv(str(csv_file), batch_size=2, progress_callback=crash,
+                                  checkpoint_callback=checkpoints.append, rejects=report())
+
+        # Act
+        rejects = report()
+        manager.load_from_csv(str(csv_file), batch_size=2, checkpoint=checkpoints[-1],
+                              checkpoint_callback=checkpoints.append, rejects=rejects)
+        rejects.close()
+
+        # Assert
+        if rejects.spilled:
+            with open(rejects.path, encoding="utf-8") as file:
+                rows = [line[0] for line in csv.reader(file)][1:]
+        else:
+            rows = [str(row[0]) for row in rejects.rows]
+        assert rejects.total == checkpoints[-1]["rejected"] == 2
+        assert rows == ["2", "4"]
+
+class TestUpsertImport:
+    """Тесты импорта с обновлением по естественному ключу"""
+
+    def test_reimport_is_noop(self, db_session, csv_file):
+        """Тест: повторный импорт того же файла не добавляет и не изменяет записи"""
+        # Arrange
+        manager = StudentManager(db_session)
+        manager.load_from_csv(str(csv_file))
+
+        # Act
+        count = manager.load_from_csv(str(csv_file))
+
+        # Assert
+        assert count == 0
+        assert db_session.scalar(select(func.count(Student.id))) == 3
+
+    def test_upsert_updates_changed_rows(self, db_session):
+        """Тест: изменившаяся оценка обновляется, дубли внутри пачки схлопываются"""
+        # Arrange
+        manager = StudentManager(db_session)
+        student = {"last_name": "Иванов", "first_name": "Иван", "faculty": "ФИТ", "course": "Базы данных"}
+        manager.insert_students_batch([{**student, "grade": 60}])
+
+        # Act
+        written = manager.insert_students_batch([{**student, "grade": 70}, {**student, "grade": 80}])
+
+        # Assert
+        assert written == 1
+        assert db_session.scalars(select(Student.grade)).all() == [80]
+
+    def test_insert_mode_skips_existing_rows(self, db_session):
+        """Тест: в режиме insert существующие записи пропускаются без изменений"""
+        # Arrange
+        manager = StudentManager(db_session)
+        student = {"last_name": "Иванов", "first_name": "Иван", "faculty": "ФИТ", "course": "Базы данных"}
+        manager.insert_students_batch([{**student, "grade": 60}], mode="insert")
+        new_student = {**student, "course": "Сети", "grade": 90}
+
+        # Act
+        written = manager.insert_students_batch([{**student, "grade": 70}, new_student], mode="insert")
+
+        # Assert
+        assert written == 1
+        assert db_session.scalars(select(Student.grade).order_by(Student.id)).all() == [60, 90]
+
+    def test_duplicate_student_conflict(self, client, auth_headers):
+        """Тест: повторное создание студента с тем же естественным ключом"""
+        # Arrange
+        student_data = {"last_name": "Дубль", "first_name": "Иван", "faculty": "ФИТ", "course": "Сети", "grade": 50}
+        client.post("/students/", json=student_data, headers=auth_headers)
+
+        # Act
+        response = client.post("/students/", json=student_data, headers=auth_headers)
+
+        # Assert
+        assert response.status_code == 409
+
+
+class TestResumableImport:
+    """Тесты контрольных точек и возобновления импорта"""
+
+    def test_reader_resumes_from_offset(self, tmp_path):
+        """Тест: чтение продолжается со смещения, в том числе после значения с переводом строки"""
+        # Arrange
+        path = tmp_path / "students.csv"
+        path.write_text(CSV_HEADER + 'А,"Б\nВ",ФИТ,Курс,1\nГ,Д,ФИТ,Курс,2\n', encoding="utf-8")
+        with open(path, "rb") as file:
+            first = CheckpointedCSVReader(file)
+            rows = iter(first)
+            _, first_row = next(rows)
+            offset = first.offset
+
+        # Act
+        with open(path, "rb") as file:
+            resumed = list(CheckpointedCSVReader(file, offset, row_num=1))
+
+        # Assert
+        assert first_row["Имя"] == "Б\nВ"
+        assert [(row_num, row["Фамилия"]) for row_num, row in resumed] == [(2, "Г")]
+
+    def test_load_resumes_from_checkpoint(self, db_session, csv_file):
+        """Тест: после сбоя импорт продолжается с последней зафиксированной пачки"""
+        # Arrange
+        manager = StudentManager(db_session)
+        checkpoints = []
+
+        def crash(progress):
+            raise RuntimeError("Процесс остановлен")
+
+        with pytest.raises(RuntimeError):
+            manager.load_from_csv(str(csv_file), batch_size=2, progress_callback=crash,
+                                  checkpoint_callback=checkpoints.append)
+
+        # Act
+        count = manager.load_from_csv(str(csv_file), batch_size=2, checkpoint=checkpoints[-1],
+                                      checkpoint_callback=checkpoints.append)
+
+        # Assert
+        assert checkpoints[0]["rows_read"] == 2
+        assert count == 3
+        assert checkpoints[-1]["rows_read"] == 5
+        assert checkpoints[-1]["rejected"] == 2
+        assert db_session.scalar(select(func.count(Student.id))) == 3
+
+    def test_resume_endpoint_continues_failed_task(self, client, auth_headers, db_session, csv_file):
+        """Тест: возобновление задачи с сохраненной контрольной точкой"""
+        # Arrange
+        registry = BackgroundTaskManager(db_session)
+        task_id = registry.create_task("load_csv", {"csv_file_path": str(csv_file)}).task_id
+        with open(csv_file, "rb") as file:
+            reader = CheckpointedCSVReader(file)
+            rows = iter(reader)
+            next(rows)
+            checkpoint = {"offset": reader.offset, "rows_read": 1, "inserted": 1, "rejected": 0}
+        registry.save_checkpoint(task_id, checkpoint)
+        registry.finish_task(task_id, {"success": False, "message": "Сбой"})
+
+        # Act
+        response = client.post(f"/background/tasks/{task_id}/resume", headers=auth_headers)
+        data = client.get(f"/background/tasks/{task_id}", headers=auth_headers).json()
+
+        # Assert
+        assert response.status_code == 200
+        assert data["status"] == "completed"
+        assert data["result"]["count"] == 3
+        assert data["checkpoint"]["rows_read"] == 5
+        assert db_session.scalar(select(func.count(Student.id))) == 2
+
+    def test_database_error_fails_task_with_checkpoint(self, client, auth_headers, db_session, csv_file, monkeypatch):
+        """Тест: ошибка БД посреди импорта завершает задачу с ошибкой, и ее можно возобновить"""
+        # Arrange
+        registry = BackgroundTaskManager(db_session)
+        task_id = registry.create_task("load_csv", {"csv_file_path": str(csv_file)}).task_id
+        insert_batch = StudentManager.insert_students_batch
+        calls = []
+
+        def failing_insert(self, students_data, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            return insert_batch(self, students_data, *args, **kwargs)
+
+        monkeypatch.setattr(StudentManager, "insert_students_batch", failing_insert)
+        monkeypatch.setattr(crud, "batched", lambda rows, _: importers.batched(rows, 2))
+
+        # Act
+        with TestingSessionLocal() as task_db:
+            background_tasks.execute_registered_task(
+                task_db, task_id, background_tasks.load_students_from_csv, str(csv_file), None, None
+            )
+        failed = registry.get_task(task_id)
+        failed_status, failed_checkpoint = failed.status, json.loads(failed.checkpoint)
+        monkeypatch.setattr(StudentManager, "insert_students_batch", insert_batch)
+        response = client.post(f"/background/tasks/{task_id}/resume", headers=auth_headers)
+        data = client.get(f"/background/tasks/{task_id}", headers=auth_headers).json()
+
+        # Assert
+        assert failed_status == "failed"
+        assert failed_checkpoint["rows_read"] == 2
+        assert response.status_code == 200
+        assert data["status"] == "completed"
+        assert db_session.scalar(select(func.count(Student.id))) == 3
+
+    def test_resume_completed_task_conflict(self, client, auth_headers, db_session, csv_file):
+        """Тест: успешно завершенную задачу возобновить нельзя"""
+        # Arrange
+        registry = BackgroundTaskManager(db_session)
+        task_id = registry.create_task("load_csv", {"csv_file_path": str(csv_file)}).task_id
+        registry.finish_task(task_id, {"success": True})
+
+        # Act
+        response = client.post(f"/background/tasks/{task_id}/resume", headers=auth_headers)
+
+        # Assert
+        assert response.status_code == 409
+
+
+class TestImportRollback:
+    """Тесты отката импорта по метке import_batch_id"""
+
+    def test_rollback_removes_only_imported_rows(self, client, auth_headers, csv_file):
+        """Тест: откат удаляет добавленные импортом строки и не трогает остальные"""
+        # Arrange
+        manual = {"last_name": "Ручной", "first_name": "Ввод", "faculty": "ФИТ", "course": "Сети", "grade": 55}
+        client.post("/students/", json=manual, headers=auth_headers)
+        existing = {"last_name": "Иванов", "first_name": "Иван", "faculty": "ФИТ",
+                    "course": "Программирование", "grade": 10}
+        client.post("/students/", json=existing, headers=auth_headers)
+        import_response = client.post(
+            "/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=auth_headers
+        )
+        import_batch_id = import_response.json()["task_id"]
+
+        # Act
+        response = client.post(f"/background/imports/{import_batch_id}/rollback", headers=auth_headers)
+        task = client.get(f"/background/tasks/{response.json()['task_id']}", headers=auth_headers).json()
+        students = client.get("/students/", headers=auth_headers).json()["students"]
+
+        # Assert
+        assert task["status"] == "completed"
+        assert task["result"]["deleted_count"] == 2
+        assert sorted(student["last_name"] for student in students) == ["Иванов", "Ручной"]
+
+    def test_delete_import_batch_in_chunks(self, db_session, csv_file):
+        """Тест: удаление идет пачками с передачей удаленных строк"""
+        # Arrange
+        manager = StudentManager(db_session)
+        manager.load_from_csv(str(csv_file), import_batch_id="batch-1")
+        chunks = []
+
+        # Act
+        removed = manager.delete_import_batch("batch-1", batch_size=2, chunk_callback=chunks.append)
+
+        # Assert
+        assert removed == 3
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert {faculty for chunk in chunks for _, faculty in chunk} == {"ФИТ", "ФГМИ", "ФЛА"}
+
+
+@pytest.fixture
+def multiline_csv_file(tmp_path):
+    """CSV файл, в котором значения в кавычках содержат переводы строк"""
+    path = tmp_path / "multiline.csv"
+    path.write_text(
+        CSV_HEADER
+        + 'Иванов,Иван,ФПМИ,"Мат. Анализ",85\n'
+        + 'Петров,Петр,ФПМИ,"Мат.\nАнализ",90\n'
+        + 'Сидоров,Сидор,"Физ.\nфак",Физика,75\n',
+        encoding="utf-8"
+    )
+    return path
+
+
+class TestParallelCSVParsing:
+    """Тесты параллельного разбора CSV"""
+
+    def test_byte_ranges_aligned_on_lines(self, csv_file):
+        """Тест: диапазоны покрывают файл и начинаются с новой строки"""
+        # Act
+        fieldnames, ranges = split_csv_byte_ranges(str(csv_file), chunk_bytes=16)
+
+        # Assert
+        data = csv_file.read_bytes()
+        assert fieldnames == ["Фамилия", "Имя", "Факультет", "Курс", "Оценка"]
+        assert ranges[0][0] == data.index(b"\n") + 1
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            assert end == start
+            assert data[start - 1:start] == b"\n"
+
+    def test_parallel_parse_matches_sequential(self, csv_file):
+        """Тест: параллельный разбор дает те же строки в том же порядке"""
+        # Act
+        chunks = list(parse_csv_parallel(str(csv_file), workers=2, chunk_bytes=16))
+
+        # Assert
+        rows = [row for chunk in chunks for row in chunk.rows]
+        assert [row["last_name"] for row in rows] == ["Иванов", "Сидоров", "Смирнова"]
+        assert sum(chunk.rows_read for chunk in chunks) == 5
+        assert sum(len(chunk.rejected) for chunk in chunks) == 2
+
+    def test_byte_ranges_keep_multiline_quoted_values(self, multiline_csv_file):
+        """Тест: граница блока не попадает внутрь значения в кавычках с переводом строки"""
+        # Act
+        fieldnames, ranges = split_csv_byte_ranges(str(multiline_csv_file), chunk_bytes=8)
+
+        # Assert
+        data = multiline_csv_file.read_bytes()
+        for start, end in ranges:
+            assert data[start:end].count(b'"') % 2 == 0
+        assert ranges[-1][1] == len(data)
+
+    def test_parallel_parse_multiline_quoted_values(self, db_session, multiline_csv_file):
+        """Тест: строки с многострочными значениями не отклоняются при параллельном разборе"""
+        # Act
+        chunks = list(parse_csv_parallel(str(multiline_csv_file), workers=2, chunk_bytes=8))
+        count = StudentManager(db_session).load_from_csv(str(multiline_csv_file), parse_workers=2, chunk_bytes=8)
+
+        # Assert
+        assert sum(chunk.rows_read for chunk in chunks) == 3
+        assert sum(len(chunk.rejected) for chunk in chunks) == 0
+        assert count == 3
+        assert db_session.scalar(
+            select(Student.course).where(Student.last_name == "Петров")
+        ) == "Мат.\nАнализ"
+
+    def test_load_from_csv_with_parse_workers(self, db_session, csv_file):
+        """Тест: импорт с параллельным разбором записывает корректные строки"""
+        # Act
+        count = StudentManager(db_session).load_from_csv(str(csv_file), parse_workers=2, chunk_bytes=32)
+
+        # Assert
+        assert count == 3
+        assert db_session.scalar(select(func.count(Student.id))) == 3
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    """JSON Lines файл: 2 корректные строки, строка с неверной оценкой и поврежденная строка"""
+    lines = [
+        json.dumps({"last_name": "Иванов", "first_name": "Иван", "faculty": "ФПМИ", "course": "Мат. Анализ", "grade": 85}),
+        json.dumps({"last_name": "Петров", "first_name": "Петр", "faculty": "ФПМИ", "course": "Мат. Анализ", "grade": 85.5}),
+        "",
+        "{не json",
+        json.dumps({"last_name": "Сидоров", "first_name": "Сидор", "faculty": "ФФ", "course": "Физика", "grade": "90"}),
+    ]
+    path = tmp_path / "students.jsonl"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+class TestImportFormats:
+    """Тесты импорта из JSON Lines и Parquet и сопоставления столбцов"""
+
+    def test_load_from_jsonl(self, db_session, jsonl_file):
+        """Тест: формат определяется по расширению, ошибочные строки отклоняются"""
+        # Arrange
+        rejects = RejectedRowsReport("jsonl", reports_dir=str(jsonl_file.parent))
+
+        # Act
+        count = StudentManager(db_session).load_from_file(str(jsonl_file), rejects=rejects)
+
+        # Assert
+        assert count == 2
+        assert db_session.scalar(select(Student.grade).where(Student.last_name == "Сидоров")) == 90
+        assert rejects.rows == [(2, "grade", "не целое число: 85.5"), (3, "", "строка не является объектом")]
+
+    def test_jsonl_reader_resumes_from_offset(self, jsonl_file):
+        """Тест: чтение JSON Lines продолжается с сохраненного смещения"""
+        # Arrange
+        with open(jsonl_file, "rb") as file:
+            reader = JSONLinesReader(file)
+            rows = iter(reader)
+            next(rows)
+            offset, row_num = reader.offset, reader.row_num
+
+        # Act
+        with open(jsonl_file, "rb") as file:
+            resumed = list(JSONLinesReader(file, offset, row_num))
+
+        # Assert
+        assert [num for num, _ in resumed] == [2, 3, 4]
+        assert resumed[-1][1]["last_name"] == "Сидоров"
+
+    def test_csv_with_custom_column_map(self, db_session, tmp_path):
+        """Тест: столбцы с другими заголовками сопоставляются полям модели"""
+        # Arrange
+        path = tmp_path / "students.csv"
+        path.write_text("surname,name,Факультет,Курс,score\nИванов,Иван,ФПМИ,Мат. Анализ,85\n", encoding="utf-8")
+
+        # Act
+        count = StudentManager(db_session).load_from_file(
+            str(path), column_map={"last_name": "surname", "first_name": "name", "grade": "score"}
+        )
+
+        # Assert
+        assert count == 1
+        assert db_session.scalar(select(Student.first_name)) == "Иван"
+
+    def test_background_load_rejects_unknown_mapping(self, client, auth_headers, csv_file):
+        """Тест: неизвестное поле в сопоставлении и неизвестный формат отклоняются сразу"""
+        # Act
+        mapping_response = client.post(
+            "/background/load-csv",
+            json={"csv_file_path": str(csv_file), "column_map": {"age": "Возраст"}},
+            headers=auth_headers
+        )
+        format_response = client.post(
+            "/background/load-csv",
+            json={"csv_file_path": str(csv_file), "file_format": "xml"},
+            headers=auth_headers
+        )
+
+        # Assert
+        assert mapping_response.status_code == 400
+        assert format_response.status_code == 400
+
+    def test_background_load_jsonl(self, client, auth_headers, jsonl_file):
+        """Тест: фоновая задача импортирует JSON Lines"""
+        # Act
+        response = client.post(
+            "/background/load-csv",
+            json={"csv_file_path": str(jsonl_file)},
+            headers=auth_headers
+        )
+        data = client.get(f"/background/tasks/{response.json()['task_id']}", headers=auth_headers).json()
+
+        # Assert
+        assert data["parameters"]["file_format"] == "jsonl"
+        assert data["result"]["count"] == 2
+        assert data["result"]["rejected_rows"]["total"] == 2
+
+    def test_background_load_parquet(self, client, auth_headers, tmp_path):
+        """Тест: фоновая задача импортирует Parquet, формат определяется по расширению"""
+        # Arrange
+        path = tmp_path / "students.parquet"
+        pq.write_table(pa.table({
+            "last_name": ["Иванов", "Петров"],
+            "first_name": ["Иван", "Петр"],
+            "faculty": ["ФПМИ", "ФПМИ"],
+            "course": ["Физика", "Физика"],
+            "grade": [90, 85],
+        }), str(path))
+
+        # Act
+        response = client.post(
+            "/background/load-csv",
+            json={"csv_file_path": str(path)},
+            headers=auth_headers
+        )
+        data = client.get(f"/background/tasks/{response.json()['task_id']}", headers=auth_headers).json()
+
+        # Assert
+        assert data["status"] == "completed"
+        assert data["parameters"]["file_format"] == "parquet"
+        assert data["result"]["count"] == 2
+
+    def test_unknown_extension_defaults_to_csv(self):
+        """Тест: файл с неизвестным расширением читается как CSV"""
+        # Act
+        default_format = resolve_import_format("/data/students.txt")
+        ndjson_format = resolve_import_format("/data/students.NDJSON")
+
+        # Assert
+        assert default_format == "csv"
+        assert ndjson_format == "jsonl"
+
+    def test_load_from_parquet_by_row_groups(self, db_session, tmp_path):
+        """Тест: Parquet читается по группам строк и возобновляется с середины группы"""
+        # Arrange
+        path = tmp_path / "students.parquet"
+        table = pa.table({
+            "last_name": [f"Студент{i}" for i in range(5)],
+            "first_name": ["Иван"] * 5,
+            "faculty": ["ФПМИ"] * 5,
+            "course": ["Мат. Анализ"] * 5,
+            "grade": [80, 81, 82, 83, 200],
+        })
+        pq.write_table(table, str(path), row_group_size=2)
+
+        # Act
+        count = StudentManager(db_session).load_from_file(
+            str(path), checkpoint={"offset": 3, "rows_read": 3, "inserted": 3, "rejected": 0}
+        )
+
+        # Assert
+        assert count == 4
+        assert db_session.scalar(select(Student.last_name)) == "Студент3"
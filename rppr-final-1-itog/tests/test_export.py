@@ -0,0 +1,216 @@
+import csv
+import json
+import os
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import exporters
+from app.background_tasks import TaskContext
+from app.crud import BackgroundTaskManager, StudentManager
+from app.database import Base
+from app.exporters import export_path, parse_byte_range, write_export
+from app.importers import CSV_COLUMNS, STUDENT_COLUMNS
+
+
+@pytest.fixture
+def students(db_session):
+    """Три студента двух факультетов"""
+    manager = StudentManager(db_session)
+    for last_name, faculty, grade in [("Иванов", "ФИТ", 85), ("Петров", "ФИТ", 70), ("Сидоров", "ФГМИ", 92)]:
+        manager.create_student({
+            "last_name": last_name, "first_name": "Иван", "faculty": faculty, "course": "Математика", "grade": grade
+        })
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    """Файлы выгрузки пишутся во временный каталог"""
+    monkeypatch.setattr(exporters, "EXPORT_DIR", str(tmp_path / "exports"))
+    return tmp_path / "exports"
+
+
+class TestExportToFile:
+    """Тесты выгрузки студентов в файл"""
+
+    def test_export_csv_with_filter(self, db_session, students, tmp_path):
+        """Тест: выгрузка по факультету пачками с заголовками формата импорта"""
+        # Arrange
+        path = str(tmp_path / "students.csv")
+        progress = []
+
+        # Act
+        count = StudentManager(db_session).export_to_file(
+            path, faculty="ФИТ", chunk_size=1, progress_callback=progress.append
+        )
+
+        # Assert
+        with open(path, encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        assert count == 2
+        assert [row[CSV_COLUMNS["last_name"]] for row in rows] == ["Иванов", "Петров"]
+        assert [p["rows_written"] for p in progress] == [1, 2]
+        assert progress[-1]["total"] == 2
+
+    def test_export_with_progress_on_file_database(self, tmp_path):
+        """Тест: запись прогресса во время выгрузки не блокируется чтением в файловой SQLite"""
+        # Arrange
+        engine = create_engine(f"sqlite:///{tmp_path / 'students.db'}", connect_args={"timeout": 1})
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as db:
+            manager = StudentManager(db)
+            manager.insert_students_batch([
+                {"last_name": f"Студент{i}", "first_name": "Иван", "faculty": "ФИТ", "course": "Алгебра", "grade": i % 100}
+                for i in range(10)
+            ])
+            task_id = BackgroundTaskManager(db).create_task("export_students", {}).task_id
+            context = TaskContext(BackgroundTaskManager(db), task_id)
+
+            # Act
+            count = manager.export_to_file(
+                str(tmp_path / "students.csv"), chunk_size=3, progress_callback=context.report_progress
+            )
+            progress = json.loads(BackgroundTaskManager(db).get_task(task_id).progress)
+        engine.dispose()
+
+        # Assert
+        assert count == 10
+        assert progress["rows_written"] == 10
+        assert progress["total"] == 10
+
+    def test_failed_export_leaves_no_file(self, tmp_path):
+        """Тест: при ошибке недописанный файл удаляется"""
+        # Arrange
+        path = str(tmp_path / "students.csv")
+
+        def chunks():
+            yield [("Иванов", "Иван", "ФИТ", "Математика", 85)]
+            raise RuntimeError("соединение потеряно")
+
+        # Act
+        with pytest.raises(RuntimeError):
+            write_export(path, "csv", chunks())
+
+        # Assert
+        assert os.listdir(tmp_path) == []
+
+    def test_export_parquet(self, db_session, students, tmp_path):
+        """Тест: выгрузка в Parquet, по группе строк на пачку"""
+        # Arrange
+        path = str(tmp_path / "students.parquet")
+
+        # Act
+        count = StudentManager(db_session).export_to_file(path, "parquet", chunk_size=2)
+
+        # Assert
+        parquet = pq.ParquetFile(path)
+        assert count == 3
+        assert parquet.num_row_groups == 2
+        assert parquet.schema_arrow.names == list(STUDENT_COLUMNS)
+
+
+class TestByteRange:
+    """Тесты разбора заголовка Range"""
+
+    def test_parse_ranges(self):
+        """Тест: обычный, открытый и суффиксный диапазоны"""
+        # Act
+        ranges = [parse_byte_range(header, 100) for header in ("bytes=0-9", "bytes=90-", "bytes=-10", "bytes=95-500")]
+
+        # Assert
+        assert ranges == [(0, 9), (90, 99), (90, 99), (95, 99)]
+
+    def test_unsupported_range_returns_whole_file(self):
+        """Тест: несколько диапазонов и некорректный заголовок игнорируются"""
+        # Act
+        ranges = [parse_byte_range(header, 100) for header in ("bytes=0-1,5-6", "items=0-1", "bytes=a-b", "bytes=-")]
+
+        # Assert
+        assert ranges == [None, None, None, None]
+
+    def test_unsatisfiable_range(self):
+        """Тест: диапазон за концом файла"""
+        # Act
+        with pytest.raises(ValueError):
+            parse_byte_range("bytes=100-", 100)
+
+
+class TestExportEndpoints:
+    """Тесты фоновой выгрузки и скачивания файла"""
+
+    def start_export(self, client, auth_headers, **request):
+        response = client.post("/background/export", json=request, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()["task_id"]
+
+    def test_export_task_and_download(self, client, auth_headers, students, export_dir):
+        """Тест: задача выгрузки завершается, файл скачивается целиком"""
+        # Act
+        task_id = self.start_export(client, auth_headers, course="Математика")
+        task = client.get(f"/background/tasks/{task_id}", headers=auth_headers).json()
+        response = client.get(f"/background/tasks/{task_id}/download", headers=auth_headers)
+
+        # Assert
+        assert task["status"] == "completed"
+        assert task["result"]["count"] == 3
+        assert task["progress"]["rows_written"] == 3
+        assert response.status_code == 200
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.content.decode("utf-8").count("\n") == 4
+        assert os.path.exists(export_path(task_id, "csv"))
+
+    def test_parquet_export_task_and_download(self, client, auth_headers, students, export_dir, tmp_path):
+        """Тест: задача выгрузки в Parquet завершается, скачанный файл читается pyarrow"""
+        # Act
+        task_id = self.start_export(client, auth_headers, file_format="parquet")
+        task = client.get(f"/background/tasks/{task_id}", headers=auth_headers).json()
+        response = client.get(f"/background/tasks/{task_id}/download", headers=auth_headers)
+
+        # Assert
+        downloaded = tmp_path / "downloaded.parquet"
+        downloaded.write_bytes(response.content)
+        assert task["status"] == "completed"
+        assert response.status_code == 200
+        assert pq.read_table(str(downloaded)).num_rows == task["result"]["count"]
+
+    def test_download_range(self, client, auth_headers, students, export_dir):
+        """Тест: докачка части файла по заголовку Range"""
+        # Arrange
+        task_id = self.start_export(client, auth_headers)
+        content = open(export_path(task_id, "csv"), "rb").read()
+
+        # Act
+        partial = client.get(
+            f"/background/tasks/{task_id}/download", headers={**auth_headers, "Range": "bytes=10-"}
+        )
+        unsatisfiable = client.get(
+            f"/background/tasks/{task_id}/download", headers={**auth_headers, "Range": f"bytes={len(content)}-"}
+        )
+
+        # Assert
+        assert partial.status_code == 206
+        assert partial.content == content[10:]
+        assert partial.headers["content-range"] == f"bytes 10-{len(content) - 1}/{len(content)}"
+        assert unsatisfiable.status_code == 416
+        assert unsatisfiable.headers["content-range"] == f"bytes */{len(content)}"
+
+    def test_download_requires_finished_export(self, client, auth_headers, csv_file):
+        """Тест: скачать можно только результат выгрузки"""
+        # Arrange
+        response = client.post("/background/load-csv", json={"csv_file_path": str(csv_file)}, headers=auth_headers)
+
+        # Act
+        download = client.get(f"/background/tasks/{response.json()['task_id']}/download", headers=auth_headers)
+
+        # Assert
+        assert download.status_code == 409
+
+    def test_export_unknown_format(self, client, auth_headers):
+        """Тест: неподдерживаемый формат отклоняется до запуска задачи"""
+        # Act
+        response = client.post("/background/export", json={"file_format": "xlsx"}, headers=auth_headers)
+
+        # Assert
+        assert response.status_code == 400
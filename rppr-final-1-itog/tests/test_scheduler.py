@@ -0,0 +1,161 @@
+import pytest
+from datetime import datetime, timedelta
+
+from app import background_tasks
+from app.crud import StudentManager
+from app.models import SchedulerLock
+from app.scheduler import CronSchedule, DatabaseJobLock, IntervalSchedule, Scheduler, parse_schedule
+from conftest import TestingSessionLocal
+
+
+class TestSchedules:
+    """Тесты расписаний"""
+
+    def test_cron_next_run(self):
+        """Тест: шаг, диапазон и список в полях cron"""
+        # Arrange
+        schedule = CronSchedule("*/15 9-10 * * 1,3")
+        wednesday_evening = datetime(2026, 10, 21, 18, 7)
+
+        # Act
+        next_run = schedule.next_run(wednesday_evening)
+
+        # Assert
+        assert next_run == datetime(2026, 10, 26, 9, 0)
+        assert schedule.next_run(next_run) == datetime(2026, 10, 26, 9, 15)
+
+    def test_cron_day_of_month_or_weekday(self):
+        """Тест: при заданных дне месяца и дне недели подходит любой из них"""
+        # Arrange
+        schedule = CronSchedule("0 0 1 * 0")
+
+        # Act
+        next_run = schedule.next_run(datetime(2026, 10, 19, 12, 0))
+
+        # Assert
+        assert next_run == datetime(2026, 10, 25, 0, 0)
+
+    def test_parse_schedule(self):
+        """Тест: число - интервал, пять полей - cron, 0 - отключено"""
+        # Act
+        interval = parse_schedule("3600")
+        cron = parse_schedule("0 3 * * *")
+        disabled = parse_schedule("0")
+
+        # Assert
+        assert isinstance(interval, IntervalSchedule)
+        assert isinstance(cron, CronSchedule)
+        assert disabled is None
+
+    def test_invalid_cron_rejected(self):
+        """Тест: значение вне диапазона поля"""
+        # Act
+        with pytest.raises(ValueError):
+            CronSchedule("61 * * * *")
+
+
+class TestSchedulerLocks:
+    """Тесты запуска задач под блокировкой"""
+
+    def make_scheduler(self):
+        return Scheduler(lock=DatabaseJobLock(TestingSessionLocal), clock_skew_seconds=1)
+
+    def test_job_runs_once_across_workers(self, db_session):
+        """Тест: второй воркер пропускает задачу, уже выполненную в этом интервале"""
+        # Arrange
+        calls = []
+        first, second = self.make_scheduler(), self.make_scheduler()
+        jobs = [
+            worker.add_job("gc", lambda: calls.append(1), IntervalSchedule(3600)) for worker in (first, second)
+        ]
+        scheduled_at = datetime.now()
+
+        # Act
+        first_ran = first.run_job(jobs[0], scheduled_at)
+        second_ran = second.run_job(jobs[1], scheduled_at)
+
+        # Assert
+        lock = db_session.get(SchedulerLock, "gc")
+        assert (first_ran, second_ran) == (True, False)
+        assert calls == [1]
+        assert jobs[1].skipped == 1
+        assert lock.locked_until >= scheduled_at + timedelta(seconds=3599 - 1)
+
+    def test_expired_lock_taken_over(self, db_session):
+        """Тест: блокировка, удерживаемая дольше срока, переходит другому воркеру"""
+        # Arrange
+        db_session.add(SchedulerLock(job_name="gc", owner="dead", locked_until=datetime.now() - timedelta(seconds=1)))
+        db_session.commit()
+        worker = self.make_scheduler()
+        job = worker.add_job("gc", lambda: None, IntervalSchedule(60))
+
+        # Act
+        ran = worker.run_job(job, datetime.now())
+
+        # Assert
+        assert ran is True
+        db_session.expire_all()
+        assert db_session.get(SchedulerLock, "gc").owner == worker.owner
+
+    def test_metrics_recorded(self, db_session):
+        """Тест: задержка запуска, длительность и статус сохраняются"""
+        # Arrange
+        worker = self.make_scheduler()
+        job = worker.add_job("purge", lambda: {"success": False}, IntervalSchedule(60))
+        scheduled_at = datetime.now() - timedelta(seconds=2)
+
+        # Act
+        worker.run_job(job, scheduled_at)
+
+        # Assert
+        lock = db_session.get(SchedulerLock, "purge")
+        metrics = worker.metrics()[0]
+        assert metrics["runs"] == 1
+        assert metrics["failures"] == 1
+        assert metrics["last_status"] == "failed"
+        assert metrics["last_jitter"] >= 2
+        assert lock.last_status == "failed"
+        assert lock.last_duration is not None
+
+
+class TestMaintenanceJobs:
+    """Тесты задач обслуживания"""
+
+    def test_repair_faculty_aggregates(self, db_session, monkeypatch):
+        """Тест: средние баллы всех факультетов считаются одним запросом"""
+        # Arrange
+        monkeypatch.setattr(background_tasks, "SessionLocal", TestingSessionLocal)
+        manager = StudentManager(db_session)
+        for faculty, grade in [("ФИТ", 80), ("ФИТ", 91), ("ФГМИ", 70)]:
+            manager.create_student({
+                "last_name": f"Студент{grade}", "first_name": "Иван", "faculty": faculty,
+                "course": "Алгебра", "grade": grade
+            })
+
+        # Act
+        result = background_tasks.repair_faculty_aggregates()
+
+        # Assert
+        assert result == {"success": True, "faculties": 2}
+        assert manager.get_average_grades_by_faculties() == {"ФИТ": 85.5, "ФГМИ": 70.0}
+
+    def test_warm_up_cache_loads_only_aggregates(self, db_session, monkeypatch):
+        """Тест: прогрев кеша записывает только список курсов, без списков студентов"""
+        # Arrange
+        monkeypatch.setattr(background_tasks, "SessionLocal", TestingSessionLocal)
+        written = {}
+        monkeypatch.setattr(background_tasks.cache, "set", lambda key, value, expire: written.update({key: value}))
+        manager = StudentManager(db_session)
+        for faculty, course in [("ФИТ", "Алгебра"), ("ФГМИ", "Геология"), ("ФИТ", "Геология")]:
+            manager.create_student({
+                "last_name": f"Студент{faculty}{course}", "first_name": "Иван", "faculty": faculty,
+                "course": course, "grade": 80
+            })
+
+        # Act
+        result = background_tasks.warm_up_cache()
+
+        # Assert
+        assert result == {"success": True, "courses": 2}
+        assert list(written) == ["courses:all"]
+        assert sorted(written["courses:all"]["courses"]) == ["Алгебра", "Геология"]